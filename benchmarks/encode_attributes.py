@@ -0,0 +1,45 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Measures the time it takes to encode the attributes of an item
+
+    python benchmarks/encode_attributes.py [num_items]
+"""
+import datetime
+import sys
+import timeit
+
+import v3io.dataplane.request
+
+item = {
+    'age': 42,
+    'pi': 3.14,
+    'feature': 'mustache',
+    'male': True,
+    'blob': b'+AFymWFzAL/LUOiU2huiADbugMH0AARATEO1',
+    'list_with_ints': [1, 2, 3],
+    'now': datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc),
+}
+
+
+def main(num_items):
+    elapsed = min(timeit.repeat(lambda: v3io.dataplane.request._dict_to_typed_attributes(item),
+                                number=num_items,
+                                repeat=5))
+
+    print('{0:.3f} usec/item'.format(elapsed * 1000000 / num_items))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -15,9 +15,12 @@
 import os.path
 import unittest
 import unittest.mock
+import threading
 import time
 import array
+import base64
 import datetime
+import enum
 
 import future.utils
 
@@ -26,6 +29,11 @@ import v3io.dataplane
 import v3io.logger
 import v3io.dataplane.response
 import v3io.dataplane.output
+import v3io.dataplane.kv_array
+import v3io.dataplane.kv_timestamp
+import v3io.dataplane.request
+import v3io.dataplane.stream_consumer
+import v3io.dataplane.transport.connection_pool
 
 
 class Test(unittest.TestCase):
@@ -106,6 +114,78 @@ class TestContainer(Test):
         # clean up
         self._delete_dir(self._path)
 
+    def test_walk(self):
+        object_paths = ['object-{0}.txt'.format(object_index) for object_index in range(3)]
+        for dir_index in range(3):
+            object_paths += ['dir-{0}/object-{1}.txt'.format(dir_index, object_index) for object_index in range(3)]
+
+        for object_path in object_paths:
+            self._client.object.put(container=self._container, path=os.path.join(self._path, object_path), body='b')
+
+        expected_keys = set(os.path.join(self._path, object_path).lstrip('/') for object_path in object_paths)
+
+        # a small limit so that every directory spans several pages
+        contents = self._client.container.iter_contents(container=self._container, path=self._path, limit=2)
+        self.assertEqual(3, len(list(contents)))
+
+        contents = self._client.container.iter_contents(container=self._container,
+                                                        path=self._path,
+                                                        limit=2,
+                                                        recursive=True)
+        self.assertEqual(expected_keys, set(content.key for content in contents))
+
+        # walk into dir-0 only
+        keys = set()
+        for _, common_prefixes, contents in self._client.container.walk(container=self._container,
+                                                                         path=self._path,
+                                                                         limit=2):
+            keys.update(content.key for content in contents)
+            common_prefixes[:] = [common_prefix for common_prefix in common_prefixes if 'dir-0' in common_prefix.prefix]
+
+        self.assertEqual(set(key for key in expected_keys if 'dir-1' not in key and 'dir-2' not in key), keys)
+
+        # stop in the middle, while a page is prefetched
+        contents = self._client.container.iter_contents(container=self._container, path=self._path, limit=1)
+        next(contents)
+        contents.close()
+
+        # clean up
+        for object_path in object_paths:
+            self._client.object.delete(container=self._container, path=os.path.join(self._path, object_path))
+
+        self._delete_dir(self._path)
+
+    def test_walk_parallel(self):
+        object_paths = []
+        for dir_index in range(4):
+            for sub_dir_index in range(2):
+                object_paths += ['dir-{0}/sub-{1}/object-{2}.txt'.format(dir_index, sub_dir_index, object_index)
+                                 for object_index in range(3)]
+
+        for object_path in object_paths:
+            self._client.object.put(container=self._container, path=os.path.join(self._path, object_path), body='b')
+
+        keys = []
+        for _, _, contents in self._client.container.walk_parallel(container=self._container,
+                                                                    path=self._path,
+                                                                    workers=3,
+                                                                    limit=2):
+            keys += [content.key for content in contents]
+
+        self.assertEqual(sorted(os.path.join(self._path, object_path).lstrip('/') for object_path in object_paths),
+                         sorted(keys))
+
+        # stop in the middle
+        pages = self._client.container.walk_parallel(container=self._container, path=self._path, workers=3, limit=1)
+        next(pages)
+        pages.close()
+
+        # clean up
+        for object_path in object_paths:
+            self._client.object.delete(container=self._container, path=os.path.join(self._path, object_path))
+
+        self._delete_dir(self._path)
+
 
 class TestStream(Test):
 
@@ -213,6 +293,126 @@ class TestStream(Test):
         self._client.stream.delete(container=self._container,
                                    stream_path=self._path)
 
+    def test_put_records_with_retries(self):
+        self._client.stream.create(container=self._container,
+                                   stream_path=self._path,
+                                   shard_count=2)
+
+        records = [
+            {'shard_id': 0, 'data': 'first shard record #1'},
+            {'shard_id': 10, 'data': 'invalid shard record #1'},
+            {'shard_id': 1, 'data': 'second shard record #1'},
+            {'shard_id': 10, 'data': 'invalid shard record #2'},
+        ]
+
+        with unittest.mock.patch.object(self._client.stream,
+                                        'put_records',
+                                        wraps=self._client.stream.put_records) as put_records:
+            output = self._client.stream.put_records_with_retries(container=self._container,
+                                                                  stream_path=self._path,
+                                                                  records=records,
+                                                                  max_retries=2,
+                                                                  retry_backoff_ms=1)
+
+        # only the failed records were retried, in order
+        self.assertEqual(3, put_records.call_count)
+        self.assertEqual([records[1], records[3]], put_records.call_args[0][2])
+
+        self.assertEqual(2, output.failed_record_count)
+        self.assertEqual([0, None, 1, None], [record.shard_id for record in output.records])
+        self.assertEqual([False, True, False, True], [bool(record.error_code) for record in output.records])
+
+        self._client.stream.delete(container=self._container,
+                                   stream_path=self._path)
+
+    def test_producer(self):
+        self._client.stream.create(container=self._container,
+                                   stream_path=self._path,
+                                   shard_count=2)
+
+        with self._client.stream.producer(container=self._container,
+                                          stream_path=self._path,
+                                          max_batch_records=16,
+                                          retry_backoff_ms=1) as producer:
+            futures = [producer.send('record #{0}'.format(record_index), shard_id=record_index % 2)
+                       for record_index in range(100)]
+
+            # an invalid shard fails after the retries
+            invalid_future = producer.send('invalid shard record', shard_id=10)
+
+        for record_index, record_future in enumerate(futures):
+            self.assertEqual(record_index % 2, record_future.result().shard_id)
+
+        with self.assertRaises(v3io.dataplane.stream_producer.RecordError):
+            invalid_future.result()
+
+        # the records of every shard were put in order
+        for shard_id in range(2):
+            response = self._client.stream.seek(container=self._container,
+                                                stream_path=self._path,
+                                                shard_id=shard_id,
+                                                seek_type='EARLIEST')
+
+            response = self._client.stream.get_records(container=self._container,
+                                                       stream_path=self._path,
+                                                       shard_id=shard_id,
+                                                       location=response.output.location)
+
+            self.assertEqual(['record #{0}'.format(record_index) for record_index in range(shard_id, 100, 2)],
+                             [record.data.decode('utf-8') for record in response.output.records])
+
+        self._client.stream.delete(container=self._container,
+                                   stream_path=self._path)
+
+    def test_consumer(self):
+        num_shards = 4
+
+        self._client.stream.create(container=self._container,
+                                   stream_path=self._path,
+                                   shard_count=num_shards)
+
+        records = [{'shard_id': record_index % num_shards, 'data': 'record #{0}'.format(record_index)}
+                   for record_index in range(40)]
+
+        self._client.stream.put_records(container=self._container, stream_path=self._path, records=records[:20])
+
+        with self._client.stream.consumer(container=self._container,
+                                          stream_path=self._path,
+                                          start='EARLIEST',
+                                          limit=3,
+                                          poll_interval_ms=10) as consumer:
+            self.assertEqual(list(range(num_shards)), consumer.shard_ids)
+
+            # records put while consuming are read too
+            self._client.stream.put_records(container=self._container, stream_path=self._path, records=records[20:])
+
+            shard_records = {}
+            for _ in range(len(records)):
+                shard_id, record = consumer.next_record(timeout=5)
+                shard_records.setdefault(shard_id, []).append(record.data.decode('utf-8'))
+
+            self.assertIsNone(consumer.next_record(timeout=0.1))
+
+        # the records of every shard were read in order
+        for shard_id in range(num_shards):
+            self.assertEqual([record['data'] for record in records if record['shard_id'] == shard_id],
+                             shard_records[shard_id])
+
+        self.assertIsNone(consumer.next_record())
+
+        # closing the consumer from another thread ends the iteration of a reader waiting for a record
+        consumer = self._client.stream.consumer(container=self._container, stream_path=self._path)
+        reader = threading.Thread(target=lambda: list(consumer), daemon=True)
+        reader.start()
+        time.sleep(0.1)
+
+        consumer.close()
+        reader.join(5)
+        self.assertFalse(reader.is_alive())
+
+        self._client.stream.delete(container=self._container,
+                                   stream_path=self._path)
+
     def _stream_exists(self):
         response = self._client.stream.describe(container=self._container,
                                                 stream_path=self._path,
@@ -346,6 +546,62 @@ class TestObject(Test):
             self.assertEqual(200, response.status_code)
             self.assertEqual(_object_contents(response_idx), response.body.decode('utf-8'))
 
+    def test_batch_wait_iter(self):
+
+        def _object_path(idx):
+            return self._object_dir + '/object' + str(idx)
+
+        def _put_requests(num_objects):
+            for object_idx in range(num_objects):
+                yield self._client.object.put(self._container,
+                                              _object_path(object_idx),
+                                              body=str(object_idx),
+                                              transport_actions=v3io.dataplane.transport.Actions.encode_only)
+
+        num_objects = 64
+
+        # requests are encoded lazily, as connections free up
+        num_responses = 0
+        for response in self._client.batch.wait_iter(_put_requests(num_objects)):
+            self.assertEqual(200, response.status_code)
+            num_responses += 1
+
+        self.assertEqual(num_objects, num_responses)
+
+        # requests added to the batch are streamed as well
+        for object_idx in range(num_objects):
+            self._client.batch.object.get(self._container, _object_path(object_idx))
+
+        bodies = [response.body.decode('utf-8') for response in self._client.batch.wait_iter()]
+        self.assertEqual([str(object_idx) for object_idx in range(num_objects)], bodies)
+
+        # responses can be matched to their requests
+        for object_idx in range(num_objects):
+            self._client.batch.object.get(self._container, _object_path(object_idx))
+
+        for request, response in self._client.batch.wait_iter_pairs(num_workers=4):
+            self.assertEqual(request.path.rsplit('object', 1)[1], response.body.decode('utf-8'))
+
+    def test_batch_workers(self):
+
+        def _object_path(idx):
+            return self._object_dir + '/object' + str(idx)
+
+        num_objects = 64
+
+        for object_idx in range(num_objects):
+            self._client.batch.object.put(self._container, _object_path(object_idx), body=str(object_idx))
+
+        for response in self._client.batch.wait(num_workers=4):
+            self.assertEqual(200, response.status_code)
+
+        for object_idx in range(num_objects):
+            self._client.batch.object.get(self._container, _object_path(object_idx))
+
+        # responses are returned in the order the requests were added, even though they complete out of order
+        bodies = [response.body.decode('utf-8') for response in self._client.batch.wait(num_workers=4)]
+        self.assertEqual([str(object_idx) for object_idx in range(num_objects)], bodies)
+
 
 class TestSchema(Test):
 
@@ -588,6 +844,276 @@ class TestKv(Test):
 
         self.assertEqual(len(received_items), 30)
 
+    def test_field_types(self):
+        for idx in range(10):
+            self._client.kv.put(container=self._container,
+                                table_path=self._path,
+                                key=f'key-{idx}',
+                                attributes={
+                                    'attr': idx,
+                                    'ratio': idx,
+                                })
+
+        received_items = self._client.kv.new_cursor(container=self._container,
+                                                    table_path=self._path,
+                                                    attribute_names=['attr', 'ratio'],
+                                                    field_types={'ratio': 'double'}).all()
+
+        self.assertEqual(10, len(received_items))
+        for received_item in received_items:
+            self.assertIsInstance(received_item['attr'], int)
+            self.assertIsInstance(received_item['ratio'], float)
+            self.assertEqual(received_item['attr'], received_item['ratio'])
+
+    def test_cache(self):
+        cache = self._client.kv.new_cache(max_entries=2, ttl=60)
+
+        cache.put(self._container, self._path, 'bob', {'age': 42})
+
+        for _ in range(3):
+            response = cache.get(self._container, self._path, 'bob', attribute_names=['age'])
+            self.assertEqual(42, response.output.item['age'])
+
+        self.assertEqual(1, cache.misses)
+        self.assertEqual(2, cache.hits)
+
+        # a write through the cache invalidates the item
+        cache.update(self._container, self._path, 'bob', attributes={'age': 43})
+        self.assertEqual(43, cache.get(self._container, self._path, 'bob', attribute_names=['age']).output.item['age'])
+        self.assertEqual(2, cache.misses)
+
+        # the least recently used entry is evicted
+        cache.put(self._container, self._path, 'linda', {'age': 41})
+        cache.get(self._container, self._path, 'linda')
+        cache.get(self._container, self._path, 'linda', attribute_names=['age'])
+        cache.get(self._container, self._path, 'bob', attribute_names=['age'])
+        self.assertEqual(5, cache.misses)
+
+        # missing items aren't cached
+        cache.delete(self._container, self._path, 'linda')
+        for _ in range(2):
+            response = cache.get(self._container,
+                                 self._path,
+                                 'linda',
+                                 raise_for_status=v3io.dataplane.RaiseForStatus.never)
+            self.assertEqual(404, response.status_code)
+
+        self.assertEqual(7, cache.misses)
+
+        # writes through the model invalidate the item too
+        def _get_age():
+            return cache.get(self._container, self._path, 'bob', attribute_names=['age']).output.item['age']
+
+        self.assertEqual(43, _get_age())
+        self._client.kv.put(self._container, self._path, 'bob', {'age': 44})
+        self.assertEqual(44, _get_age())
+        self._client.kv.put_many(self._container, self._path, [('bob', {'age': 45})])
+        self.assertEqual(45, _get_age())
+
+        with self._client.kv.buffered_writer(self._container, self._path) as writer:
+            writer.update('bob', attributes={'age': 46})
+
+        self.assertEqual(46, _get_age())
+
+        # entries are per access key
+        cache.get(self._container, self._path, 'bob', access_key=self._client._access_key, attribute_names=['age'])
+        self.assertEqual(11, cache.misses)
+
+        # all spellings of the table path are the same item
+        response = cache.get(self._container, self._path + '/', 'bob', attribute_names=['age'])
+        self.assertEqual(46, response.output.item['age'])
+        self.assertEqual(11, cache.misses)
+
+        self._client.kv.put(self._container, '/' + self._path, 'bob', {'age': 47})
+        response = cache.get(self._container, self._path + '/', 'bob', attribute_names=['age'])
+        self.assertEqual(47, response.output.item['age'])
+
+    def test_buffered_writer(self):
+        with self._client.kv.buffered_writer(self._container, self._path, flush_interval=60, max_items=10) as writer:
+            for item_index in range(5):
+                writer.put(f'key-{item_index}', {'counter': 0, 'feature': 'mustache'})
+
+            for _ in range(10):
+                for item_index in range(5):
+                    writer.update(f'key-{item_index}', expression='counter=counter+1')
+
+            writer.update('key-0', attributes={'feature': 'singing'})
+
+        writer.result.raise_for_status()
+        self.assertEqual(56, writer.num_writes)
+        self.assertEqual(11, writer.num_requests)
+        self.assertEqual(writer.num_requests, writer.result.success_count)
+
+        items = dict(self._client.kv.get_many(self._container, self._path, [f'key-{idx}' for idx in range(5)]))
+        for item_index in range(5):
+            self.assertEqual(10, items[f'key-{item_index}']['counter'])
+
+        self.assertEqual('singing', items['key-0']['feature'])
+        self.assertEqual('mustache', items['key-1']['feature'])
+
+    def test_prefetch(self):
+        for idx in range(100):
+            self._client.kv.put(container=self._container,
+                                table_path=self._path,
+                                key=f'key-{idx}',
+                                attributes={
+                                    'attr': idx,
+                                })
+
+        received_items = self._client.kv.new_cursor(container=self._container,
+                                                    table_path=self._path,
+                                                    prefetch=2).all()
+
+        self.assertEqual(list(range(100)), sorted(item['attr'] for item in received_items))
+
+        # stop reading in the middle
+        cursor = self._client.kv.new_cursor(container=self._container, table_path=self._path, limit=50, prefetch=2)
+        cursor.next_item()
+        cursor.close()
+
+    def test_to_columns(self):
+        import numpy
+
+        for idx in range(10):
+            attributes = {
+                'int': idx,
+                'float': idx + 0.5,
+                'str': str(idx),
+                'array': [idx, idx * 2],
+                'timestamp': datetime.datetime(2020, 1, 1, 0, 0, idx, tzinfo=datetime.timezone.utc),
+            }
+
+            # some items are missing some attributes
+            if idx % 2:
+                attributes['odd_int'] = idx
+
+            self._client.kv.put(container=self._container,
+                                table_path=self._path,
+                                key=f'key-{idx:02}',
+                                attributes=attributes)
+
+        columns = self._client.kv.new_cursor(container=self._container,
+                                             table_path=self._path,
+                                             attribute_names=['int', 'float', 'str', 'array', 'timestamp', 'odd_int'],
+                                             limit=10).to_columns()
+
+        order = numpy.argsort(columns['int'])
+        self.assertEqual(numpy.int64, columns['int'].dtype)
+        self.assertEqual(list(range(10)), columns['int'][order].tolist())
+        self.assertEqual([idx + 0.5 for idx in range(10)], columns['float'][order].tolist())
+        self.assertEqual([str(idx) for idx in range(10)], columns['str'][order].tolist())
+        self.assertEqual((10, 2), columns['array'].shape)
+        self.assertEqual([[idx, idx * 2] for idx in range(10)], columns['array'][order].tolist())
+        self.assertEqual(numpy.datetime64('2020-01-01T00:00:09', 'ns'), columns['timestamp'][order][9])
+
+        # missing numbers are NaN
+        odd_ints = columns['odd_int'][order]
+        self.assertTrue(numpy.isnan(odd_ints[0]))
+        self.assertEqual(9, odd_ints[9])
+
+        data_frame = self._client.kv.scan_to_dataframe(container=self._container,
+                                                       table_path=self._path,
+                                                       attribute_names=['int', 'str'])
+
+        self.assertEqual(list(range(10)), sorted(data_frame['int'].tolist()))
+
+    def test_record_batches(self):
+        import pyarrow
+
+        for idx in range(10):
+            self._client.kv.put(container=self._container,
+                                table_path=self._path,
+                                key=f'key-{idx:02}',
+                                attributes={
+                                    'int': idx,
+                                    'str': str(idx),
+                                })
+
+        # the schema is inferred
+        record_batches = list(self._client.kv.scan_record_batches(container=self._container,
+                                                                  table_path=self._path,
+                                                                  attribute_names=['int', 'str']))
+
+        table = pyarrow.Table.from_batches(record_batches)
+        self.assertEqual(pyarrow.float64(), table.schema.field('int').type)
+        self.assertEqual(list(range(10)), sorted(table.column('int').to_pylist()))
+
+        # the schema is read from the schema file
+        self._client.kv.create_schema(container=self._container,
+                                      table_path=self._path,
+                                      key='key_field',
+                                      fields=[
+                                          {'name': 'key_field', 'type': 'string', 'nullable': False},
+                                          {'name': 'int', 'type': 'double', 'nullable': True},
+                                          {'name': 'missing', 'type': 'long', 'nullable': True},
+                                      ])
+
+        record_batches = list(self._client.kv.scan_record_batches(container=self._container,
+                                                                  table_path=self._path,
+                                                                  attribute_names=['__name', 'int']))
+
+        table = pyarrow.Table.from_batches(record_batches)
+        self.assertEqual(['key_field', 'int', 'missing'], table.schema.names)
+        self.assertEqual(pyarrow.float64(), table.schema.field('int').type)
+        self.assertEqual([f'key-{idx:02}' for idx in range(10)], sorted(table.column('key_field').to_pylist()))
+        self.assertEqual(10, table.column('missing').null_count)
+
+        self._client.object.delete(container=self._container, path=os.path.join(self._path, '.#schema'))
+
+    def test_parallel_cursor(self):
+        for idx in range(100):
+            self._client.kv.put(container=self._container,
+                                table_path=self._path,
+                                key=f'key-{idx}',
+                                attributes={
+                                    'attr': idx,
+                                })
+
+        for ordered in [False, True]:
+            received_items = self._client.kv.new_parallel_cursor(container=self._container,
+                                                                 table_path=self._path,
+                                                                 total_segments=4,
+                                                                 attribute_names=['attr'],
+                                                                 ordered=ordered).all()
+
+            self.assertEqual(list(range(100)), sorted(item['attr'] for item in received_items))
+
+        # limit across all segments
+        cursor = self._client.kv.new_parallel_cursor(container=self._container,
+                                                     table_path=self._path,
+                                                     total_segments=4,
+                                                     limit=30)
+
+        self.assertEqual(30, len(cursor.all()))
+
+        # more segments than connections are scanned a few at a time
+        received_items = self._client.kv.new_parallel_cursor(container=self._container,
+                                                             table_path=self._path,
+                                                             total_segments=100,
+                                                             attribute_names=['attr'],
+                                                             ordered=True).all()
+
+        self.assertEqual(list(range(100)), sorted(item['attr'] for item in received_items))
+
+        # stop reading in the middle
+        cursor = self._client.kv.new_parallel_cursor(container=self._container,
+                                                     table_path=self._path,
+                                                     total_segments=4)
+        cursor.next_item()
+        cursor.close()
+
+        # a cursor's marker is that of the page being read - resuming from it reads the current item on
+        cursor = self._client.kv.new_cursor(container=self._container, table_path=self._path, attribute_names=['attr'])
+        current_item = [cursor.next_item() for _ in range(50)][-1]
+        resumed_items = self._client.kv.new_cursor(container=self._container,
+                                                   table_path=self._path,
+                                                   attribute_names=['attr'],
+                                                   marker=cursor.marker).all()
+
+        self.assertIn(current_item, resumed_items)
+        for item in cursor.all():
+            self.assertIn(item, resumed_items)
+
     def test_batch(self):
         items = {
             'bob': {'age': 42, 'feature': 'mustache'},
@@ -617,6 +1143,51 @@ class TestKv(Test):
         for response in responses:
             self.assertEqual(200, response.status_code)
 
+    def test_put_many(self):
+        items = {'item-{0}'.format(item_index): {'age': item_index} for item_index in range(50)}
+
+        for concurrency in [None, 4]:
+            result = self._client.kv.put_many(container=self._container,
+                                              table_path=self._path,
+                                              items=items.items(),
+                                              concurrency=concurrency)
+
+            self.assertTrue(result.success)
+            self.assertEqual(len(items), result.success_count)
+            result.raise_for_status()
+
+        self._verify_items(self._path, items)
+
+    def test_get_many(self):
+        items = {'item-{0}'.format(item_index): {'age': item_index} for item_index in range(20)}
+
+        self._client.kv.put_many(container=self._container,
+                                 table_path=self._path,
+                                 items=items.items()).raise_for_status()
+
+        keys = list(items.keys()) + ['item-0', 'missing']
+
+        for concurrency in [None, 4]:
+            received_items = list(self._client.kv.get_many(container=self._container,
+                                                           table_path=self._path,
+                                                           keys=keys,
+                                                           attribute_names=['age'],
+                                                           concurrency=concurrency))
+
+            self.assertEqual(len(keys), len(received_items))
+
+        # a repeated key is only fetched once and an item that doesn't exist is None
+        received_items = list(self._client.kv.get_many(container=self._container,
+                                                       table_path=self._path,
+                                                       keys=keys,
+                                                       attribute_names=['age'],
+                                                       dedupe=True))
+
+        self.assertEqual(len(items) + 1, len(received_items))
+        received_items = dict(received_items)
+        self.assertIsNone(received_items.pop('missing'))
+        self.assertEqual(items, received_items)
+
     def _delete_items(self, path, items):
 
         # delete items
@@ -739,6 +1310,25 @@ class TestBatchRaiseForStatus(Test):
             else:
                 self.assertEqual(200, response.status_code)
 
+    def test_raise_returns_connections(self):
+        num_objects = 16
+
+        for object_idx in range(num_objects):
+            self._client.batch.object.put(self._container, self._object_dir + '/object' + str(object_idx), body='a')
+
+        self._client.batch.wait()
+
+        # fail the batch halfway, with requests still in flight
+        for _ in range(2):
+            for object_idx in range(num_objects):
+                if object_idx == num_objects // 2:
+                    object_idx = 100
+
+                self._client.batch.object.get(self._container, self._object_dir + '/object' + str(object_idx))
+
+            self.assertRaises(Exception, self._client.batch.wait)
+            self.assertEqual(0, self._client._transport.connection_pool.stats()['in_use'])
+
 
 class TestConnectonErrorRecovery(Test):
 
@@ -808,6 +1398,26 @@ class TestConnectonErrorRecovery(Test):
         for response in responses:
             self.assertEqual(200, response.status_code)
 
+    def test_restart_frees_abandoned_connections(self):
+        client = v3io.dataplane.Client(transport_kind='httpclient', max_connections=2, connection_acquire_timeout=1)
+        self._client.object.put(container=self._container, path=self._object_path, body='a')
+
+        # requests sent without their responses being read hold on to their connections
+        for _ in range(2):
+            request = client.object.get(container=self._container,
+                                        path=self._object_path,
+                                        transport_actions=v3io.dataplane.transport.Actions.encode_only)
+            client._transport.send_request(request)
+
+        self.assertRaises(v3io.dataplane.transport.connection_pool.ConnectionPoolTimeoutError,
+                          client.object.get,
+                          container=self._container,
+                          path=self._object_path)
+
+        client._transport.restart()
+        self.assertEqual(b'a', client.object.get(container=self._container, path=self._object_path).body)
+        client.close()
+
     def _restart_webapi(self):
         print('Restart webapi now')
         time.sleep(15)
@@ -871,3 +1481,306 @@ class TestCustomTransport(unittest.TestCase):
 
         # verify that we got a proper
         self.assertEqual(response.output.item['some_key'], 'some_value')
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self._pool = v3io.dataplane.transport.connection_pool.ConnectionPool(unittest.mock.MagicMock,
+                                                                            max_connections=2,
+                                                                            idle_connection_ttl=0.1)
+
+    def test_grow_on_demand(self):
+        self.assertEqual(0, self._pool.stats()['size'])
+
+        connection = self._pool.acquire()
+        self.assertEqual({'size': 1, 'idle': 0, 'in_use': 1, 'waiters': 0, 'max_size': 2}, self._pool.stats())
+
+        # a released connection is reused rather than a new one created
+        self._pool.release(connection)
+        self.assertIs(connection, self._pool.acquire())
+        self.assertEqual(1, self._pool.stats()['size'])
+
+    def test_acquire_timeout(self):
+        self._pool.acquire()
+        self._pool.acquire()
+
+        self.assertRaises(v3io.dataplane.transport.connection_pool.ConnectionPoolTimeoutError,
+                          self._pool.acquire,
+                          timeout=0.05)
+
+    def test_idle_connections_closed(self):
+        connection = self._pool.acquire()
+        self._pool.release(connection)
+
+        time.sleep(0.2)
+
+        # acquiring closes the expired connection and creates a new one
+        self.assertIsNot(connection, self._pool.acquire())
+        connection.close.assert_called_once()
+        self.assertEqual(1, self._pool.stats()['size'])
+
+    def test_reset(self):
+        abandoned_connections = [self._pool.acquire(), self._pool.acquire()]
+
+        # a thread waiting for a connection is woken up by the reset
+        connections = []
+        waiter = threading.Thread(target=lambda: connections.append(self._pool.acquire()), daemon=True)
+        waiter.start()
+        time.sleep(0.05)
+        self.assertEqual(1, self._pool.stats()['waiters'])
+
+        self._pool.reset()
+        waiter.join(1)
+        self.assertEqual(1, len(connections))
+        self.assertEqual({'size': 1, 'idle': 0, 'in_use': 1, 'waiters': 0, 'max_size': 2}, self._pool.stats())
+
+        # connections acquired before the reset are closed once released or discarded, without freeing slots
+        self._pool.release(abandoned_connections[0])
+        self._pool.discard(abandoned_connections[1])
+        for abandoned_connection in abandoned_connections:
+            abandoned_connection.close.assert_called_once()
+
+        self.assertEqual({'size': 1, 'idle': 0, 'in_use': 1, 'waiters': 0, 'max_size': 2}, self._pool.stats())
+
+
+class TestShardReader(unittest.TestCase):
+
+    def test_adaptive_polling(self):
+        shard_reader = v3io.dataplane.stream_consumer.ShardReader(0,
+                                                                  limit=10,
+                                                                  max_limit=40,
+                                                                  poll_interval_ms=100,
+                                                                  max_poll_interval_ms=300)
+
+        def _on_records(num_records, records_behind_latest):
+            return shard_reader.on_records(v3io.dataplane.output.GetRecordsOutput({
+                'NextLocation': 'l{0}'.format(num_records),
+                'MSecBehindLatest': 0,
+                'RecordsBehindLatest': records_behind_latest,
+                'Records': [{'Data': 'ZGF0YQ=='}] * num_records,
+            }))
+
+        # behind - full batches grow the limit, up to max_limit, with no wait between reads
+        self.assertEqual([0, 0, 0, 0], [_on_records(shard_reader.limit, 1000) for _ in range(4)])
+        self.assertEqual(40, shard_reader.limit)
+        self.assertEqual('l40', shard_reader.location)
+
+        # caught up - the limit shrinks back and empty batches back off, up to max_poll_interval_ms
+        self.assertEqual(0, _on_records(5, 0))
+        self.assertEqual([0.1, 0.2, 0.3, 0.3], [_on_records(0, 0) for _ in range(4)])
+        self.assertEqual(10, shard_reader.limit)
+
+        # records reset the backoff
+        self.assertEqual(0, _on_records(1, 0))
+        self.assertEqual(0.1, _on_records(0, 0))
+
+
+class TestResponseDecoding(unittest.TestCase):
+
+    def test_decode_by_content_type(self):
+        body = b'<ListBucketResult><Name>bigdata</Name><NextMarker>m</NextMarker><MaxKeys>1000</MaxKeys>' \
+               b'<IsTruncated>false</IsTruncated><Contents><Key>a/b</Key><Size>3</Size></Contents></ListBucketResult>'
+
+        response = v3io.dataplane.response.Response(v3io.dataplane.output.GetContainerContentsOutput,
+                                                    200,
+                                                    {'Content-Type': 'application/xml; charset=utf-8'},
+                                                    body)
+
+        self.assertEqual('a/b', response.output.contents[0].key)
+        self.assertEqual(3, response.output.contents[0].size)
+
+    def test_decode_by_output_format(self):
+
+        # no content type - the output's format is used
+        response = v3io.dataplane.response.Response(v3io.dataplane.output.GetItemOutput,
+                                                    200,
+                                                    {},
+                                                    b'{"Item": {"a": {"N": "1"}}}')
+
+        self.assertEqual({'a': 1}, response.output.item)
+
+        # errors are JSON regardless of the output's format
+        response = v3io.dataplane.response.Response(v3io.dataplane.output.GetContainerContentsOutput,
+                                                    404,
+                                                    {},
+                                                    b'{"ErrorCode": -2}')
+
+        self.assertEqual({'ErrorCode': -2}, response.output.error)
+
+        # unless they aren't - an XML error with no content type is still decoded
+        response = v3io.dataplane.response.Response(v3io.dataplane.output.GetItemOutput,
+                                                    404,
+                                                    {},
+                                                    b'<Error><Code>NoSuchKey</Code></Error>')
+
+        self.assertEqual({}, response.output.item)
+
+    def test_decode_errors(self):
+
+        # a body that can't be decoded is reported as such, including one that's decoded incrementally
+        for output, body in [(v3io.dataplane.output.GetItemOutput, b'{"Item": '),
+                             (v3io.dataplane.output.GetContainerContentsOutput, b'<ListBucketResult><Contents>')]:
+            response = v3io.dataplane.response.Response(output, 200, {}, body)
+
+            with self.assertRaises(v3io.dataplane.response.HttpResponseError):
+                response.output
+
+        # errors raised by the output itself aren't
+        class _Output(object):
+
+            def __init__(self, decoded_body):
+                raise ZeroDivisionError()
+
+        with self.assertRaises(ZeroDivisionError):
+            v3io.dataplane.response.Response(_Output, 200, {}, b'{}').output
+
+    def test_iter_xml_children(self):
+        body = b'<Root><A>1</A><B><C>2</C></B><A>3</A></Root>'
+
+        # a tiny chunk size, so that children are split across chunks
+        children = v3io.dataplane.response.iter_xml_children(body, chunk_size=3)
+
+        self.assertEqual([('A', '1'), ('B', None), ('A', '3')], [(child.tag, child.text) for child in children])
+
+    def test_typed_attributes_decoder(self):
+        typed_items = [
+            {'age': {'N': '42'}, 'pi': {'N': '3.5'}, 'blob': {'B': 'YWJj'}, 'list': {'B': 'MEGrAAEAAAAIAAAAAwEAAAcAAAAAAAAA'}},
+            {'age': {'N': '-7'}, 'pi': {'N': '3'}, 'blob': {'B': 'YWJj'}, 'list': {'B': 'MEGrAAEAAAAIAAAAAwEAAAcAAAAAAAAA'}},
+        ]
+
+        # numbers are ints or floats by their value, blobs are arrays if they have an array header
+        items = v3io.dataplane.output.TypedAttributesDecoder().decode_items(typed_items)
+        self.assertEqual([
+            {'age': 42, 'pi': 3.5, 'blob': b'abc', 'list': [7]},
+            {'age': -7, 'pi': 3, 'blob': b'abc', 'list': [7]},
+        ], items)
+        self.assertIsInstance(items[1]['pi'], int)
+
+        # a schema decides the type of the values
+        items = v3io.dataplane.output.TypedAttributesDecoder({'pi': 'double'}, learn=True).decode_items(typed_items)
+        self.assertIsInstance(items[1]['pi'], float)
+        self.assertEqual([42, -7], [item['age'] for item in items])
+
+        with self.assertRaises(ValueError):
+            v3io.dataplane.output.TypedAttributesDecoder({'pi': 'decimal'})
+
+
+class TestRequestEncoding(unittest.TestCase):
+
+    def test_typed_attributes(self):
+        class Color(enum.IntEnum):
+            red = 3
+
+        typed_attributes = v3io.dataplane.request._dict_to_typed_attributes({
+            'male': True,
+            'age': 42,
+            'pi': 3.5,
+            'color': Color.red,
+            'feature': 'mustache',
+            'blob': b'x',
+            'now': datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc),
+        })
+
+        self.assertEqual({
+            'male': {'BOOL': True},
+            'age': {'N': '42'},
+            'pi': {'N': '3.5'},
+            'color': {'N': '3'},
+            'feature': {'S': 'mustache'},
+            'blob': {'B': b'eA=='},
+            'now': {'TS': '1577836800:0'},
+        }, typed_attributes)
+
+        with self.assertRaises(AttributeError):
+            v3io.dataplane.request._dict_to_typed_attributes({'set': {1, 2}})
+
+    def test_kv_array(self):
+        import numpy
+
+        for values, typecode in [
+            (array.array('q', [1, -2, 3]), None),
+            (array.array('i', [1, -2, 3]), None),
+            (array.array('d', [1.5, 2.5]), None),
+            (numpy.array([1, -2, 3]), None),
+            (numpy.array([1.5, 2.5], dtype=numpy.float32), None),
+            ([1, -2, 3], 'q'),
+        ]:
+            encoded_array = base64.b64decode(v3io.dataplane.kv_array.encode_array(values, typecode))
+
+            self.assertEqual(list(values), v3io.dataplane.kv_array.decode(encoded_array))
+
+            # an ndarray over the encoded array, of int64 or float64
+            decoded_array = v3io.dataplane.kv_array.decode(encoded_array, as_ndarray=True)
+            self.assertEqual(list(values), decoded_array.tolist())
+            self.assertEqual(8, decoded_array.itemsize)
+
+        self.assertEqual({'B': v3io.dataplane.kv_array.encode_list([1, 2])},
+                         v3io.dataplane.request._dict_to_typed_attributes({'a': numpy.array([1, 2])})['a'])
+
+    def test_sparse_array_column(self):
+        import v3io.dataplane.kv_columns
+
+        columns_builder = v3io.dataplane.kv_columns.ColumnsBuilder()
+        columns_builder.add_items([
+            {'arr': {'B': v3io.dataplane.kv_array.encode_list([1, 2])}},
+            {'x': {'N': '1'}},
+            {'arr': {'B': v3io.dataplane.kv_array.encode_list([3, 4])}, 'x': {'N': '2'}},
+        ])
+
+        columns = columns_builder.build()
+        self.assertEqual([[1, 2], None, [3, 4]], [None if value is None else value.tolist()
+                                                  for value in columns['arr']])
+        self.assertEqual([1, 2], columns['x'][1:].tolist())
+
+    def test_record_batch_pages(self):
+        import pyarrow
+        import v3io.dataplane.kv_arrow
+
+        first_page = [
+            {'n': {'N': '1'}, 'arr': {'B': v3io.dataplane.kv_array.encode_list([1, 2])}},
+            {'n': {'N': '2'}, 'arr': {'B': v3io.dataplane.kv_array.encode_list([3, 4])}},
+        ]
+        second_page = [
+            {'n': {'N': '2.5'}, 'arr': {'B': v3io.dataplane.kv_array.encode_list([0.5])}},
+            {'arr': {'B': v3io.dataplane.kv_array.encode_list([5, 6, 7])}},
+        ]
+
+        # integers in the first page don't fail on fractions in later ones
+        record_batch_builder = v3io.dataplane.kv_arrow.RecordBatchBuilder()
+        table = pyarrow.Table.from_batches([record_batch_builder.build(first_page),
+                                            record_batch_builder.build(second_page)])
+
+        self.assertEqual(pyarrow.float64(), table.schema.field('n').type)
+        self.assertEqual([1, 2, 2.5, None], table.column('n').to_pylist())
+        self.assertEqual(pyarrow.list_(pyarrow.float64()), table.schema.field('arr').type)
+        self.assertEqual([[1, 2], [3, 4], [0.5], [5, 6, 7]], table.column('arr').to_pylist())
+
+        # blob fields of a schema file holding arrays are lists
+        schema, _ = v3io.dataplane.kv_arrow.read_schema_file('{"fields": [{"name": "arr", "type": "blob"}]}')
+        record_batch_builder = v3io.dataplane.kv_arrow.RecordBatchBuilder(schema)
+        table = pyarrow.Table.from_batches([record_batch_builder.build(first_page),
+                                            record_batch_builder.build(second_page)])
+
+        self.assertEqual(['arr'], table.schema.names)
+        self.assertEqual([[1, 2], [3, 4], [0.5], [5, 6, 7]], table.column('arr').to_pylist())
+
+    def test_kv_timestamp(self):
+        import numpy
+
+        # far enough from the epoch that a float timestamp loses microseconds
+        now = datetime.datetime(2200, 1, 1, 0, 0, 0, 123457, tzinfo=datetime.timezone.utc)
+        self.assertEqual('7258118400:123457000', v3io.dataplane.kv_timestamp.encode(now))
+        self.assertEqual(now, v3io.dataplane.kv_timestamp.decode(v3io.dataplane.kv_timestamp.encode(now)))
+        self.assertEqual('-1:999999000', v3io.dataplane.kv_timestamp.encode(
+            datetime.datetime(1969, 12, 31, 23, 59, 59, 999999, tzinfo=datetime.timezone.utc)))
+
+        timestamps = numpy.array(['2020-01-01T00:00:00.123456789', 'NaT', '1969-12-31T23:59:59.999999999'],
+                                 dtype='datetime64[ns]')
+
+        encoded_timestamps = v3io.dataplane.kv_timestamp.encode_datetime64(timestamps)
+        self.assertEqual(['1577836800:123456789', None, '-1:999999999'], encoded_timestamps)
+
+        decoded_timestamps = v3io.dataplane.kv_timestamp.decode_datetime64(encoded_timestamps)
+        self.assertEqual(timestamps.dtype, decoded_timestamps.dtype)
+        numpy.testing.assert_array_equal(timestamps, decoded_timestamps)
@@ -13,6 +13,7 @@
 # limitations under the License.
 #
 import unittest
+import asyncio
 import os
 import array
 import datetime
@@ -99,6 +100,78 @@ class TestContainer(Test):
         # clean up
         await self._delete_dir(self._path)
 
+    async def test_walk(self):
+        object_paths = ['object-{0}.txt'.format(object_index) for object_index in range(3)]
+        for dir_index in range(3):
+            object_paths += ['dir-{0}/object-{1}.txt'.format(dir_index, object_index) for object_index in range(3)]
+
+        for object_path in object_paths:
+            await self._client.object.put(container=self._container, path=os.path.join(self._path, object_path), body='b')
+
+        expected_keys = set(os.path.join(self._path, object_path).lstrip('/') for object_path in object_paths)
+
+        # a small limit so that every directory spans several pages
+        contents = self._client.container.iter_contents(container=self._container, path=self._path, limit=2)
+        self.assertEqual(3, len([content async for content in contents]))
+
+        contents = self._client.container.iter_contents(container=self._container,
+                                                        path=self._path,
+                                                        limit=2,
+                                                        recursive=True)
+        self.assertEqual(expected_keys, set([content.key async for content in contents]))
+
+        # walk into dir-0 only
+        keys = set()
+        async for _, common_prefixes, contents in self._client.container.walk(container=self._container,
+                                                                               path=self._path,
+                                                                               limit=2):
+            keys.update(content.key for content in contents)
+            common_prefixes[:] = [common_prefix for common_prefix in common_prefixes if 'dir-0' in common_prefix.prefix]
+
+        self.assertEqual(set(key for key in expected_keys if 'dir-1' not in key and 'dir-2' not in key), keys)
+
+        # stop in the middle, while a page is prefetched
+        contents = self._client.container.iter_contents(container=self._container, path=self._path, limit=1)
+        await contents.__anext__()
+        await contents.aclose()
+
+        # clean up
+        for object_path in object_paths:
+            await self._client.object.delete(container=self._container, path=os.path.join(self._path, object_path))
+
+        await self._delete_dir(self._path)
+
+    async def test_walk_parallel(self):
+        object_paths = []
+        for dir_index in range(4):
+            for sub_dir_index in range(2):
+                object_paths += ['dir-{0}/sub-{1}/object-{2}.txt'.format(dir_index, sub_dir_index, object_index)
+                                 for object_index in range(3)]
+
+        for object_path in object_paths:
+            await self._client.object.put(container=self._container, path=os.path.join(self._path, object_path), body='b')
+
+        keys = []
+        async for _, _, contents in self._client.container.walk_parallel(container=self._container,
+                                                                          path=self._path,
+                                                                          workers=3,
+                                                                          limit=2):
+            keys += [content.key for content in contents]
+
+        self.assertEqual(sorted(os.path.join(self._path, object_path).lstrip('/') for object_path in object_paths),
+                         sorted(keys))
+
+        # stop in the middle
+        pages = self._client.container.walk_parallel(container=self._container, path=self._path, workers=3, limit=1)
+        await pages.__anext__()
+        await pages.aclose()
+
+        # clean up
+        for object_path in object_paths:
+            await self._client.object.delete(container=self._container, path=os.path.join(self._path, object_path))
+
+        await self._delete_dir(self._path)
+
 
 class TestStream(Test):
 
@@ -207,6 +280,126 @@ class TestStream(Test):
         await self._client.stream.delete(container=self._container,
                                          stream_path=self._path)
 
+    async def test_put_records_with_retries(self):
+        await self._client.stream.create(container=self._container,
+                                         stream_path=self._path,
+                                         shard_count=2)
+
+        records = [
+            {'shard_id': 0, 'data': 'first shard record #1'},
+            {'shard_id': 10, 'data': 'invalid shard record #1'},
+            {'shard_id': 1, 'data': 'second shard record #1'},
+            {'shard_id': 10, 'data': 'invalid shard record #2'},
+        ]
+
+        output = await self._client.stream.put_records_with_retries(container=self._container,
+                                                                    stream_path=self._path,
+                                                                    records=records,
+                                                                    max_retries=2,
+                                                                    retry_backoff_ms=1)
+
+        self.assertEqual(2, output.failed_record_count)
+        self.assertEqual([0, None, 1, None], [record.shard_id for record in output.records])
+        self.assertEqual([False, True, False, True], [bool(record.error_code) for record in output.records])
+
+        await self._client.stream.delete(container=self._container,
+                                         stream_path=self._path)
+
+    async def test_producer(self):
+        await self._client.stream.create(container=self._container,
+                                         stream_path=self._path,
+                                         shard_count=2)
+
+        async with self._client.stream.producer(container=self._container,
+                                                stream_path=self._path,
+                                                max_batch_records=16,
+                                                retry_backoff_ms=1) as producer:
+            futures = [await producer.send('record #{0}'.format(record_index), shard_id=record_index % 2)
+                       for record_index in range(100)]
+
+            # an invalid shard fails after the retries
+            invalid_future = await producer.send('invalid shard record', shard_id=10)
+
+        # all the sends were awaited
+        self.assertEqual(set(), producer._send_tasks)
+
+        for record_index, record_future in enumerate(futures):
+            self.assertEqual(record_index % 2, record_future.result().shard_id)
+
+        with self.assertRaises(v3io.dataplane.stream_producer.RecordError):
+            await invalid_future
+
+        # the records of every shard were put in order
+        for shard_id in range(2):
+            response = await self._client.stream.seek(container=self._container,
+                                                      stream_path=self._path,
+                                                      shard_id=shard_id,
+                                                      seek_type='EARLIEST')
+
+            response = await self._client.stream.get_records(container=self._container,
+                                                             stream_path=self._path,
+                                                             shard_id=shard_id,
+                                                             location=response.output.location)
+
+            self.assertEqual(['record #{0}'.format(record_index) for record_index in range(shard_id, 100, 2)],
+                             [record.data.decode('utf-8') for record in response.output.records])
+
+        await self._client.stream.delete(container=self._container,
+                                         stream_path=self._path)
+
+    async def test_consumer(self):
+        num_shards = 4
+
+        await self._client.stream.create(container=self._container,
+                                         stream_path=self._path,
+                                         shard_count=num_shards)
+
+        records = [{'shard_id': record_index % num_shards, 'data': 'record #{0}'.format(record_index)}
+                   for record_index in range(40)]
+
+        await self._client.stream.put_records(container=self._container,
+                                              stream_path=self._path,
+                                              records=records[:20])
+
+        async with self._client.stream.consumer(container=self._container,
+                                                stream_path=self._path,
+                                                start='EARLIEST',
+                                                limit=3,
+                                                poll_interval_ms=10) as consumer:
+
+            # records put while consuming are read too
+            await self._client.stream.put_records(container=self._container,
+                                                  stream_path=self._path,
+                                                  records=records[20:])
+
+            shard_records = {}
+            async for shard_id, record in consumer:
+                shard_records.setdefault(shard_id, []).append(record.data.decode('utf-8'))
+
+                if sum(len(shard_id_records) for shard_id_records in shard_records.values()) == len(records):
+                    break
+
+            self.assertEqual(list(range(num_shards)), consumer.shard_ids)
+            self.assertIsNone(await consumer.next_record(timeout=0.1))
+
+        # the records of every shard were read in order
+        for shard_id in range(num_shards):
+            self.assertEqual([record['data'] for record in records if record['shard_id'] == shard_id],
+                             shard_records[shard_id])
+
+        self.assertIsNone(await consumer.next_record())
+
+        # closing the consumer from another task ends the iteration of a reader waiting for a record
+        consumer = self._client.stream.consumer(container=self._container, stream_path=self._path)
+        reader = asyncio.ensure_future(consumer.next_record())
+        await asyncio.sleep(0.1)
+
+        await consumer.close()
+        self.assertIsNone(await asyncio.wait_for(reader, 5))
+
+        await self._client.stream.delete(container=self._container,
+                                         stream_path=self._path)
+
     async def _stream_exists(self):
         response = await self._client.stream.describe(container=self._container,
                                                       stream_path=self._path,
@@ -311,6 +504,42 @@ class TestObject(Test):
 
         self.assertEqual(response.body.decode('utf-8'), '567')
 
+    async def test_batch(self):
+        num_objects = 20
+        batch = self._client.create_batch(max_concurrency=4)
+
+        for object_index in range(num_objects):
+            batch.object.put(container=self._container,
+                             path=os.path.join(self._object_dir, str(object_index)),
+                             body=str(object_index))
+
+        for response in await batch.wait():
+            self.assertEqual(200, response.status_code)
+
+        # get the objects along with one that doesn't exist
+        for object_index in range(num_objects + 1):
+            batch.object.get(container=self._container, path=os.path.join(self._object_dir, str(object_index)))
+
+        results = await batch.wait()
+
+        # responses are in the order of the requests, the missing object's error is returned in its place
+        self.assertEqual(num_objects + 1, len(results))
+        for object_index in range(num_objects):
+            self.assertEqual(str(object_index), results[object_index].body.decode('utf-8'))
+
+        self.assertIsInstance(results[-1], v3io.dataplane.response.HttpResponseError)
+
+        # as completed yields the index of each request
+        for object_index in range(num_objects):
+            batch.object.get(container=self._container, path=os.path.join(self._object_dir, str(object_index)))
+
+        received_indices = set()
+        async for object_index, response in batch.as_completed():
+            self.assertEqual(str(object_index), response.body.decode('utf-8'))
+            received_indices.add(object_index)
+
+        self.assertEqual(set(range(num_objects)), received_indices)
+
 
 # class TestSchema(Test):
 #
@@ -553,6 +782,244 @@ class TestKv(Test):
 
         self.assertEqual(len(received_items), 30)
 
+    async def test_field_types(self):
+        for idx in range(10):
+            await self._client.kv.put(container=self._container,
+                                      table_path=self._path,
+                                      key=f'key-{idx}',
+                                      attributes={
+                                          'attr': idx,
+                                          'ratio': idx,
+                                      })
+
+        received_items = await self._client.kv.new_cursor(container=self._container,
+                                                          table_path=self._path,
+                                                          attribute_names=['attr', 'ratio'],
+                                                          field_types={'ratio': 'double'}).all()
+
+        self.assertEqual(10, len(received_items))
+        for received_item in received_items:
+            self.assertIsInstance(received_item['attr'], int)
+            self.assertIsInstance(received_item['ratio'], float)
+            self.assertEqual(received_item['attr'], received_item['ratio'])
+
+    async def test_cache(self):
+        cache = self._client.kv.new_cache(max_entries=2, ttl=60)
+
+        await cache.put(self._container, self._path, 'bob', {'age': 42})
+
+        for _ in range(3):
+            response = await cache.get(self._container, self._path, 'bob', attribute_names=['age'])
+            self.assertEqual(42, response.output.item['age'])
+
+        self.assertEqual(1, cache.misses)
+        self.assertEqual(2, cache.hits)
+
+        # a write through the cache invalidates the item
+        await cache.update(self._container, self._path, 'bob', attributes={'age': 43})
+        response = await cache.get(self._container, self._path, 'bob', attribute_names=['age'])
+        self.assertEqual(43, response.output.item['age'])
+        self.assertEqual(2, cache.misses)
+
+        # the least recently used entry is evicted
+        await cache.put(self._container, self._path, 'linda', {'age': 41})
+        await cache.get(self._container, self._path, 'linda')
+        await cache.get(self._container, self._path, 'linda', attribute_names=['age'])
+        await cache.get(self._container, self._path, 'bob', attribute_names=['age'])
+        self.assertEqual(5, cache.misses)
+
+        # missing items aren't cached
+        await cache.delete(self._container, self._path, 'linda')
+        for _ in range(2):
+            response = await cache.get(self._container,
+                                       self._path,
+                                       'linda',
+                                       raise_for_status=v3io.dataplane.RaiseForStatus.never)
+            self.assertEqual(404, response.status_code)
+
+        self.assertEqual(7, cache.misses)
+
+        # writes through the model invalidate the item too
+        async def _get_age():
+            response = await cache.get(self._container, self._path, 'bob', attribute_names=['age'])
+            return response.output.item['age']
+
+        self.assertEqual(43, await _get_age())
+        await self._client.kv.put(self._container, self._path, 'bob', {'age': 44})
+        self.assertEqual(44, await _get_age())
+        await self._client.kv.put_many(self._container, self._path, [('bob', {'age': 45})])
+        self.assertEqual(45, await _get_age())
+
+        # entries are per access key
+        await cache.get(self._container,
+                        self._path,
+                        'bob',
+                        access_key=self._client._access_key,
+                        attribute_names=['age'])
+        self.assertEqual(10, cache.misses)
+
+    async def test_prefetch(self):
+        for idx in range(100):
+            await self._client.kv.put(container=self._container,
+                                      table_path=self._path,
+                                      key=f'key-{idx}',
+                                      attributes={
+                                          'attr': idx,
+                                      })
+
+        received_items = await self._client.kv.new_cursor(container=self._container,
+                                                          table_path=self._path,
+                                                          prefetch=2).all()
+
+        self.assertEqual(list(range(100)), sorted(item['attr'] for item in received_items))
+
+        # stop reading in the middle
+        cursor = self._client.kv.new_cursor(container=self._container, table_path=self._path, limit=50, prefetch=2)
+        await cursor.next_item()
+        await cursor.close()
+
+    async def test_scan_to_dataframe(self):
+        for idx in range(10):
+            await self._client.kv.put(container=self._container,
+                                      table_path=self._path,
+                                      key=f'key-{idx:02}',
+                                      attributes={
+                                          'int': idx,
+                                          'str': str(idx),
+                                      })
+
+        data_frame = await self._client.kv.scan_to_dataframe(container=self._container,
+                                                             table_path=self._path,
+                                                             attribute_names=['int', 'str'])
+
+        data_frame = data_frame.sort_values('int')
+        self.assertEqual(list(range(10)), data_frame['int'].tolist())
+        self.assertEqual([str(idx) for idx in range(10)], data_frame['str'].tolist())
+
+    async def test_record_batches(self):
+        import pyarrow
+
+        for idx in range(10):
+            await self._client.kv.put(container=self._container,
+                                      table_path=self._path,
+                                      key=f'key-{idx:02}',
+                                      attributes={
+                                          'int': idx,
+                                          'str': str(idx),
+                                      })
+
+        record_batches = [record_batch async for record_batch in
+                          self._client.kv.scan_record_batches(container=self._container,
+                                                              table_path=self._path,
+                                                              attribute_names=['int', 'str'])]
+
+        table = pyarrow.Table.from_batches(record_batches)
+        self.assertEqual(list(range(10)), sorted(table.column('int').to_pylist()))
+        self.assertEqual([str(idx) for idx in range(10)], sorted(table.column('str').to_pylist()))
+
+    async def test_parallel_cursor(self):
+        for idx in range(100):
+            await self._client.kv.put(container=self._container,
+                                      table_path=self._path,
+                                      key=f'key-{idx}',
+                                      attributes={
+                                          'attr': idx,
+                                      })
+
+        for ordered in [False, True]:
+            received_items = await self._client.kv.new_parallel_cursor(container=self._container,
+                                                                       table_path=self._path,
+                                                                       total_segments=4,
+                                                                       attribute_names=['attr'],
+                                                                       ordered=ordered).all()
+
+            self.assertEqual(list(range(100)), sorted(item['attr'] for item in received_items))
+
+        # limit across all segments
+        cursor = self._client.kv.new_parallel_cursor(container=self._container,
+                                                     table_path=self._path,
+                                                     total_segments=4,
+                                                     limit=30)
+
+        self.assertEqual(30, len(await cursor.all()))
+
+        # more segments than connections are scanned a few at a time
+        received_items = await self._client.kv.new_parallel_cursor(container=self._container,
+                                                                   table_path=self._path,
+                                                                   total_segments=100,
+                                                                   attribute_names=['attr'],
+                                                                   ordered=True).all()
+
+        self.assertEqual(list(range(100)), sorted(item['attr'] for item in received_items))
+
+        # stop reading in the middle
+        cursor = self._client.kv.new_parallel_cursor(container=self._container,
+                                                     table_path=self._path,
+                                                     total_segments=4)
+        await cursor.next_item()
+        await cursor.close()
+
+        # a cursor's marker is that of the page being read - resuming from it reads the current item on
+        cursor = self._client.kv.new_cursor(container=self._container, table_path=self._path, attribute_names=['attr'])
+        current_item = [await cursor.next_item() for _ in range(50)][-1]
+        resumed_items = await self._client.kv.new_cursor(container=self._container,
+                                                         table_path=self._path,
+                                                         attribute_names=['attr'],
+                                                         marker=cursor.marker).all()
+
+        self.assertIn(current_item, resumed_items)
+        for item in await cursor.all():
+            self.assertIn(item, resumed_items)
+
+    async def test_put_many(self):
+        items = {'item-{0}'.format(item_index): {'age': item_index} for item_index in range(50)}
+
+        for concurrency in [None, 4]:
+            result = await self._client.kv.put_many(container=self._container,
+                                                    table_path=self._path,
+                                                    items=items.items(),
+                                                    concurrency=concurrency)
+
+            self.assertTrue(result.success)
+            self.assertEqual(len(items), result.success_count)
+            result.raise_for_status()
+
+        await self._verify_items(self._path, items)
+
+    async def test_get_many(self):
+        items = {'item-{0}'.format(item_index): {'age': item_index} for item_index in range(20)}
+
+        result = await self._client.kv.put_many(container=self._container,
+                                                table_path=self._path,
+                                                items=items.items())
+        result.raise_for_status()
+
+        keys = list(items.keys()) + ['item-0', 'missing']
+
+        received_items = []
+        async for key, item in self._client.kv.get_many(container=self._container,
+                                                        table_path=self._path,
+                                                        keys=keys,
+                                                        attribute_names=['age'],
+                                                        concurrency=4):
+            received_items.append((key, item))
+
+        self.assertEqual(len(keys), len(received_items))
+
+        # a repeated key is only fetched once and an item that doesn't exist is None
+        received_items = []
+        async for key, item in self._client.kv.get_many(container=self._container,
+                                                        table_path=self._path,
+                                                        keys=keys,
+                                                        attribute_names=['age'],
+                                                        dedupe=True):
+            received_items.append((key, item))
+
+        self.assertEqual(len(items) + 1, len(received_items))
+        received_items = dict(received_items)
+        self.assertIsNone(received_items.pop('missing'))
+        self.assertEqual(items, received_items)
+
     async def _delete_items(self, path, items):
 
         # delete items
@@ -629,3 +1096,37 @@ class TestRaiseForStatus(Test):
             return
 
         self.fail('Expected an exception')
+
+
+class TestConnectionLimit(Test):
+
+    async def asyncSetUp(self):
+        await super(TestConnectionLimit, self).asyncSetUp()
+
+        # replace the default client with one that can only open 2 connections
+        await self._client.close()
+        self._client = v3io.aio.dataplane.Client(max_connections=2,
+                                                 max_connections_per_host=2,
+                                                 keepalive_timeout=30,
+                                                 dns_cache_ttl=60)
+
+        self._object_dir = os.path.join(self._test_parent_dir, 'v3io-py-test-connection-limit')
+        self._object_path = self._object_dir + '/object.txt'
+
+        # clean up
+        await self._delete_dir(self._object_dir)
+
+    async def test_burst(self):
+        await self._client.object.put(container=self._container,
+                                      path=self._object_path,
+                                      body='burst')
+
+        # issue a burst of requests - they should all be served over the two connections
+        responses = await asyncio.gather(*[
+            self._client.object.get(container=self._container, path=self._object_path) for _ in range(64)
+        ])
+
+        self.assertEqual(2, self._client._transport._connector.limit)
+
+        for response in responses:
+            self.assertEqual(b'burst', response.body)
@@ -0,0 +1,136 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import asyncio
+import collections
+import functools
+import itertools
+
+
+class Batch(object):
+
+    def __init__(self, client, max_concurrency=None):
+        """Creates a batch of requests, which are only sent when the batch is waited on. Up to max_concurrency
+        requests are in flight at any given time (defaults to the client's max_connections)
+        """
+        self._client = client
+        self._transport = client._transport
+        self._max_concurrency = max_concurrency or self._transport.max_connections
+        self._calls = collections.deque()
+        self.kv = lambda: None
+        self.object = lambda: None
+        self.stream = lambda: None
+        self.container = lambda: None
+
+        for model_name, model_call in [
+            ('kv', 'put'),
+            ('kv', 'get'),
+            ('kv', 'scan'),
+            ('kv', 'update'),
+            ('kv', 'delete'),
+            ('object', 'head'),
+            ('object', 'put'),
+            ('object', 'get'),
+            ('object', 'delete'),
+            ('stream', 'create'),
+            ('stream', 'update'),
+            ('stream', 'delete'),
+            ('stream', 'describe'),
+            ('stream', 'seek'),
+            ('stream', 'put_records'),
+            ('stream', 'get_records'),
+            ('container', 'list'),
+        ]:
+            setattr(getattr(self, model_name),
+                    model_call,
+                    functools.partial(self._call_model, model_name, model_call))
+
+    def _call_model(self, model_name, model_call, *args, **kw_args):
+
+        # get the model (kv, object, ...)
+        model = getattr(self._client, model_name)
+
+        # don't create the coroutine yet - it's only created once there's room for it to run
+        self._calls.append(functools.partial(getattr(model, model_call), *args, **kw_args))
+
+    async def wait(self, return_exceptions=True):
+        """Sends the requests added to the batch and waits for all of their responses.
+
+        Parameters
+        ----------
+        return_exceptions (Optional) : bool
+            If True (the default), an exception raised by a request is returned in its place and the rest of
+            the requests complete. If False, the first exception is raised and the requests still in flight
+            are cancelled
+
+        Return Value
+        ----------
+        A list of `Response` objects (or exceptions), in the order the requests were added to the batch
+        """
+        results = [None] * len(self._calls)
+
+        async for call_index, result in self.as_completed(return_exceptions):
+            results[call_index] = result
+
+        return results
+
+    async def as_completed(self, return_exceptions=True):
+        """Sends the requests added to the batch and yields their responses as they are received.
+
+        Parameters
+        ----------
+        return_exceptions (Optional) : bool
+            See wait()
+
+        Return Value
+        ----------
+        An async generator of (index, `Response` object or exception) tuples, in the order the responses were
+        received. index is the position of the request in the batch
+        """
+        calls = self._calls
+        num_calls = len(calls)
+        self._calls = collections.deque()
+
+        # bounded, so that workers don't read responses faster than the caller consumes them
+        results = asyncio.Queue(maxsize=self._max_concurrency)
+        next_call_index = itertools.count()
+
+        async def _worker():
+            while calls:
+                call_index = next(next_call_index)
+                call = calls.popleft()
+
+                try:
+                    result = await call()
+                except Exception as e:
+                    result = e
+
+                await results.put((call_index, result))
+
+        # a fixed number of workers, rather than a task per request, so that memory doesn't grow with the batch
+        workers = [asyncio.ensure_future(_worker()) for _ in range(min(self._max_concurrency, num_calls))]
+
+        try:
+            for _ in range(num_calls):
+                call_index, result = await results.get()
+
+                if isinstance(result, Exception) and not return_exceptions:
+                    raise result
+
+                yield call_index, result
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+            await asyncio.gather(*workers, return_exceptions=True)
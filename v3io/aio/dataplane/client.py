@@ -24,6 +24,7 @@ import v3io.dataplane.response
 import v3io.dataplane.output
 import v3io.dataplane.kv_cursor
 import v3io.aio.dataplane.transport.aiohttp
+import v3io.aio.dataplane.batch
 import v3io.common.helpers
 import v3io.logger
 
@@ -38,7 +39,10 @@ class Client(object):
                  timeout=None,
                  logger_verbosity=None,
                  transport_verbosity='info',
-                 retry_intervals=None):
+                 retry_intervals=None,
+                 max_connections_per_host=None,
+                 keepalive_timeout=None,
+                 dns_cache_ttl=None):
         """Creates a v3io client, used to access v3io
 
         Parameters
@@ -64,6 +68,13 @@ class Client(object):
             'logger_verbosity' must be set to DEBUG
         retry_intervals (Optional) : tuple of float
             Tuple of intervals to use for exponential backoff in case of retries
+        max_connections_per_host (Optional) : int
+            The max number of connections towards a single host (out of max_connections). Defaults to no
+            per-host limit
+        keepalive_timeout (Optional) : float
+            Number of seconds an idle connection is kept open for reuse. Defaults to aiohttp's default (15)
+        dns_cache_ttl (Optional) : float
+            Number of seconds a resolved endpoint address is cached for. Defaults to aiohttp's default (10)
 
         Return Value
         ----------
@@ -81,11 +92,31 @@ class Client(object):
                                                                          max_connections,
                                                                          timeout,
                                                                          transport_verbosity,
-                                                                         retry_intervals)
+                                                                         retry_intervals,
+                                                                         max_connections_per_host,
+                                                                         keepalive_timeout,
+                                                                         dns_cache_ttl)
 
         # create models
         self.kv, self.object, self.stream, self.container = self._create_models()
 
+        # create a default "batch" object
+        self.batch = self.create_batch()
+
+    def create_batch(self, max_concurrency=None):
+        """Creates a batch of requests which are sent concurrently when the batch is waited on
+
+        Parameters
+        ----------
+        max_concurrency (Optional) : int
+            The max number of requests in flight at any given time. Defaults to max_connections
+
+        Return Value
+        ----------
+        A `Batch` object
+        """
+        return v3io.aio.dataplane.batch.Batch(self, max_concurrency)
+
     async def close(self):
         await self._transport.close()
 
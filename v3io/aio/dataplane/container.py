@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import asyncio
+import collections
+
 import v3io.dataplane.request
 import v3io.dataplane.output
 import v3io.dataplane.model
@@ -67,3 +70,214 @@ class Model(v3io.dataplane.model.Model):
                                              v3io.dataplane.request.encode_get_container_contents,
                                              locals(),
                                              v3io.dataplane.output.GetContainerContentsOutput)
+
+    async def iter_contents(self,
+                            container,
+                            path,
+                            access_key=None,
+                            get_all_attributes=None,
+                            limit=None,
+                            recursive=False):
+        """Iterates over the objects in a path, transparently paging through the listing. The next page is
+        requested while the current one is consumed.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path within the container
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        get_all_attributes (Optional) : bool
+            False (default) - retrieves basic attributes
+            True - retrieves all attributes of the underlying objects
+        limit (Optional) : int
+            Number of objects/directories to receive per page. default: 1000
+        recursive (Optional) : bool
+            False (default) - only the objects directly under path
+            True - the objects in all the directories under path as well
+
+        Return Value
+        ----------
+        An async generator of `ContainerContent` objects.
+        """
+        async for _, _, contents in self._walk(container, path, access_key, get_all_attributes, None, limit, recursive):
+            for content in contents:
+                yield content
+
+    def walk(self,
+             container,
+             path,
+             access_key=None,
+             get_all_attributes=None,
+             directories_only=None,
+             limit=None):
+        """Walks the directory tree under a path, one listing page at a time. Every directory is listed after
+        the directory that contains it. The next page is requested while the current one is consumed.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path within the container
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        get_all_attributes (Optional) : bool
+            False (default) - retrieves basic attributes
+            True - retrieves all attributes of the underlying objects
+        directories_only (Optional) : bool
+            False (default) - retrieves objects (contents) and directories (common prefixes)
+            True - retrieves only directories (common prefixes)
+        limit (Optional) : int
+            Number of objects/directories to receive per page. default: 1000
+
+        Return Value
+        ----------
+        An async generator of (path, common_prefixes, contents) tuples - one per page. As with os.walk, removing
+        common prefixes from the list before resuming the generator prevents walking into them.
+        """
+        return self._walk(container, path, access_key, get_all_attributes, directories_only, limit, True)
+
+    async def walk_parallel(self,
+                            container,
+                            path,
+                            workers=None,
+                            access_key=None,
+                            get_all_attributes=None,
+                            directories_only=None,
+                            limit=None):
+        """Walks the directory tree under a path, listing up to `workers` directories concurrently. Pages are
+        yielded as they are received, so pages of different directories are interleaved. Unlike walk(), the walk
+        can't be pruned - directories are queued for listing as soon as they are seen.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path within the container
+        workers (Optional) : int
+            The number of directories listed concurrently. Defaults to max_connections
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        get_all_attributes (Optional) : bool
+            False (default) - retrieves basic attributes
+            True - retrieves all attributes of the underlying objects
+        directories_only (Optional) : bool
+            False (default) - retrieves objects (contents) and directories (common prefixes)
+            True - retrieves only directories (common prefixes)
+        limit (Optional) : int
+            Number of objects/directories to receive per page. default: 1000
+
+        Return Value
+        ----------
+        An async generator of (path, common_prefixes, contents) tuples - one per page.
+        """
+        workers = workers or self._transport.max_connections
+
+        # directories to list, and the number of directories that are queued or being listed. once that reaches
+        # zero, the walk is done
+        pending_paths = asyncio.Queue()
+        pending_paths.put_nowait(path)
+        num_pending_paths = 1
+
+        # bounded, so that workers don't list faster than the caller consumes
+        pages = asyncio.Queue(maxsize=workers)
+
+        async def _worker():
+            nonlocal num_pending_paths
+
+            try:
+                while True:
+                    directory_path = await pending_paths.get()
+                    if directory_path is None:
+                        break
+
+                    try:
+                        async for page in self._walk(container,
+                                                     directory_path,
+                                                     access_key,
+                                                     get_all_attributes,
+                                                     directories_only,
+                                                     limit,
+                                                     False):
+                            num_pending_paths += len(page[1])
+
+                            for common_prefix in page[1]:
+                                pending_paths.put_nowait(common_prefix.prefix)
+
+                            await pages.put(page)
+                    finally:
+                        num_pending_paths -= 1
+
+                        if num_pending_paths == 0:
+                            for _ in range(workers):
+                                pending_paths.put_nowait(None)
+
+            except Exception as e:
+                await pages.put(e)
+
+            # a cancelled worker doesn't get here, but by then no one is waiting on it
+            await pages.put(None)
+
+        worker_tasks = [asyncio.ensure_future(_worker()) for _ in range(workers)]
+        num_running_workers = len(worker_tasks)
+
+        try:
+            while num_running_workers:
+                page = await pages.get()
+
+                if page is None:
+                    num_running_workers -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield page
+        finally:
+            for worker_task in worker_tasks:
+                worker_task.cancel()
+
+            await asyncio.gather(*worker_tasks, return_exceptions=True)
+
+    async def _walk(self, container, path, access_key, get_all_attributes, directories_only, limit, recursive):
+        list_kw_args = {
+            'access_key': access_key,
+            'get_all_attributes': get_all_attributes,
+            'directories_only': directories_only,
+            'limit': limit,
+        }
+
+        # directories that were yet to be listed
+        pending_paths = collections.deque()
+        inflight_page = self._send_list_request(container, path, None, list_kw_args)
+
+        try:
+            while inflight_page is not None:
+                page_path, inflight_request = inflight_page
+                inflight_page = None
+
+                output = (await inflight_request).output
+
+                # request the next page before handing this one over. take the next directory before this page's
+                # directories are added, so that the caller may still prune them
+                if output.is_truncated == 'true' and output.next_marker:
+                    inflight_page = self._send_list_request(container, page_path, output.next_marker, list_kw_args)
+                elif pending_paths:
+                    inflight_page = self._send_list_request(container, pending_paths.pop(), None, list_kw_args)
+
+                yield page_path, output.common_prefixes, output.contents
+
+                if recursive:
+                    pending_paths.extend(common_prefix.prefix for common_prefix in output.common_prefixes)
+
+                    if inflight_page is None and pending_paths:
+                        inflight_page = self._send_list_request(container, pending_paths.pop(), None, list_kw_args)
+        finally:
+            if inflight_page is not None:
+                inflight_page[1].cancel()
+                await asyncio.gather(inflight_page[1], return_exceptions=True)
+
+    def _send_list_request(self, container, path, marker, list_kw_args):
+        return path, asyncio.ensure_future(self.list(container, path, marker=marker, **list_kw_args))
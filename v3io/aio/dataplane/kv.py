@@ -12,12 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import asyncio
 import os
+import weakref
 
 import v3io.dataplane.request
+import v3io.dataplane.response
 import v3io.dataplane.output
+import v3io.dataplane.transport
 import v3io.dataplane.model
 import v3io.aio.dataplane.kv_cursor
+import v3io.aio.dataplane.kv_cache
 
 
 class Model(v3io.dataplane.model.Model):
@@ -27,6 +32,9 @@ class Model(v3io.dataplane.model.Model):
         self._access_key = client._access_key
         self._transport = client._transport
 
+        # the caches created by new_cache(), whose entries of an item are invalidated when it's written
+        self._caches = weakref.WeakSet()
+
     def new_cursor(self,
                    container,
                    table_path,
@@ -40,7 +48,9 @@ class Model(v3io.dataplane.model.Model):
                    segment=None,
                    total_segments=None,
                    sort_key_range_start=None,
-                   sort_key_range_end=None):
+                   sort_key_range_end=None,
+                   prefetch=None,
+                   field_types=None):
         return v3io.aio.dataplane.kv_cursor.Cursor(self._client,
                                                    container,
                                                    access_key or self._access_key,
@@ -54,7 +64,205 @@ class Model(v3io.dataplane.model.Model):
                                                    segment,
                                                    total_segments,
                                                    sort_key_range_start,
-                                                   sort_key_range_end)
+                                                   sort_key_range_end,
+                                                   prefetch,
+                                                   field_types)
+
+    def new_parallel_cursor(self,
+                            container,
+                            table_path,
+                            total_segments,
+                            access_key=None,
+                            raise_for_status=None,
+                            attribute_names='*',
+                            filter_expression=None,
+                            limit=None,
+                            ordered=False,
+                            field_types=None):
+        """Creates a cursor that scans the segments of a table concurrently and merges their items. Up to
+        max_connections tasks scan a segment at a time each.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        total_segments (Required) : int
+            The number of segments into which to divide the table scan - 1 to 1024. Segments beyond max_connections
+            are scanned once others are done
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        attribute_names (Optional) : []str or '*'
+            A list of attribute names to get, or '*' which will retreive all attributes
+        filter_expression (Optional) : str
+            A filter expression that restricts the items to retrieve. Only items that match the filter criteria
+            are returned.
+        limit (Optional) : int
+            The maximum number of items to return, across all segments
+        ordered (Optional) : bool
+            False (default) - items are returned as soon as their page is received, in no particular order
+            True - the items of each segment are returned in order, segment after segment
+        field_types (Optional) : dict
+            Attribute name -> schema field type (as passed to create_schema - long, double, string, boolean,
+            timestamp, blob). Values are parsed as their field type directly. The types of other attributes are
+            learned from the first page
+
+        Return Value
+        ----------
+        A `ParallelCursor` object. If it isn't read to the end, it must be closed with close()
+        """
+        return v3io.aio.dataplane.kv_cursor.ParallelCursor(self._client,
+                                                           container,
+                                                           access_key or self._access_key,
+                                                           table_path,
+                                                           total_segments,
+                                                           raise_for_status,
+                                                           attribute_names,
+                                                           filter_expression,
+                                                           limit,
+                                                           ordered,
+                                                           field_types=field_types)
+
+    def new_cache(self, max_entries=1024, ttl=60.0):
+        """Creates a read through cache of items in front of this model. Gets through the cache are served from
+        memory when possible. Puts, updates and deletes through this model (including put_many() and batches)
+        invalidate the cached item - writes made elsewhere are only seen once the entries expire.
+
+        Parameters
+        ----------
+        max_entries (Optional) : int
+            The max number of cached get responses. Once reached, the least recently used is evicted
+        ttl (Optional) : float
+            The number of seconds a response is served from the cache. If None, until it's evicted or invalidated
+            (only if all writes to the cached items are made through this model)
+
+        Return Value
+        ----------
+        A `Cache` object, with get(), put(), update() and delete() like those of this model, and hits / misses
+        counters
+        """
+        cache = v3io.aio.dataplane.kv_cache.Cache(self, max_entries, ttl)
+        self._caches.add(cache)
+
+        return cache
+
+    def invalidate_cached_item(self, container, table_path, key):
+        """Removes the entries of an item from the caches created by new_cache(). Called on every write to the
+        item through this model"""
+        for cache in list(self._caches):
+            cache.invalidate(container, table_path, key)
+
+    async def scan_to_dataframe(self,
+                                container,
+                                table_path,
+                                access_key=None,
+                                raise_for_status=None,
+                                attribute_names='*',
+                                filter_expression=None,
+                                limit=None,
+                                prefetch=None):
+        """Scans a table into a pandas DataFrame, with a column per attribute. Items are decoded straight into
+        NumPy arrays, without creating a dict per item. Requires pandas. See
+        v3io.dataplane.kv_columns.ColumnsBuilder for how attributes are converted.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        attribute_names (Optional) : []str or '*'
+            A list of attribute names to get, or '*' which will retreive all attributes
+        filter_expression (Optional) : str
+            A filter expression that restricts the items to retrieve. Only items that match the filter criteria
+            are returned.
+        limit (Optional) : int
+            The maximum number of items to return
+        prefetch (Optional) : int
+            The number of pages to read ahead while the current one is decoded
+
+        Return Value
+        ----------
+        A `pandas.DataFrame`, with a row per item
+        """
+        import v3io.dataplane.kv_columns
+
+        cursor = self.new_cursor(container,
+                                 table_path,
+                                 access_key=access_key,
+                                 raise_for_status=raise_for_status,
+                                 attribute_names=attribute_names,
+                                 filter_expression=filter_expression,
+                                 limit=limit,
+                                 prefetch=prefetch)
+
+        return v3io.dataplane.kv_columns.to_dataframe(await cursor.to_columns())
+
+    async def scan_record_batches(self,
+                                  container,
+                                  table_path,
+                                  access_key=None,
+                                  raise_for_status=None,
+                                  attribute_names='*',
+                                  filter_expression=None,
+                                  limit=None,
+                                  prefetch=None,
+                                  schema=None):
+        """Scans a table as arrow record batches, one per page. Items are decoded straight into columns, without
+        creating a dict per item. Requires pyarrow.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        attribute_names (Optional) : []str or '*'
+            A list of attribute names to get, or '*' which will retreive all attributes
+        filter_expression (Optional) : str
+            A filter expression that restricts the items to retrieve. Only items that match the filter criteria
+            are returned.
+        limit (Optional) : int
+            The maximum number of items to return
+        prefetch (Optional) : int
+            The number of pages to read ahead while the current one is decoded
+        schema (Optional) : pyarrow.Schema
+            The schema of the record batches. If not passed, the table's schema file (see create_schema) is used.
+            If the table has no schema file, the schema is inferred from the first page
+
+        Return Value
+        ----------
+        An async generator of `pyarrow.RecordBatch` objects, all with the same schema
+        """
+        import v3io.dataplane.kv_arrow
+
+        key = None
+
+        if schema is None:
+            response = await self._client.object.get(container,
+                                                     os.path.join(table_path, '.#schema'),
+                                                     access_key=access_key,
+                                                     raise_for_status=[200, 404])
+
+            if response.status_code == 200:
+                schema, key = v3io.dataplane.kv_arrow.read_schema_file(response.body)
+
+        cursor = self.new_cursor(container,
+                                 table_path,
+                                 access_key=access_key,
+                                 raise_for_status=raise_for_status,
+                                 attribute_names=attribute_names,
+                                 filter_expression=filter_expression,
+                                 limit=limit,
+                                 prefetch=prefetch)
+
+        async for record_batch in cursor.to_record_batches(schema, key):
+            yield record_batch
 
     async def put(self,
                   container,
@@ -72,8 +280,9 @@ class Model(v3io.dataplane.model.Model):
 
         Notes:
         1. To provide arrays, pass either a list of integers ([1, 2, 3]), a list of floats ([1.0, 2.0, 3.0]) an
-           array.array with a typecode of either 'l' (integer) or 'd' (float). The response will always either be
-           a list of integers or a list of floats (never an array.array)
+           array.array with a typecode of either 'l' (integer) or 'd' (float) or a 1D numpy.ndarray (integers are
+           stored as int64, floats as float64). The response will always either be a list of integers or a list
+           of floats (never an array.array)
         2. To provide a timestamp, pass a datetime.datetime. Whatever the timezone, it will be stored as UTC and
            a UTC datetime will be retreived when read
 
@@ -103,11 +312,62 @@ class Model(v3io.dataplane.model.Model):
         A `Response` object.
         """
 
-        return await self._transport.request(container,
-                                             access_key or self._access_key,
-                                             raise_for_status,
-                                             v3io.dataplane.request.encode_put_item,
-                                             locals())
+        try:
+            return await self._transport.request(container,
+                                                 access_key or self._access_key,
+                                                 raise_for_status,
+                                                 v3io.dataplane.request.encode_put_item,
+                                                 locals())
+        finally:
+            self.invalidate_cached_item(container, table_path, key)
+
+    async def put_many(self,
+                       container,
+                       table_path,
+                       items,
+                       access_key=None,
+                       concurrency=None):
+        """Writes many items, each replacing the existing item with the same key (see put()). Requests are
+        sent concurrently. A failed item doesn't stop the others from being written - failures are
+        reported in the result.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        items (Required) : iterable of (key, attributes) tuples
+            The items to write (e.g. dict.items()). Consumed lazily, as requests are sent
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        concurrency (Optional) : int
+            The number of requests in flight at any given time. Defaults to max_connections
+
+        Return Value
+        ----------
+        A `BulkWriteResult` object, with the number of items written and an `ItemFailure` (key, status code
+        and body) per item that wasn't. Call its raise_for_status() to raise if any item failed
+        """
+        never = v3io.dataplane.transport.RaiseForStatus.never
+        items = iter(items)
+        result = v3io.dataplane.response.BulkWriteResult()
+
+        # workers share the items iterator, each taking the next item once its previous one was written
+        async def _worker():
+            for key, attributes in items:
+                response = await self.put(container,
+                                          table_path,
+                                          key,
+                                          attributes,
+                                          access_key=access_key,
+                                          raise_for_status=never)
+
+                result.add_response(key, response)
+
+        await _run_workers(_worker, concurrency or self._transport.max_connections)
+
+        return result
 
     async def update(self,
                      container,
@@ -162,11 +422,14 @@ class Model(v3io.dataplane.model.Model):
         ----------
         A `Responses` object.
         """
-        return await self._transport.request(container,
-                                             access_key or self._access_key,
-                                             raise_for_status,
-                                             v3io.dataplane.request.encode_update_item,
-                                             locals())
+        try:
+            return await self._transport.request(container,
+                                                 access_key or self._access_key,
+                                                 raise_for_status,
+                                                 v3io.dataplane.request.encode_update_item,
+                                                 locals())
+        finally:
+            self.invalidate_cached_item(container, table_path, key)
 
     async def get(self,
                   container,
@@ -203,6 +466,56 @@ class Model(v3io.dataplane.model.Model):
                                              locals(),
                                              v3io.dataplane.output.GetItemOutput)
 
+    async def get_many(self,
+                       container,
+                       table_path,
+                       keys,
+                       access_key=None,
+                       attribute_names='*',
+                       dedupe=False,
+                       concurrency=None):
+        """Retrieves the requested attributes of many table items (see get()), yielding each item as soon as its
+        response is received. Requests are sent concurrently, so that fetching many items takes
+        about as long as fetching max_connections items one at a time.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        keys (Required) : iterable of str
+            The item key names
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        attribute_names (Optional) : []str or '*'
+            A list of attribute names to get, or '*' which will retreive all attributes
+        dedupe (Optional) : bool
+            If True, a key that appears more than once is only fetched (and yielded) once
+        concurrency (Optional) : int
+            The number of requests in flight at any given time. Defaults to max_connections
+
+        Return Value
+        ----------
+        An async generator of (key, item) tuples. The order isn't guaranteed to be that of the keys - match items by
+        the key in the tuple. item is a dict of attributes, or None if the item doesn't exist. Any other failure
+        is raised as an `HttpResponseError`
+        """
+        # keeps the order of the keys
+        keys = list(dict.fromkeys(keys) if dedupe else keys)
+        batch = self._client.create_batch(max_concurrency=concurrency)
+
+        for key in keys:
+            batch.kv.get(container,
+                         table_path,
+                         key,
+                         access_key=access_key,
+                         raise_for_status=[200, 404],
+                         attribute_names=attribute_names)
+
+        async for key_index, response in batch.as_completed(return_exceptions=False):
+            yield keys[key_index], response.output.item if response.status_code == 200 else None
+
     async def scan(self,
                    container,
                    table_path,
@@ -300,11 +613,13 @@ class Model(v3io.dataplane.model.Model):
         ----------
         A `Response` object.
         """
-        return self._client.delete_object(container,
-                                          os.path.join(table_path, key),
-                                          access_key,
-                                          raise_for_status,
-                                          transport_actions)
+        try:
+            return await self._client.object.delete(container,
+                                                    os.path.join(table_path, key),
+                                                    access_key,
+                                                    raise_for_status)
+        finally:
+            self.invalidate_cached_item(container, table_path, key)
 
     async def create_schema(self,
                             container,
@@ -361,3 +676,17 @@ class Model(v3io.dataplane.model.Model):
                                              raise_for_status,
                                              v3io.dataplane.request.encode_put_object,
                                              put_object_args)
+
+
+async def _run_workers(worker, num_workers):
+    """Runs num_workers instances of a worker coroutine until they all complete. If one fails, the rest are
+    cancelled and the error is raised"""
+    worker_tasks = [asyncio.ensure_future(worker()) for _ in range(num_workers)]
+
+    try:
+        await asyncio.gather(*worker_tasks)
+    finally:
+        for worker_task in worker_tasks:
+            worker_task.cancel()
+
+        await asyncio.gather(*worker_tasks, return_exceptions=True)
@@ -0,0 +1,88 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import v3io.dataplane.kv_cache
+
+
+class Cache(object):
+
+    def __init__(self, kv, max_entries=1024, ttl=60.0):
+        """A read through cache of items, in front of a KV model. See v3io.dataplane.kv_cache.Cache
+
+        Parameters
+        ----------
+        kv (Required) : v3io.aio.dataplane.kv.Model
+            The model through which items are read and written
+        max_entries (Optional) : int
+            The max number of cached responses. Once reached, the least recently used is evicted
+        ttl (Optional) : float
+            The number of seconds a response is served from the cache. If None, until it's evicted or invalidated
+        """
+        self._kv = kv
+        self.entries = v3io.dataplane.kv_cache.Entries(max_entries, ttl)
+
+    @property
+    def hits(self):
+        return self.entries.hits
+
+    @property
+    def misses(self):
+        return self.entries.misses
+
+    async def get(self, container, table_path, key, access_key=None, raise_for_status=None, attribute_names='*'):
+        """Retrieves the requested attributes of a table item, from the cache if possible (see kv.get()). Only
+        successful responses are cached.
+
+        Return Value
+        ----------
+        A `Response` object, whose `output` is `GetItemOutput`.
+        """
+        entry_key = v3io.dataplane.kv_cache.get_entry_key(container, table_path, key, attribute_names, access_key)
+
+        response = self.entries.get(entry_key)
+        if response is not None:
+            return response
+
+        # an item written while the get is in flight isn't cached
+        version = self.entries.version
+        response = await self._kv.get(container,
+                                      table_path,
+                                      key,
+                                      access_key=access_key,
+                                      raise_for_status=raise_for_status,
+                                      attribute_names=attribute_names)
+
+        if response.status_code == 200:
+            self.entries.set(entry_key, response, version)
+
+        return response
+
+    async def put(self, container, table_path, key, attributes, **kw_args):
+        """Puts an item (see kv.put()), which invalidates its cached entries"""
+        return await self._kv.put(container, table_path, key, attributes, **kw_args)
+
+    async def update(self, container, table_path, key, **kw_args):
+        """Updates an item (see kv.update()), which invalidates its cached entries"""
+        return await self._kv.update(container, table_path, key, **kw_args)
+
+    async def delete(self, container, table_path, key, **kw_args):
+        """Deletes an item (see kv.delete()), which invalidates its cached entries"""
+        return await self._kv.delete(container, table_path, key, **kw_args)
+
+    def invalidate(self, container, table_path, key):
+        """Removes the cached entries of an item, e.g. after it was written elsewhere"""
+        self.entries.invalidate(container, table_path, key)
+
+    def clear(self):
+        self.entries.clear()
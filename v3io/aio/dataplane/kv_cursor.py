@@ -12,6 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import asyncio
+
+import v3io.dataplane.kv_cursor
+import v3io.dataplane.output
+
+
 class Cursor(object):
 
     def __init__(self,
@@ -28,11 +34,14 @@ class Cursor(object):
                  segment=None,
                  total_segments=None,
                  sort_key_range_start=None,
-                 sort_key_range_end=None):
+                 sort_key_range_end=None,
+                 prefetch=None,
+                 field_types=None):
         self._context = context
         self._container_name = container_name
         self._access_key = access_key
-        self._current_response = None
+        self._pages = None
+        self._current_output = None
         self._current_items = None
         self._current_item = None
         self._current_item_index = 0
@@ -51,55 +60,305 @@ class Cursor(object):
         self.sort_key_range_start = sort_key_range_start
         self.sort_key_range_end = sort_key_range_end
 
+        # number of pages to read ahead in the background, while the current page is consumed
+        self.prefetch = prefetch
+
+        # decodes the items of every page. the types of attributes that aren't in field_types (schema field
+        # types, see v3io.dataplane.output.TypedAttributesDecoder) are learned from the first page
+        self._decoder = v3io.dataplane.output.TypedAttributesDecoder(field_types, learn=True)
+
     async def next_item(self):
-        calculated_limit = self.limit
 
-        # check if we already reached the limit we were asked for
-        if self.limit is not None:
+        # if we already passed the limit, stop here
+        if self.limit is not None and self._total_items_read >= self.limit:
+            return None
+
+        # if we don't have the item in memory (from the previous scan), get the next page
+        while self._current_item_index >= len(self._current_items or []):
+            if self._pages is None:
+                self._pages = self._iter_prefetched_pages() if self.prefetch else self._iter_pages()
 
-            # if we already passed the limit, stop here
-            if self._total_items_read >= self.limit:
+            output = await self._anext(self._pages, None)
+            if output is None:
                 return None
 
+            self._set_current_output(output)
+            self._current_items = self._decoder.decode_items(output.typed_items)
+            self._current_item_index = 0
+
+        self._current_item = self._current_items[self._current_item_index]
+        self._current_item_index += 1
+        self._total_items_read += 1
+
+        return self._current_item
+
+    async def all(self):
+        items = []
+
+        while True:
+            item = await self.next_item()
+
+            if item is None:
+                break
+
+            items.append(item)
+
+        return items
+
+    async def to_columns(self):
+        """Reads the rest of the items straight into NumPy arrays, one per attribute, without creating a dict per
+        item. Requires numpy. See v3io.dataplane.kv_columns.ColumnsBuilder for how attributes are converted.
+
+        Return Value
+        ----------
+        A dict of attribute name -> NumPy array (one element per item)
+        """
+        import v3io.dataplane.kv_columns
+
+        columns_builder = v3io.dataplane.kv_columns.ColumnsBuilder()
+
+        async for typed_items in self._iter_remaining_typed_items():
+            columns_builder.add_items(typed_items)
+
+        return columns_builder.build()
+
+    async def to_record_batches(self, schema=None, key=None):
+        """Reads the rest of the items as arrow record batches, one per page. Requires pyarrow. See
+        v3io.dataplane.kv_arrow.RecordBatchBuilder for how the schema is applied or inferred.
+
+        Parameters
+        ----------
+        schema (Optional) : pyarrow.Schema
+            The schema of the record batches. If not passed, it's inferred from the first page
+        key (Optional) : str
+            The name of the key field, populated from the item names if the items don't have such an attribute
+
+        Return Value
+        ----------
+        An async generator of `pyarrow.RecordBatch` objects
+        """
+        import v3io.dataplane.kv_arrow
+
+        record_batch_builder = v3io.dataplane.kv_arrow.RecordBatchBuilder(schema, key)
+
+        async for typed_items in self._iter_remaining_typed_items():
+            if typed_items:
+                yield record_batch_builder.build(typed_items)
+
+    async def _iter_remaining_typed_items(self):
+
+        # the rest of the current page
+        if self._current_output is not None:
+            typed_items = self._current_output.typed_items[self._current_item_index:]
+            self._current_item_index = len(self._current_items)
+            self._total_items_read += len(typed_items)
+
+            yield typed_items
+
+        if self._pages is None:
+            self._pages = self._iter_prefetched_pages() if self.prefetch else self._iter_pages()
+
+        while True:
+            output = await self._anext(self._pages, None)
+            if output is None:
+                return
+
+            self._set_current_output(output)
+            self._current_items = output.typed_items
+            self._current_item_index = len(output.typed_items)
+            self._total_items_read += len(output.typed_items)
+
+            yield output.typed_items
+
+    async def close(self):
+        """Stops reading pages in the background. Only required if the cursor was created with prefetch and isn't
+        read to the end"""
+        if self._pages is not None:
+            await self._pages.aclose()
+
+    def _set_current_output(self, output):
+
+        # like the items, the marker is that of the page being read - pages read ahead don't move it
+        if self._current_output is not None:
+            self.marker = self._current_output.next_marker
+
+        self._current_output = output
+
+    async def _iter_prefetched_pages(self):
+        pages = asyncio.Queue(maxsize=self.prefetch)
+
+        async def _read_pages():
+            try:
+                async for page in self._iter_pages():
+                    await pages.put(page)
+
+            # hand the error over to the reader, instead of the end of the pages
+            except Exception as e:
+                await pages.put(e)
+                return
+
+            await pages.put(None)
+
+        read_pages_task = asyncio.ensure_future(_read_pages())
+
+        try:
+            while True:
+                page = await pages.get()
+
+                if page is None:
+                    return
+
+                if isinstance(page, Exception):
+                    raise page
+
+                yield page
+        finally:
+            read_pages_task.cancel()
+            await asyncio.gather(read_pages_task, return_exceptions=True)
+
+    @staticmethod
+    async def _anext(pages, default):
+        try:
+            return await pages.__anext__()
+        except StopAsyncIteration:
+            return default
+
+    async def _iter_pages(self, items_budget=None):
+        """Yields the output (GetItemsOutput) of every scan, starting at the cursor's marker and stopping once the
+        last page or the limit (or the items_budget, an ItemsBudget shared with other cursors) is reached.
+        Independent of next_item()"""
+        marker = self.marker
+        total_items_read = 0
+
+        while True:
+            calculated_limit = self.limit
+
             # don't ask for more items than we'll read
-            calculated_limit -= self._total_items_read
+            if self.limit is not None:
+                calculated_limit -= total_items_read
 
-        if self._current_item_index < len(self._current_items or []):
-            self._current_item = self._current_items[self._current_item_index]
-            self._current_item_index += 1
-            self._total_items_read += 1
+            if items_budget is not None:
+                calculated_limit = items_budget.get_page_limit(calculated_limit)
 
-            return self._current_item
+            if calculated_limit is not None and calculated_limit <= 0:
+                return
 
-        if self._current_response and (self._current_response.output.last or len(self._current_items) == 0):
-            return None
+            response = await self._context.kv.scan(self._container_name,
+                                                   self.table_path,
+                                                   self._access_key,
+                                                   self.raise_for_status,
+                                                   self.attribute_names,
+                                                   self.filter_expression,
+                                                   marker,
+                                                   self.sharding_key,
+                                                   calculated_limit,
+                                                   self.segment,
+                                                   self.total_segments,
+                                                   self.sort_key_range_start,
+                                                   self.sort_key_range_end)
+
+            # raise if there was an issue
+            response.raise_for_status(self.raise_for_status)
+
+            output = response.output
+            total_items_read += len(output.typed_items)
 
-        self.marker = self._current_response.output.next_marker if self._current_response else None
-
-        # get the next batch
-        self._current_response = await self._context.kv.scan(self._container_name,
-                                                             self.table_path,
-                                                             self._access_key,
-                                                             self.raise_for_status,
-                                                             self.attribute_names,
-                                                             self.filter_expression,
-                                                             self.marker,
-                                                             self.sharding_key,
-                                                             calculated_limit,
-                                                             self.segment,
-                                                             self.total_segments,
-                                                             self.sort_key_range_start,
-                                                             self.sort_key_range_end)
-
-        # raise if there was an issue
-        self._current_response.raise_for_status(self.raise_for_status)
-
-        # set items
-        self._current_items = self._current_response.output.items
+            if items_budget is not None:
+                items_budget.on_page(len(output.typed_items))
+
+            yield output
+
+            if output.last or len(output.typed_items) == 0:
+                return
+
+            marker = output.next_marker
+
+
+class ParallelCursor(object):
+
+    def __init__(self,
+                 context,
+                 container_name,
+                 access_key,
+                 table_path,
+                 total_segments,
+                 raise_for_status=None,
+                 attribute_names='*',
+                 filter_expression=None,
+                 limit=None,
+                 ordered=False,
+                 max_pages_per_segment=2,
+                 field_types=None):
+        """Scans the segments of a table concurrently and merges the items into a single cursor. Segments are
+        scanned by up to max_connections tasks, each taking the next segment once its current one is done. The
+        scans start on the first call to next_item().
+
+        Parameters
+        ----------
+        total_segments (Required) : int
+            The number of segments to divide the table into (1 to 1024)
+        limit (Optional) : int
+            The max number of items to read, across all segments. Each scan asks for at most its segment's share
+            of it, and the scans stop once it's reached
+        ordered (Optional) : bool
+            False (default) - items are returned in the order their pages were received
+            True - all the items of segment 0 are returned, then all those of segment 1, etc. Segments are still
+            scanned concurrently, but a segment that's ahead stops once it buffered max_pages_per_segment pages
+        max_pages_per_segment (Optional) : int
+            The max number of pages buffered per segment, waiting to be read
+        field_types (Optional) : dict
+            Attribute name -> schema field type, used to decode the items (see Cursor)
+        """
+        self.table_path = table_path
+        self.total_segments = total_segments
+        self.limit = limit
+        self.ordered = ordered
+        self._max_pages_per_segment = max_pages_per_segment
+        self._current_items = []
+        self._decoder = v3io.dataplane.output.TypedAttributesDecoder(field_types, learn=True)
         self._current_item_index = 0
+        self._total_items_read = 0
+        self._segment_pages = None
+        self._segment_tasks = []
+        self._num_running_segments = total_segments
+        self._current_segment = 0
 
-        # and recurse into next now that we repopulated response
-        return await self.next_item()
+        # segments beyond max_connections would only wait for a connection - a worker scans a segment at a time
+        self._num_workers = min(total_segments, context._transport.max_connections)
+        self._items_budget = None
+        if limit is not None:
+            self._items_budget = v3io.dataplane.kv_cursor.ItemsBudget(limit, self._num_workers)
+
+        self._segment_cursors = [Cursor(context,
+                                        container_name,
+                                        access_key,
+                                        table_path,
+                                        raise_for_status,
+                                        attribute_names,
+                                        filter_expression,
+                                        segment=segment,
+                                        total_segments=total_segments) for segment in range(total_segments)]
+
+    async def next_item(self):
+
+        # if we already passed the limit, stop here
+        if self.limit is not None and self._total_items_read >= self.limit:
+            await self.close()
+            return None
+
+        while self._current_item_index >= len(self._current_items):
+            items = await self._get_next_page_items()
+            if items is None:
+                return None
+
+            self._current_items = items
+            self._current_item_index = 0
+
+        item = self._current_items[self._current_item_index]
+        self._current_item_index += 1
+        self._total_items_read += 1
+
+        return item
 
     async def all(self):
         items = []
@@ -113,3 +372,67 @@ class Cursor(object):
             items.append(item)
 
         return items
+
+    async def close(self):
+        """Stops the segment scans. Must be called if the cursor isn't read to the end"""
+        self._num_running_segments = 0
+
+        for segment_task in self._segment_tasks:
+            segment_task.cancel()
+
+        await asyncio.gather(*self._segment_tasks, return_exceptions=True)
+
+    async def _get_next_page_items(self):
+        if self._segment_pages is None:
+            self._start_segment_scans()
+
+        while self._num_running_segments:
+            page = await self._segment_pages[self._current_segment].get()
+
+            if page is None:
+                self._num_running_segments -= 1
+
+                # in ordered mode, move on to the next segment's queue
+                if self.ordered and self._num_running_segments:
+                    self._current_segment += 1
+
+            elif isinstance(page, Exception):
+                await self.close()
+                raise page
+            else:
+                return self._decoder.decode_items(page.typed_items)
+
+        return None
+
+    def _start_segment_scans(self):
+
+        # in ordered mode each segment has its own queue, otherwise they share one
+        if self.ordered:
+            self._segment_pages = [asyncio.Queue(maxsize=self._max_pages_per_segment)
+                                   for _ in range(self.total_segments)]
+        else:
+            self._segment_pages = [asyncio.Queue(maxsize=self._max_pages_per_segment * self.total_segments)] * \
+                self.total_segments
+
+        # workers take the segments in order, so that in ordered mode the segment being read is always scanned
+        segment_cursors = iter(self._segment_cursors)
+
+        self._segment_tasks = [asyncio.ensure_future(self._scan_segments(segment_cursors))
+                               for _ in range(self._num_workers)]
+
+    async def _scan_segments(self, segment_cursors):
+        for segment_cursor in segment_cursors:
+            await self._scan_segment(segment_cursor, self._segment_pages[segment_cursor.segment], self._items_budget)
+
+    @staticmethod
+    async def _scan_segment(segment_cursor, pages, items_budget):
+        try:
+            async for page in segment_cursor._iter_pages(items_budget):
+                await pages.put(page)
+
+        # hand the error over to the reader, along with the end of the segment
+        except Exception as e:
+            await pages.put(e)
+            return
+
+        await pages.put(None)
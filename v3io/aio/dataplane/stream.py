@@ -12,12 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import asyncio
 import os
 
 import v3io.dataplane.request
 import v3io.dataplane.output
 import v3io.dataplane.model
 import v3io.dataplane.kv_cursor
+import v3io.dataplane.stream
+import v3io.dataplane.transport
+import v3io.aio.dataplane.stream_consumer
+import v3io.aio.dataplane.stream_producer
 
 
 class Model(v3io.dataplane.model.Model):
@@ -287,6 +292,176 @@ class Model(v3io.dataplane.model.Model):
                                              locals(),
                                              v3io.dataplane.output.PutRecordsOutput)
 
+    async def put_records_with_retries(self,
+                                       container,
+                                       stream_path,
+                                       records,
+                                       access_key=None,
+                                       max_retries=3,
+                                       retry_backoff_ms=100):
+        """Adds records to a stream (see put_records()), re-submitting only the records that failed (e.g. when
+        throttled) with an exponential backoff, until they're all put or max_retries retries were made. Retried
+        records keep their relative order, so the records of a shard that failed are put in the order they were
+        passed - after the records of the same request that succeeded.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        stream_path (Required) : str
+            The stream_path of the stream.
+        records (Required) : []dict
+            A list of dictionaries with the keys of put_records() records.
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        max_retries (Optional) : int
+            The number of times failed records are retried
+        retry_backoff_ms (Optional) : int
+            The number of milliseconds before the first retry, doubled with every retry
+
+        Return Value
+        ----------
+        A `PutRecordsOutput` object with the final outcome of every record, in the order of records. Its
+        `failed_record_count` is the number of records that failed all the retries. Raises if a request fails.
+        """
+        output = v3io.dataplane.stream.new_put_records_output(records)
+        record_indices = range(len(records))
+
+        for retry_index in range(max_retries + 1):
+            if retry_index:
+                await asyncio.sleep(v3io.dataplane.stream.get_retry_backoff_seconds(retry_backoff_ms, retry_index))
+
+            response = await self.put_records(container,
+                                              stream_path,
+                                              [records[record_index] for record_index in record_indices],
+                                              access_key=access_key,
+                                              raise_for_status=v3io.dataplane.transport.RaiseForStatus.always)
+
+            record_indices = v3io.dataplane.stream.merge_put_records_output(output, record_indices, response.output)
+            if not record_indices:
+                break
+
+        return output
+
+    def producer(self,
+                 container,
+                 stream_path,
+                 linger_ms=5,
+                 max_batch_records=1000,
+                 max_batch_bytes=4 * 1024 * 1024,
+                 max_inflight_batches=4,
+                 max_buffered_records=100000,
+                 max_retries=3,
+                 retry_backoff_ms=100,
+                 access_key=None):
+        """Creates a producer, which packs the records sent to it into PutRecords requests and puts them in the
+        background. A batch is put once it's full or once its oldest record waited linger_ms, with up to
+        max_inflight_batches batches in flight. Records with the same shard ID or partition key are only in one
+        batch at a time, so they are put in the order they were sent. Records that fail (e.g. when throttled)
+        are retried on their own, with an exponential backoff - a retried record is put after the records of its
+        batch that succeeded, but before any record sent after that batch.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        stream_path (Required) : str
+            The stream_path of the stream
+        linger_ms (Optional) : int
+            The max number of milliseconds a record waits for its batch to fill
+        max_batch_records (Optional) : int
+            The max number of records in a batch (up to 1000)
+        max_batch_bytes (Optional) : int
+            The max (estimated) size of a batch's request body
+        max_inflight_batches (Optional) : int
+            The max number of batches put at the same time
+        max_buffered_records (Optional) : int
+            The max number of records waiting to be put. Once reached, send() blocks
+        max_retries (Optional) : int
+            The number of times a failed record is retried
+        retry_backoff_ms (Optional) : int
+            The number of milliseconds before the first retry, doubled with every retry
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+
+        Return Value
+        ----------
+        A `Producer` object. Records are sent with send(), which returns a future per record. It must be closed
+        (or used as an async context manager) for the last records to be put
+        """
+        return v3io.aio.dataplane.stream_producer.Producer(self,
+                                                           container,
+                                                           stream_path,
+                                                           linger_ms,
+                                                           max_batch_records,
+                                                           max_batch_bytes,
+                                                           max_inflight_batches,
+                                                           max_buffered_records,
+                                                           max_retries,
+                                                           retry_backoff_ms,
+                                                           access_key)
+
+    def consumer(self,
+                 container,
+                 stream_path,
+                 shards='all',
+                 start='LATEST',
+                 limit=100,
+                 max_limit=10000,
+                 poll_interval_ms=100,
+                 max_poll_interval_ms=2000,
+                 max_batches_per_shard=2,
+                 access_key=None):
+        """Creates a consumer, which reads the records of a stream's shards and merges them into a single iterator of
+        (shard ID, record) tuples. Each shard is read by its own task, which reads the shard's next
+        batch of records while the previous ones are processed - up to max_batches_per_shard batches ahead - so
+        throughput grows with the number of shards. Records of the same shard are returned in order.
+
+        Each reader adapts to how far behind the end of its shard it is (per GetRecords' MSecBehindLatest and
+        RecordsBehindLatest). While behind, it reads back to back and doubles its limit as long as batches are
+        full. Once caught up, it waits poll_interval_ms between reads, doubling the wait with every empty batch.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        stream_path (Required) : str
+            The stream_path of the stream
+        shards (Optional) : []int or 'all'
+            The IDs of the shards to read, or 'all' (default) to read all the shards of the stream
+        start (Optional) : str / datetime
+            Where to start reading each shard - 'LATEST' (default) for records put from now on, 'EARLIEST' for all
+            the records in the shard, or a datetime for the records that arrived since
+        limit (Optional) : int
+            The max number of records to read per GetRecords request, to begin with
+        max_limit (Optional) : int
+            The limit up to which reads grow while a shard reader is behind
+        poll_interval_ms (Optional) : int
+            The number of milliseconds to wait before reading a shard again, once it has no new records
+        max_poll_interval_ms (Optional) : int
+            The max number of milliseconds to wait between reads of a shard with no new records
+        max_batches_per_shard (Optional) : int
+            The max number of batches read ahead per shard, waiting to be processed
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+
+        Return Value
+        ----------
+        A `Consumer` object. Records are read by iterating over it (async for) or with next_record(). It must be closed
+        (or used as an async context manager) to stop the readers
+        """
+        return v3io.aio.dataplane.stream_consumer.Consumer(self,
+                                                           container,
+                                                           stream_path,
+                                                           shards,
+                                                           start,
+                                                           limit,
+                                                           max_limit,
+                                                           poll_interval_ms,
+                                                           max_poll_interval_ms,
+                                                           max_batches_per_shard,
+                                                           access_key)
+
     async def get_records(self,
                           container,
                           stream_path,
@@ -0,0 +1,177 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import asyncio
+
+import v3io.dataplane.stream_consumer
+
+
+class Consumer(object):
+
+    def __init__(self,
+                 stream,
+                 container,
+                 stream_path,
+                 shards='all',
+                 start='LATEST',
+                 limit=100,
+                 max_limit=10000,
+                 poll_interval_ms=100,
+                 max_poll_interval_ms=2000,
+                 max_batches_per_shard=2,
+                 access_key=None):
+        """Reads the records of a stream's shards concurrently - a task per shard - and merges them into a single
+        iterator. The readers start on the first call to next_record(). See stream.consumer()"""
+        self.container = container
+        self.stream_path = stream_path
+        self.start = start
+        self.limit = limit
+        self.max_limit = max_limit
+        self.poll_interval_ms = poll_interval_ms
+        self.max_poll_interval_ms = max_poll_interval_ms
+        self.shard_ids = None if shards == 'all' else list(shards)
+
+        self._stream = stream
+        self._access_key = access_key
+        self._max_batches_per_shard = max_batches_per_shard
+        self._current_shard_id = None
+        self._current_records = []
+        self._current_record_index = 0
+        self._batches = None
+        self._shard_tasks = []
+        self._closed = False
+
+    async def next_record(self, timeout=None):
+        """Returns the next record of any of the shards, waiting for one to arrive.
+
+        Parameters
+        ----------
+        timeout (Optional) : float
+            The max number of seconds to wait for a record. If not passed, waits until one arrives
+
+        Return Value
+        ----------
+        A (shard ID, `GetRecordsResult`) tuple, or None if no record arrived within timeout or the consumer is closed
+        """
+        while self._current_record_index >= len(self._current_records):
+            if self._closed:
+                return None
+
+            if self._batches is None:
+                await self._start_shard_reads()
+
+            try:
+                batch = await asyncio.wait_for(self._batches.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+            # woken up by close()
+            if batch is None:
+                return None
+
+            if isinstance(batch, Exception):
+                await self.close()
+                raise batch
+
+            self._current_shard_id, self._current_records = batch
+            self._current_record_index = 0
+
+        record = self._current_records[self._current_record_index]
+        self._current_record_index += 1
+
+        return self._current_shard_id, record
+
+    async def __aiter__(self):
+        """Yields (shard ID, `GetRecordsResult`) tuples until the consumer is closed"""
+        while True:
+            shard_record = await self.next_record()
+            if shard_record is None:
+                return
+
+            yield shard_record
+
+    async def close(self):
+        """Stops the shard readers, and ends the iteration of a reader waiting for a record"""
+        self._closed = True
+
+        # if the queue is full, a waiting reader gets a batch and sees the consumer is closed
+        if self._batches is not None:
+            try:
+                self._batches.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+
+        for shard_task in self._shard_tasks:
+            shard_task.cancel()
+
+        await asyncio.gather(*self._shard_tasks, return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _start_shard_reads(self):
+        if self.shard_ids is None:
+            response = await self._stream.describe(self.container, self.stream_path, access_key=self._access_key)
+            self.shard_ids = list(range(response.output.shard_count))
+
+        # all the shards share a queue of (shard ID, records) batches
+        self._batches = asyncio.Queue(maxsize=self._max_batches_per_shard * len(self.shard_ids))
+
+        self._shard_tasks = [asyncio.ensure_future(self._read_shard(shard_id)) for shard_id in self.shard_ids]
+
+    async def _read_shard(self, shard_id):
+        try:
+            shard_reader = v3io.dataplane.stream_consumer.ShardReader(shard_id,
+                                                                      self.limit,
+                                                                      self.max_limit,
+                                                                      self.poll_interval_ms,
+                                                                      self.max_poll_interval_ms)
+            seek_type, seek_args = v3io.dataplane.stream_consumer.get_seek_args(self.start)
+
+            response = await self._stream.seek(self.container,
+                                               self.stream_path,
+                                               shard_id,
+                                               seek_type,
+                                               access_key=self._access_key,
+                                               **seek_args)
+
+            shard_reader.location = response.output.location
+
+            while True:
+                response = await self._stream.get_records(self.container,
+                                                          self.stream_path,
+                                                          shard_id,
+                                                          shard_reader.location,
+                                                          access_key=self._access_key,
+                                                          limit=shard_reader.limit)
+
+                # the next batch is read while this one is processed, up to max_batches_per_shard batches ahead
+                wait_seconds = shard_reader.on_records(response.output)
+
+                if response.output.records:
+                    await self._batches.put((shard_id, response.output.records))
+
+                if wait_seconds:
+                    await asyncio.sleep(wait_seconds)
+
+        # on python 3.7 cancellation is an Exception too
+        except asyncio.CancelledError:
+            raise
+
+        # hand the error over to the reader
+        except Exception as e:
+            await self._batches.put(e)
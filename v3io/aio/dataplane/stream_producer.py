@@ -0,0 +1,178 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import asyncio
+
+import v3io.dataplane.stream_producer
+
+
+class Producer(object):
+
+    def __init__(self,
+                 stream,
+                 container,
+                 stream_path,
+                 linger_ms=5,
+                 max_batch_records=v3io.dataplane.stream_producer.MAX_BATCH_RECORDS,
+                 max_batch_bytes=4 * 1024 * 1024,
+                 max_inflight_batches=4,
+                 max_buffered_records=100000,
+                 max_retries=3,
+                 retry_backoff_ms=100,
+                 access_key=None):
+        """Sends records to a stream in PutRecords batches, in the background. See stream.producer()"""
+        self.container = container
+        self.stream_path = stream_path
+        self.max_inflight_batches = max_inflight_batches
+        self.max_buffered_records = max_buffered_records
+        self.max_retries = max_retries
+        self.retry_backoff_ms = retry_backoff_ms
+
+        self._stream = stream
+        self._access_key = access_key
+        self._batcher = v3io.dataplane.stream_producer.RecordBatcher(linger_ms, max_batch_records, max_batch_bytes)
+        self._num_inflight_batches = 0
+        self._num_flushing = 0
+
+        # asyncio only holds weak references to tasks - the running sends are referenced until they're done
+        self._send_tasks = set()
+        self._closed = False
+
+        # created on first use, so that they're bound to the running loop
+        self._changed = None
+        self._dispatcher = None
+
+    async def send(self, data, shard_id=None, partition_key=None, client_info=None):
+        """Adds a record to the next batch. Waits while max_buffered_records records are waiting to be sent.
+
+        Parameters
+        ----------
+        data (Required) : str / bytes
+            Record data
+        shard_id (Optional) : int
+            The ID of the shard to which to put the record
+        partition_key (Optional) : str
+            A partition key with which to associate the record. Records with the same partition key (or shard ID)
+            are put in the order they were sent
+        client_info (Optional) : bytes / bytearray
+            Custom opaque information
+
+        Return Value
+        ----------
+        An `asyncio.Future`, resolved with the record's `PutRecordsResult` (shard ID and sequence number) once it's
+        put, or with a `RecordError` if it couldn't be put after max_retries retries
+        """
+        self._start()
+
+        while self._batcher.num_pending_records >= self.max_buffered_records and not self._closed:
+            await self._wait_for_change()
+
+        if self._closed:
+            raise RuntimeError('Producer is closed')
+
+        pending_record = v3io.dataplane.stream_producer.PendingRecord(asyncio.get_event_loop().create_future(),
+                                                                      data,
+                                                                      shard_id,
+                                                                      partition_key,
+                                                                      client_info)
+
+        self._batcher.add(pending_record)
+        self._changed.set()
+
+        return pending_record.future
+
+    async def flush(self):
+        """Sends all the records sent so far, without lingering, and waits until they're all resolved"""
+        self._start()
+        self._num_flushing += 1
+        self._changed.set()
+
+        try:
+            while self._batcher.num_pending_records or self._num_inflight_batches:
+                await self._wait_for_change()
+
+            # let the sends finish, raising their errors (record errors resolve the records' futures instead)
+            await asyncio.gather(*self._send_tasks)
+        finally:
+            self._num_flushing -= 1
+
+    async def close(self):
+        """Flushes and stops the producer"""
+        await self.flush()
+
+        self._closed = True
+        self._changed.set()
+
+        await self._dispatcher
+        await asyncio.gather(*self._send_tasks)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _start(self):
+        if self._dispatcher is None:
+            self._changed = asyncio.Event()
+            self._dispatcher = asyncio.ensure_future(self._dispatch_batches())
+
+    async def _wait_for_change(self, timeout=None):
+
+        # there's no await between checking the state and waiting, so no change can be missed
+        self._changed.clear()
+
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _dispatch_batches(self):
+        while not self._closed:
+            if self._num_inflight_batches < self.max_inflight_batches:
+                batch, wait_seconds = self._batcher.take_batch(self._num_flushing)
+            else:
+                batch, wait_seconds = None, None
+
+            if batch is None:
+                await self._wait_for_change(wait_seconds)
+                continue
+
+            self._num_inflight_batches += 1
+
+            # writers waiting on a full buffer can go on
+            self._changed.set()
+
+            send_task = asyncio.ensure_future(self._send_batch(batch))
+            self._send_tasks.add(send_task)
+            send_task.add_done_callback(self._send_tasks.discard)
+
+    async def _send_batch(self, batch):
+        try:
+            output = await self._stream.put_records_with_retries(self.container,
+                                                                 self.stream_path,
+                                                                 [pending_record.record for pending_record in batch],
+                                                                 access_key=self._access_key,
+                                                                 max_retries=self.max_retries,
+                                                                 retry_backoff_ms=self.retry_backoff_ms)
+
+            v3io.dataplane.stream_producer.resolve_put_records(batch, output)
+
+        except Exception as e:
+            v3io.dataplane.stream_producer.fail_records(batch, e)
+
+        finally:
+            self._batcher.release(batch)
+            self._num_inflight_batches -= 1
+            self._changed.set()
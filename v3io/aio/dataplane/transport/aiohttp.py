@@ -22,12 +22,24 @@ import v3io.dataplane.transport
 
 class Transport(object):
 
-    def __init__(self, logger, endpoint=None, max_connections=None, timeout=None, verbosity=None, retry_intervals=None):
+    def __init__(self,
+                 logger,
+                 endpoint=None,
+                 max_connections=None,
+                 timeout=None,
+                 verbosity=None,
+                 retry_intervals=None,
+                 max_connections_per_host=None,
+                 keepalive_timeout=None,
+                 dns_cache_ttl=None):
         self._logger = logger
         self._endpoint = self._get_endpoint(endpoint)
         self._timeout = timeout
         self.max_connections = max_connections or 8
-        self._connector = aiohttp.TCPConnector()
+        self._connector = self._create_connector(self.max_connections,
+                                                 max_connections_per_host,
+                                                 keepalive_timeout,
+                                                 dns_cache_ttl)
         self._client_session = aiohttp.ClientSession(connector=self._connector)
         # spend ~1 min in retries before raising the exception to the user
         self.retry_intervals = retry_intervals or (0, 0, 0.1, 0.3, 1.0) + 12 * (5.0,)
@@ -93,6 +105,25 @@ class Transport(object):
 
             await asyncio.sleep(self.retry_intervals[client_os_error_retry_counter])
 
+    @staticmethod
+    def _create_connector(max_connections, max_connections_per_host, keepalive_timeout, dns_cache_ttl):
+
+        # the connector never opens more than "limit" connections. requests that can't get a connection wait
+        # in a FIFO queue until one is released, so a burst of requests is served in the order it was issued
+        connector_kw_args = {
+            'limit': max_connections,
+            'limit_per_host': max_connections_per_host or 0,
+        }
+
+        # only pass what was explicitly set - aiohttp treats None as "forever" for these
+        if keepalive_timeout is not None:
+            connector_kw_args['keepalive_timeout'] = keepalive_timeout
+
+        if dns_cache_ttl is not None:
+            connector_kw_args['ttl_dns_cache'] = dns_cache_ttl
+
+        return aiohttp.TCPConnector(**connector_kw_args)
+
     @staticmethod
     def _get_endpoint(endpoint):
 
@@ -12,7 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import collections
 import functools
+import itertools
+import queue
+import threading
 
 import v3io.dataplane.transport
 
@@ -21,8 +25,8 @@ class Batch(object):
 
     def __init__(self, client):
         self._client = client
-        self._encoded_requests = []
-        self._inflight_requests = []
+        self._encoded_requests = collections.deque()
+        self._inflight_requests = collections.deque()
         self._transport_actions = v3io.dataplane.transport.Actions.encode_only
         self._transport = self._client._transport
         self.kv = lambda: None
@@ -90,50 +94,186 @@ class Batch(object):
         # shove to encoded requests
         self._encoded_requests.append(request)
 
-    def wait(self, raise_for_status=None):
+    def wait(self, raise_for_status=None, num_workers=None):
+        """Sends the requests added to the batch and waits for all of their responses.
+
+        Parameters
+        ----------
+        raise_for_status (Optional) : RaiseForStatus / list of status codes
+            Applied to every response
+        num_workers (Optional) : int
+            See wait_iter()
+
+        Return Value
+        ----------
+        A list of `Response` objects, in the order the requests were added to the batch
+        """
+        responses = self._stream(None, raise_for_status, num_workers)
+
+        # workers complete requests out of order
+        if num_workers:
+            responses = sorted(responses, key=lambda response: response[0])
+
+        return [response for _, _, response in responses]
+
+    def wait_iter(self, requests=None, raise_for_status=None, num_workers=None):
+        """Sends the requests added to the batch and yields their responses. Up to max_connections requests are
+        in flight at any given time.
+
+        Requests added to the batch while iterating are sent as well. Alternatively, pass an iterable of
+        encoded requests (e.g. a generator of calls with transport_actions=Actions.encode_only) - it is
+        consumed lazily, so only the requests in flight are held in memory at any given time and the
+        producer is never ahead of the connections.
+
+        Parameters
+        ----------
+        requests (Optional) : iterable
+            An iterable of encoded requests to send after the requests added to the batch
+        raise_for_status (Optional) : RaiseForStatus / list of status codes
+            Applied to every response
+        num_workers (Optional) : int
+            If not passed, requests are pipelined over the connections from the calling thread, which reads
+            the responses one at a time. If passed, each of num_workers threads sends a request and reads its
+            response on its own connection, so that reading (and parsing) responses on one connection overlaps
+            sending on the others. There is no point in passing more than max_connections
+
+        Return Value
+        ----------
+        A generator of `Response` objects. When pipelined, in the order the requests were sent - the oldest request
+        in flight is read first, so a slow response holds up those behind it. With num_workers, in the order they
+        were received
+        """
+        for _, _, response in self._stream(requests, raise_for_status, num_workers):
+            yield response
+
+    def wait_iter_pairs(self, requests=None, raise_for_status=None, num_workers=None):
+        """Like wait_iter(), but yields each response along with the request it answers - e.g. to match the
+        responses of a generator of requests to their keys (request.encoder_args)
+
+        Parameters
+        ----------
+        See wait_iter()
+
+        Return Value
+        ----------
+        A generator of (`Request`, `Response`) tuples, in the order wait_iter() yields the responses
+        """
+        for _, request, response in self._stream(requests, raise_for_status, num_workers):
+            yield request, response
+
+    def _stream(self, requests=None, raise_for_status=None, num_workers=None):
+        requests = iter(requests or ())
+
+        if num_workers:
+            send_and_receive = self._send_and_receive_concurrently(requests, raise_for_status, num_workers)
+        else:
+            send_and_receive = self._send_and_receive(requests, raise_for_status)
+
         try:
-            return self._wait(raise_for_status)
+            for request_and_response in send_and_receive:
+                yield request_and_response
 
-        # if an exception is raised, clean up everything
+        # the caller stopped iterating - read what's in flight so the connections can be reused
+        except GeneratorExit:
+            self._encoded_requests.clear()
+            send_and_receive.close()
+            raise
+
+        # if an exception is raised, clean up everything - reading what's in flight returns its connections to the pool
         except Exception as e:
-            self._inflight_requests = []
-            self._encoded_requests = []
-            self._transport.restart()
+            self._encoded_requests.clear()
+            self._drain_inflight_requests()
 
             raise e
 
-    def _wait(self, raise_for_status=None):
+    def _send_and_receive(self, requests, raise_for_status):
+        request_index = 0
+
+        try:
+            while True:
 
-        responses = []
+                # while we can send requests - send them
+                while len(self._inflight_requests) < self._transport.max_connections:
+                    request = self._get_next_request(requests)
+                    if request is None:
+                        break
 
-        # while we can send requests - send them
-        while self._encoded_requests and len(self._inflight_requests) < self._transport.max_connections:
+                    self._inflight_requests.append(self._transport.send_request(request))
 
-            # send the request
-            request = self._transport.send_request(self._encoded_requests.pop(0))
+                if not self._inflight_requests:
+                    return
 
-            # add to inflight requests
-            self._inflight_requests.append(request)
+                # wait for the response of the oldest inflight request. the next iteration sends a pending request
+                # on the connection that we just read from
+                inflight_request = self._inflight_requests.popleft()
+                response = self._transport.wait_response(inflight_request, raise_for_status)
 
-        # start creating responses
-        while self._inflight_requests:
+                yield request_index, inflight_request, response
+                request_index += 1
 
-            # get an inflight request
-            inflight_request = self._inflight_requests.pop(0)
+        except GeneratorExit:
+            self._drain_inflight_requests()
+            raise
 
-            # wait for the response of the request
-            response = self._transport.wait_response(inflight_request, raise_for_status)
+    def _send_and_receive_concurrently(self, requests, raise_for_status, num_workers):
+        next_request_lock = threading.Lock()
+        next_request_index = itertools.count()
+        stop = threading.Event()
 
-            # add to responses
-            responses.append(response)
+        # bounded, so that workers don't read responses faster than the caller consumes them
+        results = queue.Queue(maxsize=num_workers)
 
-            # if there's a pending request, send it on the connection that we just read from
-            if self._encoded_requests:
+        def _worker():
+            try:
+                while not stop.is_set():
+                    with next_request_lock:
+                        request = self._get_next_request(requests)
+                        request_index = next(next_request_index)
 
-                # send the request
-                request = self._transport.send_request(self._encoded_requests.pop(0))
+                    if request is None:
+                        break
 
-                # add to inflight requests
-                self._inflight_requests.append(request)
+                    request = self._transport.send_request(request)
+                    results.put((request_index, request, self._transport.wait_response(request, raise_for_status)))
+            except BaseException as e:
+                results.put(e)
+            finally:
+                results.put(None)
 
-        return responses
+        workers = [threading.Thread(target=_worker, daemon=True) for _ in range(num_workers)]
+        for worker in workers:
+            worker.start()
+
+        num_running_workers = len(workers)
+
+        try:
+            while num_running_workers:
+                result = results.get()
+
+                if result is None:
+                    num_running_workers -= 1
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    yield result
+        finally:
+
+            # stop the workers, discarding whatever they're still reading
+            stop.set()
+            while num_running_workers:
+                if results.get() is None:
+                    num_running_workers -= 1
+
+    def _get_next_request(self, requests):
+        if self._encoded_requests:
+            return self._encoded_requests.popleft()
+
+        return next(requests, None)
+
+    def _drain_inflight_requests(self):
+        while self._inflight_requests:
+            try:
+                self._transport.wait_response(self._inflight_requests.popleft(),
+                                              v3io.dataplane.transport.RaiseForStatus.never)
+            except Exception:
+                pass
@@ -39,7 +39,9 @@ class Client(object):
                  timeout=None,
                  transport_kind='httpclient',
                  logger_verbosity=None,
-                 transport_verbosity='info'):
+                 transport_verbosity='info',
+                 connection_acquire_timeout=None,
+                 idle_connection_ttl=None):
         """Creates a v3io client, used to access v3io
 
         Parameters
@@ -53,8 +55,8 @@ class Client(object):
             The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env. this can
             be overridden per request if needed
         max_connections (Optional) : int
-            The number of connections to create towards v3io - defining the max number of parallel
-            operations towards v3io. Defaults to 8
+            The max number of connections to create towards v3io - defining the max number of parallel
+            operations towards v3io. Connections are created on demand. Defaults to 8
         timeout (Optional) : None
             For future use
         transport_kind (Optional) : str/cls
@@ -67,6 +69,12 @@ class Client(object):
             If set to 'DEBUG', transport will log lots of information at the cost of performance. It uses
             the "debug_with" logger interface, so wither a logger set to DEBUG level must be passed in 'logger' or
             'logger_verbosity' must be set to DEBUG
+        connection_acquire_timeout (Optional) : float
+            Number of seconds to wait for a free connection when all max_connections are in use, after which
+            a ConnectionPoolTimeoutError is raised. If not passed, waits forever (httpclient transport only)
+        idle_connection_ttl (Optional) : float
+            Number of seconds after which an idle connection is closed. If not passed, idle connections are
+            kept open (httpclient transport only)
 
         Return Value
         ----------
@@ -84,7 +92,9 @@ class Client(object):
                                                       endpoint,
                                                       max_connections,
                                                       timeout,
-                                                      transport_verbosity)
+                                                      transport_verbosity,
+                                                      connection_acquire_timeout,
+                                                      idle_connection_ttl)
 
         else:
             self._transport = transport_kind
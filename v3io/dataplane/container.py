@@ -12,8 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import collections
+import queue
+import threading
+
 import v3io.dataplane.request
 import v3io.dataplane.output
+import v3io.dataplane.transport
 import v3io.dataplane.model
 import v3io.dataplane.kv_cursor
 
@@ -69,3 +74,236 @@ class Model(v3io.dataplane.model.Model):
                                        v3io.dataplane.request.encode_get_container_contents,
                                        locals(),
                                        v3io.dataplane.output.GetContainerContentsOutput)
+
+    def iter_contents(self,
+                      container,
+                      path,
+                      access_key=None,
+                      get_all_attributes=None,
+                      limit=None,
+                      recursive=False):
+        """Iterates over the objects in a path, transparently paging through the listing. The next page is
+        requested while the current one is consumed.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path within the container
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        get_all_attributes (Optional) : bool
+            False (default) - retrieves basic attributes
+            True - retrieves all attributes of the underlying objects
+        limit (Optional) : int
+            Number of objects/directories to receive per page. default: 1000
+        recursive (Optional) : bool
+            False (default) - only the objects directly under path
+            True - the objects in all the directories under path as well
+
+        Return Value
+        ----------
+        A generator of `ContainerContent` objects.
+        """
+        for _, _, contents in self._walk(container, path, access_key, get_all_attributes, None, limit, recursive):
+            for content in contents:
+                yield content
+
+    def walk(self,
+             container,
+             path,
+             access_key=None,
+             get_all_attributes=None,
+             directories_only=None,
+             limit=None):
+        """Walks the directory tree under a path, one listing page at a time. Every directory is listed after
+        the directory that contains it. The next page is requested while the current one is consumed.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path within the container
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        get_all_attributes (Optional) : bool
+            False (default) - retrieves basic attributes
+            True - retrieves all attributes of the underlying objects
+        directories_only (Optional) : bool
+            False (default) - retrieves objects (contents) and directories (common prefixes)
+            True - retrieves only directories (common prefixes)
+        limit (Optional) : int
+            Number of objects/directories to receive per page. default: 1000
+
+        Return Value
+        ----------
+        A generator of (path, common_prefixes, contents) tuples - one per page. As with os.walk, removing
+        common prefixes from the list before resuming the generator prevents walking into them.
+        """
+        return self._walk(container, path, access_key, get_all_attributes, directories_only, limit, True)
+
+    def walk_parallel(self,
+                      container,
+                      path,
+                      workers=None,
+                      access_key=None,
+                      get_all_attributes=None,
+                      directories_only=None,
+                      limit=None):
+        """Walks the directory tree under a path, listing up to `workers` directories concurrently, each over its
+        own connection. Pages are yielded as they are received, so pages of different directories are interleaved.
+        Unlike walk(), the walk can't be pruned - directories are queued for listing as soon as they are seen.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        path (Required) : str
+            The path within the container
+        workers (Optional) : int
+            The number of directories listed concurrently. Defaults to max_connections
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        get_all_attributes (Optional) : bool
+            False (default) - retrieves basic attributes
+            True - retrieves all attributes of the underlying objects
+        directories_only (Optional) : bool
+            False (default) - retrieves objects (contents) and directories (common prefixes)
+            True - retrieves only directories (common prefixes)
+        limit (Optional) : int
+            Number of objects/directories to receive per page. default: 1000
+
+        Return Value
+        ----------
+        A generator of (path, common_prefixes, contents) tuples - one per page.
+        """
+        workers = workers or self._transport.max_connections
+
+        # directories to list, and the number of directories that are queued or being listed. once that reaches
+        # zero, the walk is done
+        pending_paths = queue.Queue()
+        pending_paths.put(path)
+        num_pending_paths = [1]
+        num_pending_paths_lock = threading.Lock()
+
+        # bounded, so that workers don't list faster than the caller consumes
+        pages = queue.Queue(maxsize=workers)
+        stop = threading.Event()
+
+        def _stop_workers():
+            for _ in range(workers):
+                pending_paths.put(None)
+
+        def _worker():
+            try:
+                while True:
+                    directory_path = pending_paths.get()
+                    if directory_path is None:
+                        return
+
+                    try:
+                        for page in self._walk(container,
+                                               directory_path,
+                                               access_key,
+                                               get_all_attributes,
+                                               directories_only,
+                                               limit,
+                                               False):
+                            if stop.is_set():
+                                return
+
+                            with num_pending_paths_lock:
+                                num_pending_paths[0] += len(page[1])
+
+                            for common_prefix in page[1]:
+                                pending_paths.put(common_prefix.prefix)
+
+                            pages.put(page)
+                    finally:
+                        with num_pending_paths_lock:
+                            num_pending_paths[0] -= 1
+
+                            if num_pending_paths[0] == 0:
+                                _stop_workers()
+
+            except BaseException as e:
+                pages.put(e)
+            finally:
+                pages.put(None)
+
+        worker_threads = [threading.Thread(target=_worker, daemon=True) for _ in range(workers)]
+        for worker_thread in worker_threads:
+            worker_thread.start()
+
+        num_running_workers = len(worker_threads)
+
+        try:
+            while num_running_workers:
+                page = pages.get()
+
+                if page is None:
+                    num_running_workers -= 1
+                elif isinstance(page, BaseException):
+                    raise page
+                else:
+                    yield page
+        finally:
+
+            # stop the workers, discarding whatever they're still listing
+            stop.set()
+            _stop_workers()
+
+            while num_running_workers:
+                if pages.get() is None:
+                    num_running_workers -= 1
+
+    def _walk(self, container, path, access_key, get_all_attributes, directories_only, limit, recursive):
+        list_kw_args = {
+            'access_key': access_key,
+            'get_all_attributes': get_all_attributes,
+            'directories_only': directories_only,
+            'limit': limit,
+        }
+
+        # directories that were yet to be listed
+        pending_paths = collections.deque()
+        inflight_page = self._send_list_request(container, path, None, list_kw_args)
+
+        try:
+            while inflight_page is not None:
+                page_path, inflight_request = inflight_page
+                inflight_page = None
+
+                output = self._transport.wait_response(inflight_request).output
+
+                # request the next page before handing this one over. take the next directory before this page's
+                # directories are added, so that the caller may still prune them
+                if output.is_truncated == 'true' and output.next_marker:
+                    inflight_page = self._send_list_request(container, page_path, output.next_marker, list_kw_args)
+                elif pending_paths:
+                    inflight_page = self._send_list_request(container, pending_paths.pop(), None, list_kw_args)
+
+                yield page_path, output.common_prefixes, output.contents
+
+                if recursive:
+                    pending_paths.extend(common_prefix.prefix for common_prefix in output.common_prefixes)
+
+                    if inflight_page is None and pending_paths:
+                        inflight_page = self._send_list_request(container, pending_paths.pop(), None, list_kw_args)
+        finally:
+
+            # read the response of the prefetched page so that its connection can be reused
+            if inflight_page is not None:
+                try:
+                    self._transport.wait_response(inflight_page[1], v3io.dataplane.transport.RaiseForStatus.never)
+                except Exception:
+                    pass
+
+    def _send_list_request(self, container, path, marker, list_kw_args):
+        return path, self.list(container,
+                               path,
+                               marker=marker,
+                               transport_actions=v3io.dataplane.transport.Actions.encode_and_send,
+                               **list_kw_args)
@@ -13,11 +13,16 @@
 # limitations under the License.
 #
 import os
+import weakref
 
 import v3io.dataplane.request
+import v3io.dataplane.response
 import v3io.dataplane.output
+import v3io.dataplane.transport
 import v3io.dataplane.model
 import v3io.dataplane.kv_cursor
+import v3io.dataplane.kv_cache
+import v3io.dataplane.kv_writer
 
 
 class Model(v3io.dataplane.model.Model):
@@ -27,6 +32,9 @@ class Model(v3io.dataplane.model.Model):
         self._access_key = client._access_key
         self._transport = client._transport
 
+        # the caches created by new_cache(), whose entries of an item are invalidated when it's written
+        self._caches = weakref.WeakSet()
+
     def new_cursor(self,
                    container,
                    table_path,
@@ -40,7 +48,9 @@ class Model(v3io.dataplane.model.Model):
                    segment=None,
                    total_segments=None,
                    sort_key_range_start=None,
-                   sort_key_range_end=None):
+                   sort_key_range_end=None,
+                   prefetch=None,
+                   field_types=None):
         return v3io.dataplane.kv_cursor.Cursor(self._client,
                                                container,
                                                access_key or self._access_key,
@@ -54,7 +64,235 @@ class Model(v3io.dataplane.model.Model):
                                                segment,
                                                total_segments,
                                                sort_key_range_start,
-                                               sort_key_range_end)
+                                               sort_key_range_end,
+                                               prefetch,
+                                               field_types)
+
+    def new_parallel_cursor(self,
+                            container,
+                            table_path,
+                            total_segments,
+                            access_key=None,
+                            raise_for_status=None,
+                            attribute_names='*',
+                            filter_expression=None,
+                            limit=None,
+                            ordered=False,
+                            field_types=None):
+        """Creates a cursor that scans the segments of a table concurrently and merges their items. Up to
+        max_connections threads scan a segment at a time each, over their own connections.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        total_segments (Required) : int
+            The number of segments into which to divide the table scan - 1 to 1024. Segments beyond max_connections
+            are scanned once others are done
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        attribute_names (Optional) : []str or '*'
+            A list of attribute names to get, or '*' which will retreive all attributes
+        filter_expression (Optional) : str
+            A filter expression that restricts the items to retrieve. Only items that match the filter criteria
+            are returned.
+        limit (Optional) : int
+            The maximum number of items to return, across all segments
+        ordered (Optional) : bool
+            False (default) - items are returned as soon as their page is received, in no particular order
+            True - the items of each segment are returned in order, segment after segment
+        field_types (Optional) : dict
+            Attribute name -> schema field type (as passed to create_schema - long, double, string, boolean,
+            timestamp, blob). Values are parsed as their field type directly. The types of other attributes are
+            learned from the first page
+
+        Return Value
+        ----------
+        A `ParallelCursor` object. If it isn't read to the end, it must be closed with close()
+        """
+        return v3io.dataplane.kv_cursor.ParallelCursor(self._client,
+                                                       container,
+                                                       access_key or self._access_key,
+                                                       table_path,
+                                                       total_segments,
+                                                       raise_for_status,
+                                                       attribute_names,
+                                                       filter_expression,
+                                                       limit,
+                                                       ordered,
+                                                       field_types=field_types)
+
+    def new_cache(self, max_entries=1024, ttl=60.0):
+        """Creates a read through cache of items in front of this model. Gets through the cache are served from
+        memory when possible. Puts, updates and deletes through this model (including put_many(), batches and
+        buffered writers) invalidate the cached item - writes made elsewhere are only seen once the entries expire.
+
+        Parameters
+        ----------
+        max_entries (Optional) : int
+            The max number of cached get responses. Once reached, the least recently used is evicted
+        ttl (Optional) : float
+            The number of seconds a response is served from the cache. If None, until it's evicted or invalidated
+            (only if all writes to the cached items are made through this model)
+
+        Return Value
+        ----------
+        A `Cache` object, with get(), put(), update() and delete() like those of this model, and hits / misses
+        counters
+        """
+        cache = v3io.dataplane.kv_cache.Cache(self, max_entries, ttl)
+        self._caches.add(cache)
+
+        return cache
+
+    def invalidate_cached_item(self, container, table_path, key):
+        """Removes the entries of an item from the caches created by new_cache(). Called on every write to the
+        item through this model"""
+        for cache in list(self._caches):
+            cache.invalidate(container, table_path, key)
+
+    def buffered_writer(self, container, table_path, flush_interval=1.0, max_items=1000, access_key=None):
+        """Creates a writer that buffers puts and updates to the items of a table, merging repeated writes to the
+        same item, and flushes them in the background, pipelined over all connections.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        flush_interval (Optional) : float
+            The max number of seconds a write is buffered
+        max_items (Optional) : int
+            The max number of items buffered. Once reached, the buffer is flushed and writers block until there's
+            room
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+
+        Return Value
+        ----------
+        A `BufferedWriter` object, with put() and update() per item. It must be closed (or used as a context
+        manager) for the last writes to be flushed
+        """
+        return v3io.dataplane.kv_writer.BufferedWriter(self,
+                                                       container,
+                                                       table_path,
+                                                       flush_interval,
+                                                       max_items,
+                                                       access_key)
+
+    def scan_to_dataframe(self,
+                          container,
+                          table_path,
+                          access_key=None,
+                          raise_for_status=None,
+                          attribute_names='*',
+                          filter_expression=None,
+                          limit=None,
+                          prefetch=None):
+        """Scans a table into a pandas DataFrame, with a column per attribute. Items are decoded straight into
+        NumPy arrays, without creating a dict per item. Requires pandas. See
+        v3io.dataplane.kv_columns.ColumnsBuilder for how attributes are converted.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        attribute_names (Optional) : []str or '*'
+            A list of attribute names to get, or '*' which will retreive all attributes
+        filter_expression (Optional) : str
+            A filter expression that restricts the items to retrieve. Only items that match the filter criteria
+            are returned.
+        limit (Optional) : int
+            The maximum number of items to return
+        prefetch (Optional) : int
+            The number of pages to read ahead while the current one is decoded
+
+        Return Value
+        ----------
+        A `pandas.DataFrame`, with a row per item
+        """
+        import v3io.dataplane.kv_columns
+
+        cursor = self.new_cursor(container,
+                                 table_path,
+                                 access_key=access_key,
+                                 raise_for_status=raise_for_status,
+                                 attribute_names=attribute_names,
+                                 filter_expression=filter_expression,
+                                 limit=limit,
+                                 prefetch=prefetch)
+
+        return v3io.dataplane.kv_columns.to_dataframe(cursor.to_columns())
+
+    def scan_record_batches(self,
+                            container,
+                            table_path,
+                            access_key=None,
+                            raise_for_status=None,
+                            attribute_names='*',
+                            filter_expression=None,
+                            limit=None,
+                            prefetch=None,
+                            schema=None):
+        """Scans a table as arrow record batches, one per page. Items are decoded straight into columns, without
+        creating a dict per item. Requires pyarrow.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        attribute_names (Optional) : []str or '*'
+            A list of attribute names to get, or '*' which will retreive all attributes
+        filter_expression (Optional) : str
+            A filter expression that restricts the items to retrieve. Only items that match the filter criteria
+            are returned.
+        limit (Optional) : int
+            The maximum number of items to return
+        prefetch (Optional) : int
+            The number of pages to read ahead while the current one is decoded
+        schema (Optional) : pyarrow.Schema
+            The schema of the record batches. If not passed, the table's schema file (see create_schema) is used.
+            If the table has no schema file, the schema is inferred from the first page
+
+        Return Value
+        ----------
+        A generator of `pyarrow.RecordBatch` objects, all with the same schema
+        """
+        import v3io.dataplane.kv_arrow
+
+        key = None
+
+        if schema is None:
+            response = self._client.object.get(container,
+                                               os.path.join(table_path, '.#schema'),
+                                               access_key=access_key,
+                                               raise_for_status=[200, 404])
+
+            if response.status_code == 200:
+                schema, key = v3io.dataplane.kv_arrow.read_schema_file(response.body)
+
+        cursor = self.new_cursor(container,
+                                 table_path,
+                                 access_key=access_key,
+                                 raise_for_status=raise_for_status,
+                                 attribute_names=attribute_names,
+                                 filter_expression=filter_expression,
+                                 limit=limit,
+                                 prefetch=prefetch)
+
+        for record_batch in cursor.to_record_batches(schema, key):
+            yield record_batch
 
     def put(self,
             container,
@@ -73,8 +311,9 @@ class Model(v3io.dataplane.model.Model):
 
         Notes:
         1. To provide arrays, pass either a list of integers ([1, 2, 3]), a list of floats ([1.0, 2.0, 3.0]) an
-           array.array with a typecode of either 'l' (integer) or 'd' (float). The response will always either be
-           a list of integers or a list of floats (never an array.array)
+           array.array with a typecode of either 'l' (integer) or 'd' (float) or a 1D numpy.ndarray (integers are
+           stored as int64, floats as float64). The response will always either be a list of integers or a list
+           of floats (never an array.array)
         2. To provide a timestamp, pass a datetime.datetime. Whatever the timezone, it will be stored as UTC and
            a UTC datetime will be retreived when read
 
@@ -104,12 +343,64 @@ class Model(v3io.dataplane.model.Model):
         A `Response` object.
         """
 
-        return self._transport.request(container,
-                                       access_key or self._access_key,
-                                       raise_for_status,
-                                       transport_actions,
-                                       v3io.dataplane.request.encode_put_item,
-                                       locals())
+        try:
+            return self._transport.request(container,
+                                           access_key or self._access_key,
+                                           raise_for_status,
+                                           transport_actions,
+                                           v3io.dataplane.request.encode_put_item,
+                                           locals())
+        finally:
+            self.invalidate_cached_item(container, table_path, key)
+
+    def put_many(self,
+                 container,
+                 table_path,
+                 items,
+                 access_key=None,
+                 concurrency=None):
+        """Writes many items, each replacing the existing item with the same key (see put()). Requests are
+        pipelined over all connections. A failed item doesn't stop the others from being written - failures are
+        reported in the result.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        items (Required) : iterable of (key, attributes) tuples
+            The items to write (e.g. dict.items()). Consumed lazily, as requests are sent
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        concurrency (Optional) : int
+            If not passed, requests are pipelined from the calling thread. If passed, that many threads send
+            requests and read responses concurrently (see Batch.wait_iter())
+
+        Return Value
+        ----------
+        A `BulkWriteResult` object, with the number of items written and an `ItemFailure` (key, status code
+        and body) per item that wasn't. Call its raise_for_status() to raise if any item failed
+        """
+        never = v3io.dataplane.transport.RaiseForStatus.never
+        requests = (self.put(container,
+                             table_path,
+                             key,
+                             attributes,
+                             access_key=access_key,
+                             raise_for_status=never,
+                             transport_actions=v3io.dataplane.transport.Actions.encode_only)
+                    for key, attributes in items)
+
+        result = v3io.dataplane.response.BulkWriteResult()
+
+        for request, response in self._client.create_batch().wait_iter_pairs(requests, never, concurrency):
+            result.add_response(request.encoder_args['key'], response)
+
+            # the item was invalidated when its request was encoded, but may have been read again since
+            self.invalidate_cached_item(container, table_path, request.encoder_args['key'])
+
+        return result
 
     def update(self,
                container,
@@ -165,12 +456,15 @@ class Model(v3io.dataplane.model.Model):
         ----------
         A `Responses` object.
         """
-        return self._transport.request(container,
-                                       access_key or self._access_key,
-                                       raise_for_status,
-                                       transport_actions,
-                                       v3io.dataplane.request.encode_update_item,
-                                       locals())
+        try:
+            return self._transport.request(container,
+                                           access_key or self._access_key,
+                                           raise_for_status,
+                                           transport_actions,
+                                           v3io.dataplane.request.encode_update_item,
+                                           locals())
+        finally:
+            self.invalidate_cached_item(container, table_path, key)
 
     def get(self,
             container,
@@ -209,6 +503,60 @@ class Model(v3io.dataplane.model.Model):
                                        locals(),
                                        v3io.dataplane.output.GetItemOutput)
 
+    def get_many(self,
+                 container,
+                 table_path,
+                 keys,
+                 access_key=None,
+                 attribute_names='*',
+                 dedupe=False,
+                 concurrency=None):
+        """Retrieves the requested attributes of many table items (see get()), yielding each item as soon as its
+        response is received. Requests are pipelined over all connections, so that fetching many items takes
+        about as long as fetching max_connections items one at a time.
+
+        Parameters
+        ----------
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        keys (Required) : iterable of str
+            The item key names
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to the V3IO_ACCESS_KEY env.
+        attribute_names (Optional) : []str or '*'
+            A list of attribute names to get, or '*' which will retreive all attributes
+        dedupe (Optional) : bool
+            If True, a key that appears more than once is only fetched (and yielded) once
+        concurrency (Optional) : int
+            If not passed, requests are pipelined from the calling thread. If passed, that many threads send
+            requests and read responses concurrently (see Batch.wait_iter())
+
+        Return Value
+        ----------
+        A generator of (key, item) tuples. The order isn't guaranteed to be that of the keys - match items by
+        the key in the tuple. item is a dict of attributes, or None if the item doesn't exist. Any other failure
+        is raised as an `HttpResponseError`
+        """
+        expected_statuses = [200, 404]
+
+        # keeps the order of the keys
+        if dedupe:
+            keys = dict.fromkeys(keys)
+
+        requests = (self.get(container,
+                             table_path,
+                             key,
+                             access_key=access_key,
+                             raise_for_status=expected_statuses,
+                             transport_actions=v3io.dataplane.transport.Actions.encode_only,
+                             attribute_names=attribute_names)
+                    for key in keys)
+
+        for request, response in self._client.create_batch().wait_iter_pairs(requests, expected_statuses, concurrency):
+            yield request.encoder_args['key'], response.output.item if response.status_code == 200 else None
+
     def scan(self,
              container,
              table_path,
@@ -308,11 +656,14 @@ class Model(v3io.dataplane.model.Model):
         ----------
         A `Response` object.
         """
-        return self._client.delete_object(container,
-                                          os.path.join(table_path, key),
-                                          access_key,
-                                          raise_for_status,
-                                          transport_actions)
+        try:
+            return self._client.delete_object(container,
+                                              os.path.join(table_path, key),
+                                              access_key,
+                                              raise_for_status,
+                                              transport_actions)
+        finally:
+            self.invalidate_cached_item(container, table_path, key)
 
     def create_schema(self,
                       container,
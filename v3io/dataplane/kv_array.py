@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import array
 import struct
 import base64
+import sys
 
 # constants
 ITEM_HEADER_MAGIC = struct.pack("I", 11223344)
@@ -22,44 +24,129 @@ ITEM_HEADER_MAGIC_AND_VERSION = ITEM_HEADER_MAGIC + struct.pack("I", 1)
 OPERAND_TYPE_LONG = 259
 OPERAND_TYPE_DOUBLE = 261
 
+# values are 8 byte, little endian longs or doubles
+_header_len = len(ITEM_HEADER_MAGIC_AND_VERSION) + 8
+_little_endian = sys.byteorder == 'little'
+
 
 def encode_list(list_value):
-    typecode = 'l'
+    typecode = 'q'
     if len(list_value) and isinstance(list_value[0], float):
         typecode = 'd'
 
     return encode_array(list_value, typecode)
 
 
-def encode_array(array_value, typecode):
-    num_items = len(array_value)
-    operand_type = OPERAND_TYPE_LONG if typecode == 'l' else OPERAND_TYPE_DOUBLE
+def encode_array(array_value, typecode=None):
+    """Encodes a sequence of numbers as an array blob (base64 encoded).
+
+    Parameters
+    ----------
+    array_value (Required) : array.array, numpy.ndarray or sequence
+        The values. array.arrays of 8 byte items and int64/float64 ndarrays are copied as is, without creating
+        a python object per value
+    typecode (Optional) : str
+        An array.array typecode - floating point typecodes ('d', 'f') are encoded as doubles, the rest as longs.
+        Defaults to the typecode of an array.array / the dtype of an ndarray
+
+    Return Value
+    ----------
+    The encoded array (bytes)
+    """
+    if typecode is None:
+        typecode = _get_typecode(array_value)
+
+    is_double = typecode in ('d', 'f')
+    values = _to_buffer(array_value, is_double)
 
-    encoded_array = ITEM_HEADER_MAGIC_AND_VERSION + struct.pack('II' + typecode * num_items,
-                                                                num_items * 8,
-                                                                operand_type,
-                                                                *array_value)
+    encoded_array = bytearray(ITEM_HEADER_MAGIC_AND_VERSION)
+    encoded_array += struct.pack('II', len(values), OPERAND_TYPE_DOUBLE if is_double else OPERAND_TYPE_LONG)
+    encoded_array += values
 
     return base64.b64encode(encoded_array)
 
 
-def decode(encoded_array):
+def decode(encoded_array, as_ndarray=False):
+    """Decodes an array blob (after base64 decoding).
+
+    Parameters
+    ----------
+    encoded_array (Required) : bytes
+        The array blob
+    as_ndarray (Optional) : bool
+        If True, returns a read only int64/float64 numpy.ndarray over encoded_array, rather than a list
+
+    Return Value
+    ----------
+    A list of ints / floats, or a numpy.ndarray
+    """
     static_header_len = len(ITEM_HEADER_MAGIC_AND_VERSION)
 
     # do a quick peek before we decode
     if len(encoded_array) <= static_header_len or not encoded_array.startswith(ITEM_HEADER_MAGIC_AND_VERSION):
         raise ValueError('Not an encoded array')
 
-    # get header (which contains number of items and type
-    header = encoded_array[static_header_len:static_header_len + 8]
-    values = encoded_array[static_header_len + len(header):]
-
     # unpack the header to get the size and operand
-    unpacked_header = struct.unpack('II', header)
+    values_len, operand_type = struct.unpack_from('II', encoded_array, static_header_len)
+    is_double = operand_type != OPERAND_TYPE_LONG
 
-    # get the typecode and number of items
-    typecode = 'l' if unpacked_header[1] == OPERAND_TYPE_LONG else 'd'
-    num_items = int(unpacked_header[0] / 8)
+    if as_ndarray:
+        import numpy
+
+        return numpy.frombuffer(encoded_array,
+                                dtype='<f8' if is_double else '<i8',
+                                count=values_len // 8,
+                                offset=_header_len)
 
     # decode the values
-    return list(struct.unpack(typecode * num_items, values))
+    values = array.array('d' if is_double else 'q')
+    values.frombytes(memoryview(encoded_array)[_header_len:_header_len + values_len])
+
+    if not _little_endian:
+        values.byteswap()
+
+    return values.tolist()
+
+
+def _get_typecode(array_value):
+    if isinstance(array_value, array.array):
+        return array_value.typecode
+
+    if _is_ndarray(array_value):
+        return 'd' if array_value.dtype.kind == 'f' else 'q'
+
+    raise ValueError('A typecode is required to encode a {0}'.format(type(array_value)))
+
+
+def _to_buffer(array_value, is_double):
+    """Returns the values as a buffer of little endian int64s / float64s"""
+    typecode = 'd' if is_double else 'q'
+
+    if _is_ndarray(array_value):
+        import numpy
+
+        # only copies if the array isn't already of the right dtype and contiguous
+        return memoryview(numpy.ascontiguousarray(array_value.ravel(), dtype='<f8' if is_double else '<i8')).cast('B')
+
+    if isinstance(array_value, array.array):
+
+        # e.g. 'l' is 4 bytes on some platforms, and 'i' / 'f' always are
+        if array_value.itemsize != 8 or (array_value.typecode == 'd') != is_double:
+            array_value = array.array(typecode, array_value)
+
+        if not _little_endian:
+            array_value = array.array(typecode, array_value)
+            array_value.byteswap()
+
+        return memoryview(array_value).cast('B')
+
+    # a count rather than a typecode per item, so that the format doesn't grow with the values
+    return struct.pack('<{0}{1}'.format(len(array_value), typecode), *array_value)
+
+
+def _is_ndarray(value):
+
+    # numpy is optional. if it wasn't imported, value can't be an ndarray
+    numpy = sys.modules.get('numpy')
+
+    return numpy is not None and isinstance(value, numpy.ndarray)
@@ -0,0 +1,148 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy
+import pyarrow
+import ujson
+
+import v3io.dataplane.kv_columns
+
+# field type in a KV schema file -> arrow type
+_schema_file_field_types = {
+    'string': pyarrow.string(),
+    'long': pyarrow.int64(),
+    'int': pyarrow.int64(),
+    'double': pyarrow.float64(),
+    'float': pyarrow.float64(),
+    'boolean': pyarrow.bool_(),
+    'timestamp': pyarrow.timestamp('ns', tz='UTC'),
+    'blob': pyarrow.binary(),
+}
+
+# kv arrays are of int64 or float64, which can't be told apart from a single page
+_array_type = pyarrow.list_(pyarrow.float64())
+
+
+def read_schema_file(contents):
+    """Converts the contents of a KV schema file (as written by kv.create_schema) to an arrow schema
+
+    Parameters
+    ----------
+    contents (Required) : str or bytes
+        The contents of the table's .#schema file
+
+    Return Value
+    ----------
+    A (`pyarrow.Schema`, key field name) tuple
+    """
+    schema_file = ujson.loads(contents)
+    fields = []
+
+    for field in schema_file.get('fields', []):
+        field_type = _schema_file_field_types.get(field['type'])
+        if field_type is None:
+            raise ValueError('Unsupported type {0} of field {1}'.format(field['type'], field['name']))
+
+        fields.append(pyarrow.field(field['name'], field_type, field.get('nullable', True)))
+
+    return pyarrow.schema(fields), schema_file.get('key')
+
+
+class RecordBatchBuilder(object):
+
+    def __init__(self, schema=None, key=None):
+        """Builds an arrow RecordBatch from each page of typed items (as returned by the GetItems web API), going
+        through NumPy columns rather than per-item dicts.
+
+        Parameters
+        ----------
+        schema (Optional) : pyarrow.Schema
+            The schema of all record batches. Attributes that aren't in the schema are dropped, and fields that
+            aren't in a page are null. Binary fields whose values in the first page are arrays (e.g. 'blob' fields
+            of a schema file) become lists of doubles. If not passed, the schema is inferred from the first page -
+            numbers and arrays are inferred as doubles and lists of doubles, since later pages may hold fractions
+        key (Optional) : str
+            The name of the key field. If the items don't have such an attribute, it's populated from the
+            item names (the __name attribute), if they were requested
+        """
+        self.schema = schema
+        self._key = key
+        self._resolve_binary_fields = schema is not None
+
+    def build(self, typed_items):
+        columns_builder = v3io.dataplane.kv_columns.ColumnsBuilder()
+        columns_builder.add_items(typed_items)
+        columns = columns_builder.build()
+
+        if self._key is not None and self._key not in columns and '__name' in columns:
+            columns[self._key] = columns['__name']
+
+        if self.schema is None:
+            self.schema = pyarrow.schema([pyarrow.field(attribute_name, _infer_arrow_type(column))
+                                          for attribute_name, column in columns.items()])
+
+        # blobs holding arrays are lists, whatever the schema says
+        elif self._resolve_binary_fields:
+            self._resolve_binary_fields = False
+
+            for field_index, field in enumerate(self.schema):
+                column = columns.get(field.name)
+
+                if field.type == pyarrow.binary() and column is not None and _holds_arrays(column):
+                    self.schema = self.schema.set(field_index, field.with_type(_array_type))
+
+        arrays = []
+        for field in self.schema:
+            column = columns.get(field.name)
+
+            if column is None:
+                arrays.append(pyarrow.nulls(columns_builder.num_rows, field.type))
+            else:
+                arrays.append(_to_arrow_array(column, field.type))
+
+        return pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+
+def _infer_arrow_type(column):
+    if _holds_arrays(column):
+        return _array_type
+
+    if column.dtype.kind in 'iu':
+        return pyarrow.float64()
+
+    return _to_arrow_array(column).type
+
+
+def _holds_arrays(column):
+    if column.ndim > 1:
+        return True
+
+    return column.dtype == object and any(isinstance(value, numpy.ndarray) for value in column)
+
+
+def _to_arrow_array(column, arrow_type=None):
+
+    # arrays of the same length - the values are a single buffer, so there's nothing to convert per item
+    if column.ndim > 1:
+        num_rows, row_length = column.shape
+        offsets = pyarrow.array(numpy.arange(0, (num_rows + 1) * row_length, row_length, dtype=numpy.int32))
+        array = pyarrow.ListArray.from_arrays(offsets, pyarrow.array(column.ravel()))
+
+        return array if arrow_type is None else array.cast(arrow_type)
+
+    if arrow_type is None and column.dtype.kind == 'M':
+        arrow_type = pyarrow.timestamp('ns', tz='UTC')
+
+    # from_pandas so that NaN and NaT are converted to nulls
+    return pyarrow.array(column, type=arrow_type, from_pandas=True)
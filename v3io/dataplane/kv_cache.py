@@ -0,0 +1,205 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import collections
+import os
+import threading
+import time
+
+import v3io.common.helpers
+
+
+class Entries(object):
+
+    def __init__(self, max_entries, ttl=None):
+        """A bounded map of (item path, attribute names, access key) -> get response (see get_entry_key()). Once
+        full, the least recently used entry is evicted. Safe to use from multiple threads.
+
+        Parameters
+        ----------
+        max_entries (Required) : int
+            The max number of entries
+        ttl (Optional) : float
+            The number of seconds an entry is valid for. If not passed, entries are valid until evicted or
+            invalidated
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        # entry key -> (expiration time, response), least recently used first
+        self._entries = collections.OrderedDict()
+
+        # item path -> entry keys, one per set of attribute names and access key
+        self._entry_keys_by_item = {}
+
+        # incremented on every invalidation, so that a response read before an invalidation isn't cached after it
+        self.version = 0
+
+        self._lock = threading.Lock()
+
+    def get(self, entry_key):
+        """Returns the cached response, or None (counting a hit or a miss)"""
+        with self._lock:
+            entry = self._entries.get(entry_key)
+
+            if entry is not None:
+                expiration_time, response = entry
+
+                if expiration_time is None or expiration_time > time.monotonic():
+                    self._entries.move_to_end(entry_key)
+                    self.hits += 1
+
+                    return response
+
+                self._remove(entry_key)
+
+            self.misses += 1
+
+            return None
+
+    def set(self, entry_key, response, version):
+        """Caches a response, unless the entries were invalidated since version was read"""
+        with self._lock:
+            if version != self.version:
+                return
+
+            expiration_time = None if self.ttl is None else time.monotonic() + self.ttl
+
+            self._entries[entry_key] = (expiration_time, response)
+            self._entries.move_to_end(entry_key)
+            self._entry_keys_by_item.setdefault(entry_key[0], set()).add(entry_key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, container, table_path, key):
+        """Removes the entries of an item, whatever their attribute names"""
+        with self._lock:
+            self.version += 1
+
+            for entry_key in self._entry_keys_by_item.pop(get_item_path(container, table_path, key), ()):
+                del self._entries[entry_key]
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._entry_keys_by_item.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, entry_key):
+        del self._entries[entry_key]
+
+        item_entry_keys = self._entry_keys_by_item[entry_key[0]]
+        item_entry_keys.discard(entry_key)
+
+        if not item_entry_keys:
+            del self._entry_keys_by_item[entry_key[0]]
+
+
+def get_entry_key(container, table_path, key, attribute_names, access_key=None):
+
+    # lists aren't hashable
+    if not isinstance(attribute_names, str):
+        attribute_names = tuple(attribute_names)
+
+    # a response read with one access key isn't served to the holder of another, which may not be allowed to read it
+    return get_item_path(container, table_path, key), attribute_names, access_key
+
+
+def get_item_path(container, table_path, key):
+    """Returns the path of an item as requested, so that all spellings of the table path ('tbl', 'tbl/',
+    '/tbl') are the same item"""
+    return v3io.common.helpers.url_join(container, os.path.join(table_path, key))
+
+
+class Cache(object):
+
+    def __init__(self, kv, max_entries=1024, ttl=60.0):
+        """A read through cache of items, in front of a KV model. Gets of the same item and attribute names are
+        served from memory. Writes through the KV model (including those made through the cache) invalidate the
+        item's entries - writes made elsewhere are only seen once the entries expire.
+
+        Cached responses are shared by all readers and must not be modified.
+
+        Parameters
+        ----------
+        kv (Required) : v3io.dataplane.kv.Model
+            The model through which items are read and written
+        max_entries (Optional) : int
+            The max number of cached responses. Once reached, the least recently used is evicted
+        ttl (Optional) : float
+            The number of seconds a response is served from the cache. If None, until it's evicted or invalidated
+        """
+        self._kv = kv
+        self.entries = Entries(max_entries, ttl)
+
+    @property
+    def hits(self):
+        return self.entries.hits
+
+    @property
+    def misses(self):
+        return self.entries.misses
+
+    def get(self, container, table_path, key, access_key=None, raise_for_status=None, attribute_names='*'):
+        """Retrieves the requested attributes of a table item, from the cache if possible (see kv.get()). Only
+        successful responses are cached.
+
+        Return Value
+        ----------
+        A `Response` object, whose `output` is `GetItemOutput`.
+        """
+        entry_key = get_entry_key(container, table_path, key, attribute_names, access_key)
+
+        response = self.entries.get(entry_key)
+        if response is not None:
+            return response
+
+        # an item written while the get is in flight isn't cached
+        version = self.entries.version
+        response = self._kv.get(container,
+                                table_path,
+                                key,
+                                access_key=access_key,
+                                raise_for_status=raise_for_status,
+                                attribute_names=attribute_names)
+
+        if response.status_code == 200:
+            self.entries.set(entry_key, response, version)
+
+        return response
+
+    def put(self, container, table_path, key, attributes, **kw_args):
+        """Puts an item (see kv.put()), which invalidates its cached entries"""
+        return self._kv.put(container, table_path, key, attributes, **kw_args)
+
+    def update(self, container, table_path, key, **kw_args):
+        """Updates an item (see kv.update()), which invalidates its cached entries"""
+        return self._kv.update(container, table_path, key, **kw_args)
+
+    def delete(self, container, table_path, key, **kw_args):
+        """Deletes an item (see kv.delete()), which invalidates its cached entries"""
+        return self._kv.delete(container, table_path, key, **kw_args)
+
+    def invalidate(self, container, table_path, key):
+        """Removes the cached entries of an item, e.g. after it was written elsewhere"""
+        self.entries.invalidate(container, table_path, key)
+
+    def clear(self):
+        self.entries.clear()
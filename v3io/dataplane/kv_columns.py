@@ -0,0 +1,245 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import base64
+
+import numpy
+
+import v3io.dataplane.kv_array
+import v3io.dataplane.kv_timestamp
+
+_array_header_len = len(v3io.dataplane.kv_array.ITEM_HEADER_MAGIC_AND_VERSION) + 8
+
+# marks items that don't have an attribute
+_missing = object()
+
+
+class ColumnsBuilder(object):
+
+    def __init__(self):
+        """Builds NumPy arrays, one per attribute, from typed items (as returned by the GetItems web API) without
+        decoding them into per-item dicts. Attributes are converted according to their type:
+
+        N - int64, or float64 if any of the values is fractional or missing (NaN)
+        S - object (str), None if missing
+        BOOL - bool, or object if missing (None)
+        TS - datetime64[ns] (UTC), NaT if missing
+        B - if all items have the attribute and all values are arrays of the same length and type, a 2D
+            int64/float64 array (one row per item). Otherwise, object (bytes / 1D arrays), None if missing
+
+        An attribute with values of different types is returned as an object array of the decoded values
+        """
+        self.num_rows = 0
+        self._columns = {}
+
+    def add_items(self, typed_items):
+        """Adds a page of typed items (e.g. GetItemsOutput.typed_items)"""
+        columns = self._columns
+        row_index = self.num_rows
+
+        for typed_item in typed_items:
+            for attribute_name, typed_value in typed_item.items():
+                column = columns.get(attribute_name)
+                if column is None:
+                    column = columns[attribute_name] = _Column()
+
+                for attribute_type, attribute_value in typed_value.items():
+
+                    # the common case - the column only has values of this type, and one for every previous item
+                    if attribute_type == column.attribute_type and len(column.values) == row_index and \
+                            column.attribute_types is None:
+                        column.values.append(attribute_value)
+                    else:
+                        column.add(row_index, attribute_type, attribute_value)
+
+            row_index += 1
+
+        self.num_rows = row_index
+
+    def build(self):
+        """Returns a dict of attribute name -> NumPy array, each with num_rows elements"""
+        return {attribute_name: column.build(self.num_rows) for attribute_name, column in self._columns.items()}
+
+
+def to_dataframe(columns):
+    """Creates a pandas DataFrame from the columns returned by ColumnsBuilder.build(). 2D (array) columns become
+    columns of 1D arrays and timestamps become UTC aware"""
+    import pandas
+
+    data = {}
+    for attribute_name, column in columns.items():
+        if column.ndim > 1:
+            column = _to_object_array(list(column))
+        elif column.dtype.kind == 'M':
+            column = pandas.Series(column).dt.tz_localize('UTC')
+
+        data[attribute_name] = column
+
+    return pandas.DataFrame(data)
+
+
+class _Column(object):
+
+    def __init__(self):
+
+        # a value per item, _missing for items without the attribute
+        self.values = []
+        self.has_missing_values = False
+        self.attribute_type = None
+
+        # only populated once values of different types are added
+        self.attribute_types = None
+
+    def add(self, row_index, attribute_type, attribute_value):
+        if attribute_type != self.attribute_type and self.attribute_types is None:
+            if self.attribute_type is None:
+                self.attribute_type = attribute_type
+            else:
+                self.attribute_types = [self.attribute_type] * len(self.values)
+
+        self._pad(row_index)
+        self.values.append(attribute_value)
+
+        if self.attribute_types is not None:
+            self.attribute_types.append(attribute_type)
+
+    def build(self, num_rows):
+        self._pad(num_rows)
+
+        if self.attribute_types is None:
+            if not self.has_missing_values:
+                return _build_values(self.attribute_type, self.values)
+
+            rows = [row_index for row_index, value in enumerate(self.values) if value is not _missing]
+            values = _build_values(self.attribute_type, [self.values[row_index] for row_index in rows])
+
+            return _spread(values, rows, num_rows)
+
+        # build each type on its own and merge them to an object array
+        rows_by_type = {}
+        values_by_type = {}
+        for row_index, (attribute_type, attribute_value) in enumerate(zip(self.attribute_types, self.values)):
+            if attribute_value is not _missing:
+                rows_by_type.setdefault(attribute_type, []).append(row_index)
+                values_by_type.setdefault(attribute_type, []).append(attribute_value)
+
+        column = numpy.empty(num_rows, dtype=object)
+        for attribute_type, rows in rows_by_type.items():
+            values = _build_values(attribute_type, values_by_type[attribute_type])
+
+            # prefer python scalars over numpy ones, but keep arrays and timestamps as they are
+            if values.ndim == 1 and values.dtype.kind != 'M':
+                values = values.tolist()
+
+            for row_index, value in zip(rows, values):
+                column[row_index] = value
+
+        return column
+
+    def _pad(self, num_rows):
+        num_missing = num_rows - len(self.values)
+
+        if num_missing > 0:
+            self.values.extend([_missing] * num_missing)
+            self.has_missing_values = True
+
+            if self.attribute_types is not None:
+                self.attribute_types.extend([None] * num_missing)
+
+
+def _build_values(attribute_type, values):
+    if attribute_type == 'N':
+        return _build_numbers(values)
+
+    if attribute_type == 'TS':
+        return _build_timestamps(values)
+
+    if attribute_type == 'B':
+        return _build_blobs(values)
+
+    if attribute_type == 'BOOL':
+        return numpy.array(values, dtype=bool)
+
+    if attribute_type == 'S':
+        return _to_object_array([value if isinstance(value, str) else str(value) for value in values])
+
+    return _to_object_array(values)
+
+
+def _build_numbers(values):
+    values = numpy.array(values)
+
+    # numbers are usually received as strings. try to parse the entire column as integers first
+    if values.dtype.kind in 'US':
+        try:
+            return values.astype(numpy.int64)
+        except (ValueError, OverflowError):
+            return values.astype(numpy.float64)
+
+    return values
+
+
+def _build_timestamps(values):
+    return v3io.dataplane.kv_timestamp.decode_datetime64(values)
+
+
+def _build_blobs(values):
+    blobs = [base64.b64decode(value) for value in values]
+
+    # if all blobs are arrays of the same type and length, stack them into a 2D array
+    array_header = v3io.dataplane.kv_array.ITEM_HEADER_MAGIC_AND_VERSION
+    if blobs and all(len(blob) >= _array_header_len and blob.startswith(array_header) for blob in blobs):
+        arrays = [_decode_array(blob) for blob in blobs]
+
+        if len(set((array.dtype, len(array)) for array in arrays)) == 1:
+            return numpy.stack(arrays)
+
+        return _to_object_array(arrays)
+
+    return _to_object_array(blobs)
+
+
+def _decode_array(blob):
+    return v3io.dataplane.kv_array.decode(blob, as_ndarray=True)
+
+
+def _to_object_array(values):
+    column = numpy.empty(len(values), dtype=object)
+
+    # assign one by one so that numpy doesn't try to broadcast sequences (e.g. arrays)
+    for value_index, value in enumerate(values):
+        column[value_index] = value
+
+    return column
+
+
+def _spread(values, rows, num_rows):
+    """Places the values of the rows that have the attribute in a column of num_rows, marking the rest as missing"""
+    if len(rows) == num_rows:
+        return values
+
+    # arrays (rows of a 2D array) become a column of 1D arrays, with None for the missing rows
+    if values.ndim > 1:
+        values = _to_object_array(list(values))
+        column = numpy.empty(num_rows, dtype=object)
+    elif values.dtype.kind in 'iuf':
+        column = numpy.full(num_rows, numpy.nan)
+    elif values.dtype.kind == 'M':
+        column = numpy.full(num_rows, numpy.datetime64('NaT'), dtype=values.dtype)
+    else:
+        column = numpy.empty(num_rows, dtype=object)
+
+    column[rows] = values
+
+    return column
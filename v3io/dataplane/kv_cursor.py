@@ -12,6 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import queue
+import threading
+
+import v3io.dataplane.output
+
+
 class Cursor(object):
 
     def __init__(self,
@@ -28,11 +34,14 @@ class Cursor(object):
                  segment=None,
                  total_segments=None,
                  sort_key_range_start=None,
-                 sort_key_range_end=None):
+                 sort_key_range_end=None,
+                 prefetch=None,
+                 field_types=None):
         self._context = context
         self._container_name = container_name
         self._access_key = access_key
-        self._current_response = None
+        self._pages = None
+        self._current_output = None
         self._current_items = None
         self._current_item = None
         self._current_item_index = 0
@@ -51,58 +60,306 @@ class Cursor(object):
         self.sort_key_range_start = sort_key_range_start
         self.sort_key_range_end = sort_key_range_end
 
+        # number of pages to read ahead in the background, while the current page is consumed
+        self.prefetch = prefetch
+
+        # decodes the items of every page. the types of attributes that aren't in field_types (schema field
+        # types, see v3io.dataplane.output.TypedAttributesDecoder) are learned from the first page
+        self._decoder = v3io.dataplane.output.TypedAttributesDecoder(field_types, learn=True)
+
     def next_item(self):
-        calculated_limit = self.limit
 
-        # check if we already reached the limit we were asked for
-        if self.limit is not None:
+        # if we already passed the limit, stop here
+        if self.limit is not None and self._total_items_read >= self.limit:
+            return None
+
+        # if we don't have the item in memory (from the previous scan), get the next page
+        while self._current_item_index >= len(self._current_items or []):
+            if self._pages is None:
+                self._pages = self._iter_prefetched_pages() if self.prefetch else self._iter_pages()
 
-            # if we already passed the limit, stop here
-            if self._total_items_read >= self.limit:
+            output = next(self._pages, None)
+            if output is None:
                 return None
 
+            self._set_current_output(output)
+            self._current_items = self._decoder.decode_items(output.typed_items)
+            self._current_item_index = 0
+
+        self._current_item = self._current_items[self._current_item_index]
+        self._current_item_index += 1
+        self._total_items_read += 1
+
+        return self._current_item
+
+    def all(self):
+        items = []
+
+        while True:
+            item = self.next_item()
+
+            if item is None:
+                break
+
+            items.append(item)
+
+        return items
+
+    def to_columns(self):
+        """Reads the rest of the items straight into NumPy arrays, one per attribute, without creating a dict per
+        item. Requires numpy. See v3io.dataplane.kv_columns.ColumnsBuilder for how attributes are converted.
+
+        Return Value
+        ----------
+        A dict of attribute name -> NumPy array (one element per item)
+        """
+        import v3io.dataplane.kv_columns
+
+        columns_builder = v3io.dataplane.kv_columns.ColumnsBuilder()
+
+        for typed_items in self._iter_remaining_typed_items():
+            columns_builder.add_items(typed_items)
+
+        return columns_builder.build()
+
+    def to_record_batches(self, schema=None, key=None):
+        """Reads the rest of the items as arrow record batches, one per page. Requires pyarrow. See
+        v3io.dataplane.kv_arrow.RecordBatchBuilder for how the schema is applied or inferred.
+
+        Parameters
+        ----------
+        schema (Optional) : pyarrow.Schema
+            The schema of the record batches. If not passed, it's inferred from the first page
+        key (Optional) : str
+            The name of the key field, populated from the item names if the items don't have such an attribute
+
+        Return Value
+        ----------
+        A generator of `pyarrow.RecordBatch` objects
+        """
+        import v3io.dataplane.kv_arrow
+
+        record_batch_builder = v3io.dataplane.kv_arrow.RecordBatchBuilder(schema, key)
+
+        for typed_items in self._iter_remaining_typed_items():
+            if typed_items:
+                yield record_batch_builder.build(typed_items)
+
+    def _iter_remaining_typed_items(self):
+
+        # the rest of the current page
+        if self._current_output is not None:
+            typed_items = self._current_output.typed_items[self._current_item_index:]
+            self._current_item_index = len(self._current_items)
+            self._total_items_read += len(typed_items)
+
+            yield typed_items
+
+        if self._pages is None:
+            self._pages = self._iter_prefetched_pages() if self.prefetch else self._iter_pages()
+
+        while True:
+            output = next(self._pages, None)
+            if output is None:
+                return
+
+            self._set_current_output(output)
+            self._current_items = output.typed_items
+            self._current_item_index = len(output.typed_items)
+            self._total_items_read += len(output.typed_items)
+
+            yield output.typed_items
+
+    def close(self):
+        """Stops reading pages in the background. Only required if the cursor was created with prefetch and isn't
+        read to the end"""
+        if self._pages is not None:
+            self._pages.close()
+
+    def _set_current_output(self, output):
+
+        # like the items, the marker is that of the page being read - pages read ahead don't move it
+        if self._current_output is not None:
+            self.marker = self._current_output.next_marker
+
+        self._current_output = output
+
+    def _iter_prefetched_pages(self):
+        pages = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def _read_pages():
+            try:
+                for page in self._iter_pages():
+                    pages.put(page)
+
+                    if stop.is_set():
+                        break
+
+            # hand the error over to the reader, instead of the end of the pages
+            except BaseException as e:
+                pages.put(e)
+                return
+
+            pages.put(None)
+
+        threading.Thread(target=_read_pages, daemon=True).start()
+        done = False
+
+        try:
+            while True:
+                page = pages.get()
+                done = page is None or isinstance(page, BaseException)
+
+                if page is None:
+                    return
+
+                if done:
+                    raise page
+
+                yield page
+        finally:
+
+            # if the reader stopped early, unblock the thread until it's done
+            stop.set()
+            while not done:
+                page = pages.get()
+                done = page is None or isinstance(page, BaseException)
+
+    def _iter_pages(self, items_budget=None):
+        """Yields the output (GetItemsOutput) of every scan, starting at the cursor's marker and stopping once the
+        last page or the limit (or the items_budget, an ItemsBudget shared with other cursors) is reached.
+        Independent of next_item()"""
+        marker = self.marker
+        total_items_read = 0
+
+        while True:
+            calculated_limit = self.limit
+
             # don't ask for more items than we'll read
-            calculated_limit -= self._total_items_read
+            if self.limit is not None:
+                calculated_limit -= total_items_read
 
-        # if we already have the item in memory (from the previous scan), return it
-        if self._current_item_index < len(self._current_items or []):
-            self._current_item = self._current_items[self._current_item_index]
-            self._current_item_index += 1
-            self._total_items_read += 1
+            if items_budget is not None:
+                calculated_limit = items_budget.get_page_limit(calculated_limit)
 
-            return self._current_item
+            if calculated_limit is not None and calculated_limit <= 0:
+                return
 
-        # if we had a response which was signaled as last, or we didn't get a responsereturn none
-        if self._current_response and (self._current_response.output.last or len(self._current_items) == 0):
-            return None
+            response = self._context.kv.scan(self._container_name,
+                                             self.table_path,
+                                             self._access_key,
+                                             self.raise_for_status,
+                                             None,
+                                             self.attribute_names,
+                                             self.filter_expression,
+                                             marker,
+                                             self.sharding_key,
+                                             calculated_limit,
+                                             self.segment,
+                                             self.total_segments,
+                                             self.sort_key_range_start,
+                                             self.sort_key_range_end)
+
+            # raise if there was an issue
+            response.raise_for_status(self.raise_for_status)
 
-        self.marker = self._current_response.output.next_marker if self._current_response else None
-
-        # get the next batch
-        self._current_response = self._context.kv.scan(self._container_name,
-                                                       self.table_path,
-                                                       self._access_key,
-                                                       self.raise_for_status,
-                                                       None,
-                                                       self.attribute_names,
-                                                       self.filter_expression,
-                                                       self.marker,
-                                                       self.sharding_key,
-                                                       calculated_limit,
-                                                       self.segment,
-                                                       self.total_segments,
-                                                       self.sort_key_range_start,
-                                                       self.sort_key_range_end)
-
-        # raise if there was an issue
-        self._current_response.raise_for_status(self.raise_for_status)
-
-        # set items
-        self._current_items = self._current_response.output.items
+            output = response.output
+            total_items_read += len(output.typed_items)
+
+            if items_budget is not None:
+                items_budget.on_page(len(output.typed_items))
+
+            yield output
+
+            if output.last or len(output.typed_items) == 0:
+                return
+
+            marker = output.next_marker
+
+
+class ParallelCursor(object):
+
+    def __init__(self,
+                 context,
+                 container_name,
+                 access_key,
+                 table_path,
+                 total_segments,
+                 raise_for_status=None,
+                 attribute_names='*',
+                 filter_expression=None,
+                 limit=None,
+                 ordered=False,
+                 max_pages_per_segment=2,
+                 field_types=None):
+        """Scans the segments of a table concurrently and merges the items into a single cursor. Segments are
+        scanned by up to max_connections threads, each taking the next segment once its current one is done, and
+        each scanning over its own connection. The scans start on the first call to next_item().
+
+        Parameters
+        ----------
+        total_segments (Required) : int
+            The number of segments to divide the table into (1 to 1024)
+        limit (Optional) : int
+            The max number of items to read, across all segments. Each scan asks for at most its segment's share
+            of it, and the scans stop once it's reached
+        ordered (Optional) : bool
+            False (default) - items are returned in the order their pages were received
+            True - all the items of segment 0 are returned, then all those of segment 1, etc. Segments are still
+            scanned concurrently, but a segment that's ahead stops once it buffered max_pages_per_segment pages
+        max_pages_per_segment (Optional) : int
+            The max number of pages buffered per segment, waiting to be read
+        field_types (Optional) : dict
+            Attribute name -> schema field type, used to decode the items (see Cursor)
+        """
+        self.table_path = table_path
+        self.total_segments = total_segments
+        self.limit = limit
+        self.ordered = ordered
+        self._current_items = []
+        self._decoder = v3io.dataplane.output.TypedAttributesDecoder(field_types, learn=True)
         self._current_item_index = 0
+        self._total_items_read = 0
+        self._closed = threading.Event()
+        self._max_pages_per_segment = max_pages_per_segment
+        self._segment_pages = None
+        self._num_running_segments = total_segments
+        self._current_segment = 0
+
+        # segments beyond max_connections would only wait for a connection - a worker scans a segment at a time
+        self._num_workers = min(total_segments, context._transport.max_connections)
+
+        self._segment_cursors = [Cursor(context,
+                                        container_name,
+                                        access_key,
+                                        table_path,
+                                        raise_for_status,
+                                        attribute_names,
+                                        filter_expression,
+                                        segment=segment,
+                                        total_segments=total_segments) for segment in range(total_segments)]
+
+    def next_item(self):
+
+        # if we already passed the limit, stop here
+        if self.limit is not None and self._total_items_read >= self.limit:
+            self.close()
+            return None
+
+        while self._current_item_index >= len(self._current_items):
+            items = self._get_next_page_items()
+            if items is None:
+                return None
+
+            self._current_items = items
+            self._current_item_index = 0
+
+        item = self._current_items[self._current_item_index]
+        self._current_item_index += 1
+        self._total_items_read += 1
 
-        # and recurse into next now that we repopulated response
-        return self.next_item()
+        return item
 
     def all(self):
         items = []
@@ -116,3 +373,114 @@ class Cursor(object):
             items.append(item)
 
         return items
+
+    def close(self):
+        """Stops the segment scans. Must be called if the cursor isn't read to the end"""
+        self._closed.set()
+
+        # the scans never started
+        if self._segment_pages is None:
+            self._num_running_segments = 0
+
+        # unblock the workers until all the segments are done
+        while self._num_running_segments:
+            page = self._segment_pages[self._current_segment].get()
+
+            if page is None or isinstance(page, BaseException):
+                self._on_segment_done()
+
+    def _get_next_page_items(self):
+        if self._segment_pages is None and not self._closed.is_set():
+            self._start_segment_scans()
+
+        while self._num_running_segments:
+            page = self._segment_pages[self._current_segment].get()
+
+            if page is None:
+                self._on_segment_done()
+            elif isinstance(page, BaseException):
+                self._on_segment_done()
+                self.close()
+                raise page
+            else:
+                return self._decoder.decode_items(page.typed_items)
+
+        return None
+
+    def _on_segment_done(self):
+        self._num_running_segments -= 1
+
+        # in ordered mode, move on to the next segment's queue
+        if self.ordered and self._num_running_segments:
+            self._current_segment += 1
+
+    def _start_segment_scans(self):
+
+        # in ordered mode each segment has its own queue, otherwise they share one
+        if self.ordered:
+            self._segment_pages = [queue.Queue(maxsize=self._max_pages_per_segment)
+                                   for _ in range(self.total_segments)]
+        else:
+            self._segment_pages = [queue.Queue(maxsize=self._max_pages_per_segment * self.total_segments)] * \
+                self.total_segments
+
+        items_budget = ItemsBudget(self.limit, self._num_workers) if self.limit is not None else None
+
+        # workers take the segments in order, so that in ordered mode the segment being read is always scanned
+        segment_cursors = iter(self._segment_cursors)
+        next_segment_lock = threading.Lock()
+
+        for _ in range(self._num_workers):
+            threading.Thread(target=self._scan_segments,
+                             args=(segment_cursors, next_segment_lock, items_budget),
+                             daemon=True).start()
+
+    def _scan_segments(self, segment_cursors, next_segment_lock, items_budget):
+        while True:
+            with next_segment_lock:
+                segment_cursor = next(segment_cursors, None)
+
+            if segment_cursor is None:
+                return
+
+            self._scan_segment(segment_cursor, self._segment_pages[segment_cursor.segment], items_budget)
+
+    def _scan_segment(self, segment_cursor, pages, items_budget):
+        try:
+
+            # once closed, the remaining segments are only ended
+            if not self._closed.is_set():
+                for page in segment_cursor._iter_pages(items_budget):
+                    if self._closed.is_set():
+                        break
+
+                    pages.put(page)
+
+        # hand the error over to the reader, along with the end of the segment
+        except BaseException as e:
+            pages.put(e)
+            return
+
+        pages.put(None)
+
+
+class ItemsBudget(object):
+
+    def __init__(self, limit, num_cursors):
+        """The number of items left to read by cursors scanning concurrently (e.g. the segments of a
+        ParallelCursor) to reach their shared limit. Each scan asks for at most its share of the limit, so the
+        cursors don't read up to the limit each, and they all stop once the limit is reached"""
+        self._lock = threading.Lock()
+        self._items_left = limit
+        self._max_page_limit = max(-(-limit // num_cursors), 1)
+
+    def get_page_limit(self, limit=None):
+        """Returns the limit of a cursor's next scan, given the cursor's own limit. 0 once the budget is spent"""
+        with self._lock:
+            page_limit = min(self._items_left, self._max_page_limit)
+
+        return page_limit if limit is None else min(page_limit, limit)
+
+    def on_page(self, num_items):
+        with self._lock:
+            self._items_left -= num_items
@@ -12,41 +12,84 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import sys
 import datetime
 
-# used only n py2
-BASE_DATETIME = datetime.datetime(1970, 1, 1)
+_epoch = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
 
 
-def _get_timestamp_from_datetime_py3(dt):
-    return dt.astimezone(datetime.timezone.utc).timestamp()
+def encode(dt):
 
+    # integer arithmetic, since a float timestamp can't hold nanoseconds (or even microseconds, far enough from
+    # the epoch). naive datetimes are in local time
+    delta = dt.astimezone(datetime.timezone.utc) - _epoch
+    seconds = delta.days * 86400 + delta.seconds
 
-def _get_timestamp_from_datetime_py2(dt):
-    return (dt - BASE_DATETIME).total_seconds()
+    # pandas.Timestamp has nanoseconds on top of microseconds
+    nanoseconds = delta.microseconds * 1000 + getattr(dt, 'nanosecond', 0)
 
+    return '{}:{}'.format(seconds, nanoseconds)
 
-# _get_timestamp_from_datetime is python version specific. resolve this once
-if sys.version_info[0] >= 3:
-    _get_timestamp_from_datetime = _get_timestamp_from_datetime_py3
-else:
-    _get_timestamp_from_datetime = _get_timestamp_from_datetime_py2
 
+def decode(encoded_dt):
+    seconds_str, nanoseconds_str = encoded_dt.split(':')
 
-def encode(dt):
-    timestamp = _get_timestamp_from_datetime(dt)
+    # datetime only has microseconds
+    return _epoch + datetime.timedelta(seconds=int(seconds_str), microseconds=int(nanoseconds_str) // 1000)
 
-    # get integer and float part of nanoseconds
-    seconds, nanoseconds_float = divmod(timestamp, 1)
-    nanoseconds = int(nanoseconds_float * 1e9)
 
-    return '{}:{}'.format(int(seconds), nanoseconds)
+def encode_datetime64(values):
+    """Encodes many timestamps at once, without a datetime object per timestamp. Requires numpy.
 
+    Parameters
+    ----------
+    values (Required) : numpy.ndarray of datetime64, pandas.Series / DatetimeIndex
+        The timestamps. Naive timestamps are taken as UTC, aware ones are converted to UTC
 
-def decode(encoded_dt):
-    seconds_str, nanoseconds_str = encoded_dt.split(':')
+    Return Value
+    ----------
+    A list of encoded timestamps (None for NaT)
+    """
+    import numpy
+
+    # pandas aware timestamps (Series or DatetimeIndex) - converting to no timezone converts to naive UTC
+    timestamps_accessor = getattr(values, 'dt', values)
+    if getattr(timestamps_accessor, 'tz', None) is not None:
+        values = timestamps_accessor.tz_convert(None)
+
+    timestamps = numpy.asarray(values, dtype='datetime64[ns]')
+    seconds, nanoseconds = numpy.divmod(timestamps.view(numpy.int64), 1000000000)
+
+    encoded_values = ['{}:{}'.format(value_seconds, value_nanoseconds)
+                      for value_seconds, value_nanoseconds in zip(seconds.tolist(), nanoseconds.tolist())]
+
+    for value_index in numpy.flatnonzero(numpy.isnat(timestamps)).tolist():
+        encoded_values[value_index] = None
+
+    return encoded_values
+
+
+def decode_datetime64(encoded_values):
+    """Decodes many timestamps at once to a numpy datetime64[ns] array (UTC), without a datetime object per
+    timestamp. Requires numpy.
+
+    Parameters
+    ----------
+    encoded_values (Required) : sequence of str
+        The encoded timestamps ("seconds:nanoseconds"). None is decoded as NaT
+
+    Return Value
+    ----------
+    A numpy.ndarray of datetime64[ns]
+    """
+    import numpy
+
+    missing = [value_index for value_index, encoded_value in enumerate(encoded_values) if encoded_value is None]
+    if missing:
+        encoded_values = ['0:0' if encoded_value is None else encoded_value for encoded_value in encoded_values]
 
-    timestamp = int(seconds_str) + (int(nanoseconds_str) / 1e9)
+    # parse all the seconds and nanoseconds in one go - every other number is seconds
+    numbers = numpy.array(' '.join(encoded_values).replace(':', ' ').split(), dtype=numpy.int64)
+    timestamps = (numbers[0::2] * 1000000000 + numbers[1::2]).view('datetime64[ns]')
+    timestamps[missing] = numpy.datetime64('NaT')
 
-    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+    return timestamps
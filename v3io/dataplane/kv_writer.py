@@ -0,0 +1,255 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import collections
+import threading
+
+import v3io.dataplane.response
+import v3io.dataplane.transport
+
+
+class BufferedWriter(object):
+
+    def __init__(self, kv, container, table_path, flush_interval=1.0, max_items=1000, access_key=None):
+        """Buffers writes to the items of a table and sends them in the background, pipelined over all connections.
+        Writes to an item that's already buffered are merged with its pending write where possible, so that an
+        item that's written many times between flushes costs a single request:
+
+        put + put - the latter put
+        put + update with attributes - a put of the merged attributes
+        update with attributes + update with attributes - an update of the merged attributes
+        update with an expression + update with an expression - an update of both expressions ("a; b")
+
+        Writes that can't be merged (e.g. an expression after a put) are sent in order, each in a later round of
+        the flush.
+
+        Parameters
+        ----------
+        kv (Required) : v3io.dataplane.kv.Model
+            The model through which items are written
+        container (Required) : str
+            The container on which to operate.
+        table_path (Required) : str
+            The full path of the table
+        flush_interval (Optional) : float
+            The max number of seconds a write is buffered
+        max_items (Optional) : int
+            The max number of items buffered. Once reached, the buffer is flushed and writers block until it's
+            written
+        access_key (Optional) : str
+            The access key with which to authenticate. Defaults to that of the client
+        """
+        self.container = container
+        self.table_path = table_path
+        self.flush_interval = flush_interval
+        self.max_items = max_items
+
+        # the outcome of all flushes so far, and the number of writes / requests they took
+        self.result = v3io.dataplane.response.BulkWriteResult()
+        self.num_writes = 0
+        self.num_requests = 0
+
+        self._kv = kv
+        self._access_key = access_key
+
+        # key -> list of pending writes, each a [function name, attributes, expression] list
+        self._pending_writes = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        # the flusher waits for the buffer to fill up, writers blocked on a full buffer wait for it to be flushed
+        self._flush_wanted = threading.Condition(self._lock)
+        self._buffer_flushed = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._flush_error = None
+        self._closed = False
+
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def put(self, key, attributes):
+        """Buffers a write that replaces the item (see kv.put())"""
+        self._add_write(key, 'put', dict(attributes), None)
+
+    def update(self, key, attributes=None, expression=None):
+        """Buffers an update of the item (see kv.update()) - either attributes to set or an update expression"""
+        if (attributes is None) == (expression is None):
+            raise ValueError('One of attributes or expression must be passed')
+
+        self._add_write(key, 'update', None if attributes is None else dict(attributes), expression)
+
+    def flush(self):
+        """Writes everything buffered so far, waiting for the responses.
+
+        Return Value
+        ----------
+        A `BulkWriteResult` object with the outcome of the writes of this flush
+        """
+        self._raise_flush_error()
+
+        return self._flush()
+
+    def close(self):
+        """Writes everything buffered and stops the background flushes.
+
+        Return Value
+        ----------
+        A `BulkWriteResult` object with the outcome of all the writes
+        """
+        with self._lock:
+            self._closed = True
+            self._flush_wanted.notify_all()
+            self._buffer_flushed.notify_all()
+
+        self._flusher.join()
+
+        # write what's buffered even if the flusher failed, then report its error
+        self._flush()
+        self._raise_flush_error()
+
+        return self.result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _add_write(self, key, function_name, attributes, expression):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Writer is closed')
+
+            self._raise_flush_error()
+
+            # backpressure - wait for the buffer to be flushed
+            while key not in self._pending_writes and len(self._pending_writes) >= self.max_items:
+                self._flush_wanted.notify_all()
+                self._buffer_flushed.wait()
+
+                if self._closed:
+                    raise RuntimeError('Writer is closed')
+
+                self._raise_flush_error()
+
+            self.num_writes += 1
+            key_writes = self._pending_writes.get(key)
+
+            if key_writes is None:
+                self._pending_writes[key] = [[function_name, attributes, expression]]
+            elif not _merge_write(key_writes, function_name, attributes, expression):
+                key_writes.append([function_name, attributes, expression])
+
+            # have the flusher start right away
+            if len(self._pending_writes) >= self.max_items:
+                self._flush_wanted.notify_all()
+
+    def _flush_periodically(self):
+        while True:
+            with self._lock:
+                if not self._closed and len(self._pending_writes) < self.max_items:
+                    self._flush_wanted.wait(self.flush_interval)
+
+                if self._closed:
+                    return
+
+            try:
+                self._flush()
+            except Exception as e:
+                with self._lock:
+                    self._flush_error = e
+                    self._buffer_flushed.notify_all()
+
+                return
+
+    def _flush(self):
+
+        # one flush at a time, so that writes to the same item aren't reordered
+        with self._flush_lock:
+            with self._lock:
+                pending_writes = self._pending_writes
+                self._pending_writes = collections.OrderedDict()
+
+                # let the blocked writers in
+                self._buffer_flushed.notify_all()
+
+            result = v3io.dataplane.response.BulkWriteResult()
+            num_requests = 0
+
+            # the n-th write of every item is sent in the n-th round, once the previous writes were acknowledged
+            while pending_writes:
+                requests = (self._encode_write(key, key_writes.pop(0)) for key, key_writes in pending_writes.items())
+
+                for request, response in self._kv._client.create_batch().wait_iter_pairs(requests, _never):
+                    result.add_response(request.encoder_args['key'], response)
+                    self._kv.invalidate_cached_item(self.container, self.table_path, request.encoder_args['key'])
+                    num_requests += 1
+
+                pending_writes = collections.OrderedDict((key, key_writes)
+                                                         for key, key_writes in pending_writes.items() if key_writes)
+
+            with self._lock:
+                self.num_requests += num_requests
+                self.result.success_count += result.success_count
+                self.result.failures.extend(result.failures)
+
+            return result
+
+    def _encode_write(self, key, write):
+        function_name, attributes, expression = write
+
+        if function_name == 'put':
+            return self._kv.put(self.container,
+                                self.table_path,
+                                key,
+                                attributes,
+                                access_key=self._access_key,
+                                raise_for_status=_never,
+                                transport_actions=_encode_only)
+
+        return self._kv.update(self.container,
+                               self.table_path,
+                               key,
+                               access_key=self._access_key,
+                               raise_for_status=_never,
+                               transport_actions=_encode_only,
+                               attributes=attributes,
+                               expression=expression)
+
+    def _raise_flush_error(self):
+        if self._flush_error is not None:
+            raise self._flush_error
+
+
+def _merge_write(key_writes, function_name, attributes, expression):
+    """Merges a write into the last pending write of an item, if possible. Returns whether it was merged"""
+    last_write = key_writes[-1]
+
+    # a put replaces whatever was written before it
+    if function_name == 'put':
+        key_writes[:] = [[function_name, attributes, expression]]
+        return True
+
+    if attributes is not None and last_write[1] is not None:
+        last_write[1].update(attributes)
+        return True
+
+    if expression is not None and last_write[2] is not None:
+        last_write[2] = '{0}; {1}'.format(last_write[2], expression)
+        return True
+
+    return False
+
+
+_never = v3io.dataplane.transport.RaiseForStatus.never
+_encode_only = v3io.dataplane.transport.Actions.encode_only
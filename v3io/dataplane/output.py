@@ -24,40 +24,164 @@ import v3io.dataplane.kv_timestamp
 
 class Output(object):
 
+    # the format of the response body (see v3io.dataplane.response.register_decoder)
+    body_format = 'json'
+
     def _decode_typed_attributes(self, typed_attributes):
+        return _default_typed_attributes_decoder.decode(typed_attributes)
+
+
+class TypedAttributesDecoder(object):
+
+    def __init__(self, field_types=None, learn=False):
+        """Decodes typed attributes (as returned by the GetItem/GetItems web APIs) to python values, by the type
+        of each attribute value. Numbers are parsed as ints or floats by looking at them rather than by trial
+        and error, and blobs are only decoded as arrays if they start with the array header.
+
+        Parameters
+        ----------
+        field_types (Optional) : dict
+            A schema - attribute name -> field type, as passed to kv.create_schema (long, double, string, boolean,
+            timestamp, blob). Values of these attributes are parsed as their field type directly (e.g. a double
+            is always a float). Values of another type are decoded by their own type
+        learn (Optional) : bool
+            If True, the types of attributes that aren't in field_types are learned from the first items
+            passed to decode_items() - numeric attributes whose values are all integers are then parsed as ints
+            without inspecting each value
+        """
+        self._attribute_decoders = {}
+        self._learn = learn
+
+        for attribute_name, field_type in future.utils.viewitems(field_types or {}):
+            if field_type not in _field_type_decoders:
+                raise ValueError('Unsupported type {0} of attribute {1}'.format(field_type, attribute_name))
+
+            self._attribute_decoders[attribute_name] = _field_type_decoders[field_type]
+
+    def decode(self, typed_attributes):
+        """Returns a dict of attribute name -> decoded value"""
         decoded_attributes = {}
+        attribute_decoders = self._attribute_decoders
+        type_decoders = _type_decoders
 
-        for attribute_key, typed_attribute_value in future.utils.viewitems(typed_attributes):
+        for attribute_name, typed_attribute_value in future.utils.viewitems(typed_attributes):
             for attribute_type, attribute_value in future.utils.viewitems(typed_attribute_value):
-                if attribute_type == 'N':
-                    try:
-                        decoded_attribute = int(attribute_value)
-                    except ValueError:
-                        decoded_attribute = float(attribute_value)
-                elif attribute_type == 'B':
-                    decoded_attribute = base64.b64decode(attribute_value)
-
-                    # try to decode as an array
-                    try:
-                        decoded_attribute = v3io.dataplane.kv_array.decode(decoded_attribute)
-                    except BaseException:
-                        pass
-
-                elif attribute_type == 'S':
-                    if type(attribute_value) in [float, int]:
-                        decoded_attribute = str(attribute_value)
-                    else:
-                        decoded_attribute = attribute_value
-
-                elif attribute_type == 'TS':
-                    decoded_attribute = v3io.dataplane.kv_timestamp.decode(attribute_value)
+                attribute_decoder = attribute_decoders.get(attribute_name)
+
+                if attribute_decoder is not None and attribute_decoder[0] == attribute_type:
+                    decode = attribute_decoder[1]
                 else:
-                    decoded_attribute = attribute_value
+                    decode = type_decoders.get(attribute_type, _decode_as_is)
 
-                decoded_attributes[attribute_key] = decoded_attribute
+                decoded_attributes[attribute_name] = decode(attribute_value)
 
         return decoded_attributes
 
+    def decode_items(self, typed_items):
+        """Returns a list of dicts, one per typed item"""
+        if self._learn:
+            self._learn_attribute_types(typed_items)
+            self._learn = False
+
+        decode = self.decode
+
+        return [decode(typed_item) for typed_item in typed_items]
+
+    def _learn_attribute_types(self, typed_items):
+        integer_attribute_names = {}
+
+        for typed_item in typed_items:
+            for attribute_name, typed_attribute_value in future.utils.viewitems(typed_item):
+                number = typed_attribute_value.get('N')
+
+                if number is not None and attribute_name not in self._attribute_decoders:
+                    is_integer = integer_attribute_names.get(attribute_name, True)
+                    integer_attribute_names[attribute_name] = is_integer and _is_integer(number)
+
+        for attribute_name, is_integer in future.utils.viewitems(integer_attribute_names):
+            if is_integer:
+                self._attribute_decoders[attribute_name] = ('N', _decode_long)
+
+
+def _is_integer(value):
+    if type(value) is not str:
+        return type(value) is int
+
+    return value.isdecimal() or (value[:1] in ('-', '+') and value[1:].isdecimal())
+
+
+def _decode_number(value):
+
+    # numbers are received as strings - only parse as an int those that are
+    if _is_integer(value):
+        return int(value)
+
+    return float(value)
+
+
+def _decode_long(value):
+
+    # the attribute is expected to hold integers, so this only raises if the schema is off
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def _decode_double(value):
+    return float(value)
+
+
+def _decode_string(value):
+    if type(value) is str:
+        return value
+
+    return str(value)
+
+
+def _decode_blob(value):
+    decoded_value = base64.b64decode(value)
+
+    if decoded_value.startswith(v3io.dataplane.kv_array.ITEM_HEADER_MAGIC_AND_VERSION):
+        try:
+            return v3io.dataplane.kv_array.decode(decoded_value)
+        except (struct.error, ValueError):
+            pass
+
+    return decoded_value
+
+
+def _decode_timestamp(value):
+    return v3io.dataplane.kv_timestamp.decode(value)
+
+
+def _decode_as_is(value):
+    return value
+
+
+# attribute type -> decoder
+_type_decoders = {
+    'N': _decode_number,
+    'S': _decode_string,
+    'B': _decode_blob,
+    'BOOL': _decode_as_is,
+    'TS': _decode_timestamp,
+}
+
+# schema field type -> (attribute type, decoder)
+_field_type_decoders = {
+    'long': ('N', _decode_long),
+    'int': ('N', _decode_long),
+    'double': ('N', _decode_double),
+    'float': ('N', _decode_double),
+    'string': ('S', _decode_string),
+    'boolean': ('BOOL', _decode_as_is),
+    'timestamp': ('TS', _decode_timestamp),
+    'blob': ('B', _decode_blob),
+}
+
+_default_typed_attributes_decoder = TypedAttributesDecoder()
+
 
 #
 # Containers
@@ -73,6 +197,8 @@ class Container(object):
 
 class GetContainersOutput(Output):
 
+    body_format = 'xml'
+
     def __init__(self, root):
 
         # got an error code
@@ -92,6 +218,23 @@ class GetContainersOutput(Output):
 
 class ContainerContent(object):
 
+    __slots__ = ['error', 'key', 'size', 'last_sequence_id', 'last_modified', 'mode', 'access_time',
+                 'creating_time', 'gid', 'uid', 'inode_number']
+
+    # child tag -> (attribute name, kind)
+    _child_attributes = {
+        'Key': ('key', str),
+        'Size': ('size', int),
+        'LastSequenceID': ('last_sequence_id', int),
+        'LastModified': ('last_modified', str),
+        'Mode': ('mode', str),
+        'AccessTime': ('access_time', str),
+        'CreatingTime': ('creating_time', str),
+        'GID': ('gid', str),
+        'UID': ('uid', str),
+        'InodeNumber': ('inode_number', int),
+    }
+
     def __init__(self, child):
 
         # got an error code
@@ -99,25 +242,26 @@ class ContainerContent(object):
             self.error = child
             return
 
-        for child_key, attribute_name, kind in [
-            ('Key', 'key', str),
-            ('Size', 'size', int),
-            ('LastSequenceID', 'last_sequence_id', int),
-            ('LastModified', 'last_modified', str),
-            ('Mode', 'mode', str),
-            ('AccessTime', 'access_time', str),
-            ('CreatingTime', 'creating_time', str),
-            ('GID', 'gid', str),
-            ('UID', 'uid', str),
-            ('InodeNumber', 'inode_number', int)
-        ]:
-            child_value = child.find(child_key)
-            if child_value is not None:
-                setattr(self, attribute_name, kind(child_value.text))
+        _set_child_attributes(self, child, self._child_attributes)
 
 
 class ContainerCommonPrefix(object):
 
+    __slots__ = ['error', 'prefix', 'last_modified', 'access_time', 'creating_time', 'mode', 'gid', 'uid',
+                 'inode_number']
+
+    # child tag -> (attribute name, kind)
+    _child_attributes = {
+        'Prefix': ('prefix', str),
+        'LastModified': ('last_modified', str),
+        'AccessTime': ('access_time', str),
+        'CreatingTime': ('creating_time', str),
+        'Mode': ('mode', str),
+        'GID': ('gid', str),
+        'UID': ('uid', str),
+        'InodeNumber': ('inode_number', int),
+    }
+
     def __init__(self, child):
 
         # got an error code
@@ -125,23 +269,15 @@ class ContainerCommonPrefix(object):
             self.error = child
             return
 
-        for child_key, attribute_name, kind in [
-            ('Prefix', 'prefix', str),
-            ('LastModified', 'last_modified', str),
-            ('AccessTime', 'access_time', str),
-            ('CreatingTime', 'creating_time', str),
-            ('Mode', 'mode', str),
-            ('GID', 'gid', str),
-            ('UID', 'uid', str),
-            ('InodeNumber', 'inode_number', int)
-        ]:
-            child_value = child.find(child_key)
-            if child_value is not None:
-                setattr(self, attribute_name, kind(child_value.text))
+        _set_child_attributes(self, child, self._child_attributes)
 
 
 class GetContainerContentsOutput(Output):
 
+    # the listing is parsed incrementally - entries are created as their elements are parsed and the
+    # response's element tree is never built
+    body_format = 'xml_children'
+
     def __init__(self, root):
 
         # got an error code
@@ -149,23 +285,37 @@ class GetContainerContentsOutput(Output):
             self.error = root
             return
 
-        self.name = root.find('Name').text
-        self.next_marker = root.find('NextMarker').text
-        self.max_keys = root.find('MaxKeys').text
-        self.is_truncated = root.find('IsTruncated').text
+        self.name = None
+        self.next_marker = None
+        self.max_keys = None
+        self.is_truncated = None
         self.contents = []
         self.common_prefixes = []
 
-        contents_children = root.findall('Contents')
-        common_prefixes_children = root.findall('CommonPrefixes')
+        # root is either a parsed element or an iterator of its children
+        for child in root:
+            tag = child.tag
+
+            if tag == 'Contents':
+                self.contents.append(ContainerContent(child))
+            elif tag == 'CommonPrefixes':
+                self.common_prefixes.append(ContainerCommonPrefix(child))
+            elif tag == 'Name':
+                self.name = child.text
+            elif tag == 'NextMarker':
+                self.next_marker = child.text
+            elif tag == 'MaxKeys':
+                self.max_keys = child.text
+            elif tag == 'IsTruncated':
+                self.is_truncated = child.text
 
-        if contents_children is not None:
-            for content_child in contents_children:
-                self.contents.append(ContainerContent(content_child))
 
-        if common_prefixes_children is not None:
-            for common_prefix_child in common_prefixes_children:
-                self.common_prefixes.append(ContainerCommonPrefix(common_prefix_child))
+def _set_child_attributes(obj, element, child_attributes):
+    for child in element:
+        attribute = child_attributes.get(child.tag)
+        if attribute is not None:
+            attribute_name, kind = attribute
+            setattr(obj, attribute_name, child.text if kind is str else kind(child.text))
 
 
 #
@@ -184,10 +334,17 @@ class GetItemsOutput(Output):
     def __init__(self, decoded_body):
         self.last = decoded_body.get('LastItemIncluded') == 'TRUE'
         self.next_marker = decoded_body.get('NextMarker')
-        self.items = []
 
-        for item in decoded_body.get('Items', []):
-            self.items.append(self._decode_typed_attributes(item))
+        # the items as received, with typed attributes. they're only decoded to dicts when items is accessed
+        self.typed_items = decoded_body.get('Items', [])
+        self._items = None
+
+    @property
+    def items(self):
+        if self._items is None:
+            self._items = _default_typed_attributes_decoder.decode_items(self.typed_items)
+
+        return self._items
 
 
 #
@@ -17,6 +17,8 @@ import future.utils
 import os
 import array
 import datetime
+import numbers
+import sys
 
 try:
     from urllib.parse import urlencode, quote
@@ -415,43 +417,105 @@ def _to_base64(input):
 
 def _dict_to_typed_attributes(d):
     typed_attributes = {}
+    attribute_encoders = _attribute_encoders
 
     for (key, value) in future.utils.viewitems(d):
-        attribute_type = type(value)
-        type_value = None
-
-        if isinstance(value, future.utils.text_type):
-            type_key = 'S'
-            type_value = value
-        elif isinstance(value, future.utils.string_types):
-            type_key = 'S'
-            type_value = str(value)
-        elif attribute_type in [int, float]:
-            type_key = 'N'
-            type_value = str(value)
-        elif attribute_type in [bytes, bytearray]:
-            type_key = 'B'
-            type_value = base64.b64encode(value)
-        elif isinstance(value, bool):
-            type_key = 'BOOL'
-            type_value = value
-        elif isinstance(value, list):
-            type_key = 'B'
-            type_value = v3io.dataplane.kv_array.encode_list(value)
-        elif isinstance(value, array.array):
-            type_key = 'B'
-            type_value = v3io.dataplane.kv_array.encode_array(value, value.typecode)
-        elif isinstance(value, datetime.datetime):
-            type_key = 'TS'
-            type_value = v3io.dataplane.kv_timestamp.encode(value)
-        else:
-            raise AttributeError('Attribute {0} has unsupported type {1}'.format(key, attribute_type))
-
-        typed_attributes[key] = {type_key: type_value}
+        encoder = attribute_encoders.get(type(value))
+        if encoder is None:
+            encoder = _get_attribute_encoder(key, type(value))
+
+        typed_attributes[key] = encoder(value)
 
     return typed_attributes
 
 
+def _encode_string(value):
+    return {'S': value}
+
+
+def _encode_string_subclass(value):
+    return {'S': str(value)}
+
+
+def _encode_number(value):
+    return {'N': str(value)}
+
+
+def _encode_int_subclass(value):
+    return {'N': str(int(value))}
+
+
+def _encode_float_subclass(value):
+    return {'N': repr(float(value))}
+
+
+def _encode_bool(value):
+    return {'BOOL': bool(value)}
+
+
+def _encode_bytes(value):
+    return {'B': base64.b64encode(value)}
+
+
+def _encode_list(value):
+    return {'B': v3io.dataplane.kv_array.encode_list(value)}
+
+
+def _encode_array(value):
+    return {'B': v3io.dataplane.kv_array.encode_array(value)}
+
+
+def _encode_datetime(value):
+    return {'TS': v3io.dataplane.kv_timestamp.encode(value)}
+
+
+# attribute type -> encoder. types that aren't here (e.g. subclasses) are resolved by _get_attribute_encoder and
+# added, so that each type is only resolved once
+_attribute_encoders = {
+    str: _encode_string,
+    int: _encode_number,
+    float: _encode_number,
+    bool: _encode_bool,
+    bytes: _encode_bytes,
+    bytearray: _encode_bytes,
+    list: _encode_list,
+    array.array: _encode_array,
+    datetime.datetime: _encode_datetime,
+}
+
+# resolves types by their base classes. bool must precede int, since bool is a subclass of int. numbers.Integral
+# and numbers.Real cover numeric types that don't derive from int / float (e.g. numpy.int64)
+_attribute_base_encoders = [
+    (future.utils.string_types, _encode_string_subclass),
+    (bool, _encode_bool),
+    (numbers.Integral, _encode_int_subclass),
+    (numbers.Real, _encode_float_subclass),
+    ((bytes, bytearray), _encode_bytes),
+    (list, _encode_list),
+    (array.array, _encode_array),
+    (datetime.datetime, _encode_datetime),
+]
+
+
+def _get_attribute_encoder(key, attribute_type):
+    encoder = _attribute_encoders.get(attribute_type)
+    if encoder is not None:
+        return encoder
+
+    for base_types, encoder in _attribute_base_encoders:
+        if issubclass(attribute_type, base_types):
+            _attribute_encoders[attribute_type] = encoder
+            return encoder
+
+    # numpy is optional. if it wasn't imported, attribute_type can't be an ndarray
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and issubclass(attribute_type, numpy.ndarray):
+        _attribute_encoders[attribute_type] = _encode_array
+        return _encode_array
+
+    raise AttributeError('Attribute {0} has unsupported type {1}'.format(key, attribute_type))
+
+
 def _resolve_body_and_headers(access_key, headers, body):
     if access_key:
         headers = headers or {}
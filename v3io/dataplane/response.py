@@ -38,19 +38,60 @@ class Response(object):
             return self._parsed_output
 
         if self._output and self.body:
+            self._parsed_output = self._output(self._decode_body())
+
+            return self._parsed_output
+
+    def _decode_body(self):
+        body_formats = self._get_body_formats()
+
+        for body_format_index, body_format in enumerate(body_formats):
             try:
-                # TODO: It's expensive to always try to parse as JSON first. Better use headers or a heuristic to decide the format.
-                try:
-                    parsed_output = ujson.loads(self.body)
-                except Exception:
-                    parsed_output = xml.etree.ElementTree.fromstring(self.body)
+                decoded_body = _decoders[body_format](self.body)
             except Exception:
-                raise HttpResponseError(f"Failed to parse response with status {self.status_code}, "
-                                        f"body {self.body}, headers={self.headers}")
+                if body_format_index < len(body_formats) - 1:
+                    continue
 
-            self._parsed_output = self._output(parsed_output)
+                raise self._get_parse_error()
 
-            return self._parsed_output
+            # some decoders parse incrementally, as the output consumes them
+            if hasattr(decoded_body, '__next__'):
+                return self._iter_decoded_body(decoded_body)
+
+            return decoded_body
+
+    def _iter_decoded_body(self, decoded_body):
+        while True:
+            try:
+                element = next(decoded_body)
+            except StopIteration:
+                return
+            except Exception:
+                raise self._get_parse_error()
+
+            yield element
+
+    def _get_parse_error(self):
+        return HttpResponseError(f"Failed to parse response with status {self.status_code}, "
+                                 f"body {self.body}, headers={self.headers}")
+
+    def _get_body_formats(self):
+        output_body_format = getattr(self._output, 'body_format', 'json')
+
+        # prefer what the server says the body is. if the output can decode this content type in its own way,
+        # let it
+        content_type = self.headers.get('Content-Type') if hasattr(self.headers, 'get') else None
+        if content_type:
+            body_formats = _content_type_body_formats.get(content_type.split(';', 1)[0].strip().lower())
+            if body_formats:
+                return (output_body_format if output_body_format in body_formats else body_formats[0],)
+
+        # errors are described in JSON, even for requests whose output is in another format - but some come
+        # back as XML, with no content type to tell
+        if self.status_code >= 300:
+            return 'json', 'xml'
+
+        return (output_body_format,)
 
     def raise_for_status(self, expected_statuses=None):
         if expected_statuses == v3io.dataplane.transport.RaiseForStatus.never:
@@ -65,6 +106,71 @@ class Response(object):
             raise HttpResponseError('Request failed with status {0}: {1}'.format(self.status_code, self.body))
 
 
+def register_decoder(body_format, decoder, content_types=None):
+    """Registers a decoder for a body format, optionally mapping content types to the body format. An output
+    class declares the format of its body with a "body_format" class attribute, which is used whenever the
+    response has no (known) content type
+
+    Parameters
+    ----------
+    body_format (Required) : str
+        The name of the format (e.g. 'json')
+    decoder (Required) : callable
+        Receives the response body, returns what is passed to the output class
+    content_types (Optional) : list of str
+        Content types (e.g. 'application/json') whose body is in this format. If several formats are
+        registered for a content type, the first one is used unless the output class declares another
+    """
+    _decoders[body_format] = decoder
+
+    for content_type in content_types or []:
+        _content_type_body_formats.setdefault(content_type.lower(), []).append(body_format)
+
+
+def iter_xml_children(body, chunk_size=64 * 1024):
+    """Incrementally parses an XML document, yielding each child of the root element (along with its subtree)
+    once it is parsed. Yielded elements are dropped from the tree, so the document's tree is never built in full
+    """
+    roots = []
+
+    # the only way to get a hold of the root before the document is parsed in full. this is cheaper than having
+    # the parser report start/end events for every element
+    def _create_element(tag, attrib):
+        element = xml.etree.ElementTree.Element(tag, attrib)
+        if not roots:
+            roots.append(element)
+
+        return element
+
+    parser = xml.etree.ElementTree.XMLParser(target=xml.etree.ElementTree.TreeBuilder(element_factory=_create_element))
+
+    for chunk_offset in range(0, len(body), chunk_size):
+        parser.feed(body[chunk_offset:chunk_offset + chunk_size])
+
+        if roots:
+
+            # all children but the last are complete - the last may still be parsing
+            num_complete_children = len(roots[0]) - 1
+            if num_complete_children > 0:
+                complete_children = roots[0][:num_complete_children]
+                del roots[0][:num_complete_children]
+
+                yield from complete_children
+
+    parser.close()
+
+    if roots:
+        yield from list(roots[0])
+
+
+_decoders = {}
+_content_type_body_formats = {}
+
+register_decoder('json', ujson.loads, ['application/json', 'text/json'])
+register_decoder('xml', xml.etree.ElementTree.fromstring, ['application/xml', 'text/xml'])
+register_decoder('xml_children', iter_xml_children, ['application/xml', 'text/xml'])
+
+
 class Responses(object):
 
     def __init__(self):
@@ -80,3 +186,34 @@ class Responses(object):
     def raise_for_status(self):
         if not self.success:
             raise HttpResponseError('Failed to put items')
+
+
+class ItemFailure(object):
+
+    def __init__(self, key, status_code, body):
+        self.key = key
+        self.status_code = status_code
+        self.body = body
+
+
+class BulkWriteResult(object):
+
+    def __init__(self):
+        """The outcome of writing many items - the number of items written, and those that weren't"""
+        self.success_count = 0
+        self.failures = []
+
+    @property
+    def success(self):
+        return not self.failures
+
+    def add_response(self, key, response):
+        if response.status_code < 300:
+            self.success_count += 1
+        else:
+            self.failures.append(ItemFailure(key, response.status_code, response.body))
+
+    def raise_for_status(self):
+        if self.failures:
+            raise HttpResponseError('Failed to write {0} items (first failure - item {1} with status {2}: {3})'.format(
+                len(self.failures), self.failures[0].key, self.failures[0].status_code, self.failures[0].body))
@@ -0,0 +1,242 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import datetime
+import queue
+import threading
+
+
+class Consumer(object):
+
+    def __init__(self,
+                 stream,
+                 container,
+                 stream_path,
+                 shards='all',
+                 start='LATEST',
+                 limit=100,
+                 max_limit=10000,
+                 poll_interval_ms=100,
+                 max_poll_interval_ms=2000,
+                 max_batches_per_shard=2,
+                 access_key=None):
+        """Reads the records of a stream's shards concurrently - a thread per shard - and merges them into a
+        single iterator. See stream.consumer()"""
+        self.container = container
+        self.stream_path = stream_path
+        self.start = start
+        self.limit = limit
+        self.max_limit = max_limit
+        self.poll_interval_ms = poll_interval_ms
+        self.max_poll_interval_ms = max_poll_interval_ms
+
+        self._stream = stream
+        self._access_key = access_key
+        self._current_shard_id = None
+        self._current_records = []
+        self._current_record_index = 0
+        self._closed = threading.Event()
+
+        if shards == 'all':
+            response = stream.describe(container, stream_path, access_key=access_key)
+            shards = range(response.output.shard_count)
+
+        self.shard_ids = list(shards)
+
+        # all the shards share a queue of (shard ID, records) batches
+        self._batches = queue.Queue(maxsize=max_batches_per_shard * len(self.shard_ids))
+
+        self._shard_threads = [threading.Thread(target=self._read_shard, args=(shard_id,), daemon=True)
+                               for shard_id in self.shard_ids]
+
+        for shard_thread in self._shard_threads:
+            shard_thread.start()
+
+    def next_record(self, timeout=None):
+        """Returns the next record of any of the shards, waiting for one to arrive.
+
+        Parameters
+        ----------
+        timeout (Optional) : float
+            The max number of seconds to wait for a record. If not passed, waits until one arrives
+
+        Return Value
+        ----------
+        A (shard ID, `GetRecordsResult`) tuple, or None if no record arrived within timeout or the consumer is closed
+        """
+        while self._current_record_index >= len(self._current_records):
+            if self._closed.is_set():
+                return None
+
+            try:
+                batch = self._batches.get(timeout=timeout)
+            except queue.Empty:
+                return None
+
+            # woken up by close()
+            if batch is None:
+                return None
+
+            if isinstance(batch, BaseException):
+                self.close()
+                raise batch
+
+            self._current_shard_id, self._current_records = batch
+            self._current_record_index = 0
+
+        record = self._current_records[self._current_record_index]
+        self._current_record_index += 1
+
+        return self._current_shard_id, record
+
+    def __iter__(self):
+        """Yields (shard ID, `GetRecordsResult`) tuples until the consumer is closed"""
+        while True:
+            shard_record = self.next_record()
+            if shard_record is None:
+                return
+
+            yield shard_record
+
+    def close(self):
+        """Stops the shard readers, and ends the iteration of a reader waiting for a record"""
+        self._closed.set()
+
+        # if the queue is full, a waiting reader gets a batch and sees the consumer is closed
+        try:
+            self._batches.put_nowait(None)
+        except queue.Full:
+            pass
+
+        for shard_thread in self._shard_threads:
+            if shard_thread is not threading.current_thread():
+                shard_thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _read_shard(self, shard_id):
+        try:
+            shard_reader = ShardReader(shard_id,
+                                       self.limit,
+                                       self.max_limit,
+                                       self.poll_interval_ms,
+                                       self.max_poll_interval_ms)
+            seek_type, seek_args = get_seek_args(self.start)
+
+            response = self._stream.seek(self.container,
+                                         self.stream_path,
+                                         shard_id,
+                                         seek_type,
+                                         access_key=self._access_key,
+                                         **seek_args)
+
+            shard_reader.location = response.output.location
+
+            while not self._closed.is_set():
+                response = self._stream.get_records(self.container,
+                                                    self.stream_path,
+                                                    shard_id,
+                                                    shard_reader.location,
+                                                    access_key=self._access_key,
+                                                    limit=shard_reader.limit)
+
+                # the next batch is read while this one is processed, up to max_batches_per_shard batches ahead
+                wait_seconds = shard_reader.on_records(response.output)
+
+                if response.output.records and not self._put_batch((shard_id, response.output.records)):
+                    return
+
+                if wait_seconds:
+                    self._closed.wait(wait_seconds)
+
+        # hand the error over to the reader
+        except BaseException as e:
+            self._put_batch(e)
+
+    def _put_batch(self, batch):
+        """Waits for room in the queue, as long as the consumer isn't closed. Returns whether the batch was put"""
+        while not self._closed.is_set():
+            try:
+                self._batches.put(batch, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+
+class ShardReader(object):
+
+    def __init__(self, shard_id, limit=100, max_limit=10000, poll_interval_ms=100, max_poll_interval_ms=2000):
+        """The position of a consumer in a shard, and how it polls the shard (shared by the sync and aio
+        consumers). Polling adapts to how far behind the end of the shard the reader is:
+
+        behind - the shard is read back to back, and the limit doubles (up to max_limit) while batches are full
+        caught up - the shard is read again after poll_interval_ms, doubling (up to max_poll_interval_ms) with
+                    every empty batch, and the limit shrinks back
+        """
+        self.shard_id = shard_id
+        self.location = None
+        self.min_limit = limit
+        self.max_limit = max_limit
+        self.min_poll_interval_ms = poll_interval_ms
+        self.max_poll_interval_ms = max_poll_interval_ms
+
+        # the limit of the next read, and the wait after the next empty one
+        self.limit = limit
+        self.poll_interval_ms = poll_interval_ms
+
+    def on_records(self, get_records_output):
+        """Moves past the records read. Returns the number of seconds to wait before reading again"""
+        self.location = get_records_output.next_location
+        num_records = len(get_records_output.records)
+
+        if get_records_output.msec_behind_latest or get_records_output.records_behind_latest:
+            if num_records >= self.limit:
+                self.limit = min(self.limit * 2, self.max_limit)
+
+            self.poll_interval_ms = self.min_poll_interval_ms
+
+            return 0
+
+        self.limit = max(self.limit // 2, self.min_limit)
+
+        # caught up - new records may follow the ones just read, but once there are none back off
+        if num_records:
+            self.poll_interval_ms = self.min_poll_interval_ms
+
+            return 0
+
+        wait_seconds = self.poll_interval_ms / 1000.0
+        self.poll_interval_ms = min(self.poll_interval_ms * 2, self.max_poll_interval_ms)
+
+        return wait_seconds
+
+
+def get_seek_args(start):
+    """Returns the seek type and arguments of a consumer's start - 'EARLIEST', 'LATEST' or a datetime"""
+    if isinstance(start, datetime.datetime):
+        return 'TIME', {
+            'timestamp_sec': int(start.timestamp()),
+            'timestamp_nsec': start.microsecond * 1000,
+        }
+
+    if start not in ('EARLIEST', 'LATEST'):
+        raise ValueError("start must be 'EARLIEST', 'LATEST' or a datetime")
+
+    return start, {}
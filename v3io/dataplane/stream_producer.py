@@ -0,0 +1,309 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import collections
+import concurrent.futures
+import threading
+import time
+
+# the max number of records in a single PutRecords request
+MAX_BATCH_RECORDS = 1000
+
+# a rough per record overhead of the request body (JSON keys, shard ID, etc)
+_record_overhead_bytes = 64
+
+
+class RecordError(Exception):
+
+    def __init__(self, error_code, error_message):
+        super(RecordError, self).__init__('Failed to put record ({0}): {1}'.format(error_code, error_message))
+        self.error_code = error_code
+        self.error_message = error_message
+
+
+class Producer(object):
+
+    def __init__(self,
+                 stream,
+                 container,
+                 stream_path,
+                 linger_ms=5,
+                 max_batch_records=MAX_BATCH_RECORDS,
+                 max_batch_bytes=4 * 1024 * 1024,
+                 max_inflight_batches=4,
+                 max_buffered_records=100000,
+                 max_retries=3,
+                 retry_backoff_ms=100,
+                 access_key=None):
+        """Sends records to a stream in PutRecords batches, in the background. See stream.producer()"""
+        self.container = container
+        self.stream_path = stream_path
+        self.max_inflight_batches = max_inflight_batches
+        self.max_buffered_records = max_buffered_records
+        self.max_retries = max_retries
+        self.retry_backoff_ms = retry_backoff_ms
+
+        self._stream = stream
+        self._access_key = access_key
+        self._batcher = RecordBatcher(linger_ms, max_batch_records, max_batch_bytes)
+        self._num_inflight_batches = 0
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._num_flushing = 0
+        self._closed = False
+
+        self._batch_senders = concurrent.futures.ThreadPoolExecutor(max_workers=max_inflight_batches)
+        self._dispatcher = threading.Thread(target=self._dispatch_batches, daemon=True)
+        self._dispatcher.start()
+
+    def send(self, data, shard_id=None, partition_key=None, client_info=None):
+        """Adds a record to the next batch. Blocks while max_buffered_records records are waiting to be sent.
+
+        Parameters
+        ----------
+        data (Required) : str / bytes
+            Record data
+        shard_id (Optional) : int
+            The ID of the shard to which to put the record
+        partition_key (Optional) : str
+            A partition key with which to associate the record. Records with the same partition key (or shard ID)
+            are put in the order they were sent
+        client_info (Optional) : bytes / bytearray
+            Custom opaque information
+
+        Return Value
+        ----------
+        A `concurrent.futures.Future`, resolved with the record's `PutRecordsResult` (shard ID and sequence number)
+        once it's put, or with a `RecordError` if it couldn't be put after max_retries retries
+        """
+        pending_record = PendingRecord(concurrent.futures.Future(), data, shard_id, partition_key, client_info)
+
+        with self._lock:
+            while self._batcher.num_pending_records >= self.max_buffered_records and not self._closed:
+                self._changed.wait()
+
+            if self._closed:
+                raise RuntimeError('Producer is closed')
+
+            self._batcher.add(pending_record)
+            self._changed.notify_all()
+
+        return pending_record.future
+
+    def flush(self):
+        """Sends all the records sent so far, without lingering, and waits until they're all resolved"""
+        with self._lock:
+            self._num_flushing += 1
+            self._changed.notify_all()
+
+            try:
+                while self._batcher.num_pending_records or self._num_inflight_batches:
+                    self._changed.wait()
+            finally:
+                self._num_flushing -= 1
+
+    def close(self):
+        """Flushes and stops the producer"""
+        self.flush()
+
+        with self._lock:
+            self._closed = True
+            self._changed.notify_all()
+
+        self._dispatcher.join()
+        self._batch_senders.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _dispatch_batches(self):
+        while True:
+            with self._lock:
+                batch = None
+
+                while batch is None:
+                    if self._closed:
+                        return
+
+                    if self._num_inflight_batches < self.max_inflight_batches:
+                        batch, wait_seconds = self._batcher.take_batch(self._num_flushing)
+                    else:
+                        wait_seconds = None
+
+                    if batch is None:
+                        self._changed.wait(wait_seconds)
+
+                self._num_inflight_batches += 1
+
+                # writers blocked on a full buffer can go on
+                self._changed.notify_all()
+
+            self._batch_senders.submit(self._send_batch, batch)
+
+    def _send_batch(self, batch):
+        try:
+            output = self._stream.put_records_with_retries(self.container,
+                                                           self.stream_path,
+                                                           [pending_record.record for pending_record in batch],
+                                                           access_key=self._access_key,
+                                                           max_retries=self.max_retries,
+                                                           retry_backoff_ms=self.retry_backoff_ms)
+
+            resolve_put_records(batch, output)
+
+        except Exception as e:
+            fail_records(batch, e)
+
+        finally:
+            with self._lock:
+                self._batcher.release(batch)
+                self._num_inflight_batches -= 1
+                self._changed.notify_all()
+
+
+class PendingRecord(object):
+
+    __slots__ = ('future', 'record', 'group', 'size', 'time')
+
+    def __init__(self, future, data, shard_id=None, partition_key=None, client_info=None):
+        """A record waiting to be put, and the future resolved with its outcome"""
+        self.future = future
+        self.record = {'data': data}
+        self.time = time.monotonic()
+
+        # records of the same group are put in order. records with neither a shard ID nor a partition key are not
+        if shard_id is not None:
+            self.record['shard_id'] = shard_id
+            self.group = ('shard_id', shard_id)
+        elif partition_key is not None:
+            self.group = ('partition_key', partition_key)
+        else:
+            self.group = None
+
+        if partition_key is not None:
+            self.record['partition_key'] = partition_key
+
+        if client_info is not None:
+            self.record['client_info'] = client_info
+
+        # the size of the record in the request body - data and client info are base64 encoded
+        self.size = _base64_len(data) + _base64_len(client_info or b'') + len(partition_key or '') + \
+            _record_overhead_bytes
+
+
+class RecordBatcher(object):
+
+    def __init__(self, linger_ms, max_batch_records, max_batch_bytes):
+        """Packs pending records into batches (shared by the sync and aio producers, which do the locking)"""
+        if not 1 <= max_batch_records <= MAX_BATCH_RECORDS:
+            raise ValueError('max_batch_records must be between 1 and {0}'.format(MAX_BATCH_RECORDS))
+
+        self.linger_ms = linger_ms
+        self.max_batch_records = max_batch_records
+        self.max_batch_bytes = max_batch_bytes
+        self.num_pending_records = 0
+
+        # record group -> pending records, in the order they were sent
+        self._pending_records = collections.OrderedDict()
+
+        # the records of a group are only in one batch at a time, so that they're put in order (including retries)
+        self._busy_record_groups = set()
+
+    def add(self, pending_record):
+        self._pending_records.setdefault(pending_record.group, collections.deque()).append(pending_record)
+        self.num_pending_records += 1
+
+    def take_batch(self, flush=False):
+        """Returns (pending records, None) if a batch should be sent now. Otherwise, (None, the number of seconds
+        until one should be sent, or None if no batch can be sent until records are added or released)"""
+        pending_records = []
+        batch_bytes = 0
+        oldest_record_time = None
+        is_full = False
+
+        for record_group, group_pending_records in self._pending_records.items():
+            if record_group in self._busy_record_groups:
+                continue
+
+            if oldest_record_time is None or group_pending_records[0].time < oldest_record_time:
+                oldest_record_time = group_pending_records[0].time
+
+            for pending_record in group_pending_records:
+                if len(pending_records) == self.max_batch_records or \
+                        (pending_records and batch_bytes + pending_record.size > self.max_batch_bytes):
+                    is_full = True
+                    break
+
+                pending_records.append(pending_record)
+                batch_bytes += pending_record.size
+
+            if is_full:
+                break
+
+        if not pending_records:
+            return None, None
+
+        linger_seconds = oldest_record_time + self.linger_ms / 1000.0 - time.monotonic()
+        if not is_full and not flush and linger_seconds > 0:
+            return None, linger_seconds
+
+        # take the records out of their groups, marking the groups as busy until the batch is released
+        for pending_record in pending_records:
+            group_pending_records = self._pending_records[pending_record.group]
+            group_pending_records.popleft()
+
+            if not group_pending_records:
+                del self._pending_records[pending_record.group]
+
+            if pending_record.group is not None:
+                self._busy_record_groups.add(pending_record.group)
+
+        self.num_pending_records -= len(pending_records)
+
+        return pending_records, None
+
+    def release(self, pending_records):
+        """Called once the records of a batch are resolved"""
+        for pending_record in pending_records:
+            self._busy_record_groups.discard(pending_record.group)
+
+
+def resolve_put_records(pending_records, put_records_output):
+    """Resolves the futures of records from the final outcome of their put"""
+    for pending_record, record_result in zip(pending_records, put_records_output.records):
+        if pending_record.future.done():
+            continue
+
+        if record_result.error_code:
+            pending_record.future.set_exception(RecordError(record_result.error_code, record_result.error_message))
+        else:
+            pending_record.future.set_result(record_result)
+
+
+def fail_records(pending_records, error):
+    """Fails the futures of records whose put failed altogether"""
+    for pending_record in pending_records:
+        if not pending_record.future.done():
+            pending_record.future.set_exception(error)
+
+
+def _base64_len(value):
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+
+    return (len(value) + 2) // 3 * 4
@@ -20,10 +20,19 @@ import v3io.dataplane.transport
 
 class Transport(object):
 
-    def __init__(self, logger, endpoint=None, max_connections=None, timeout=None, verbosity=None):
+    def __init__(self,
+                 logger,
+                 endpoint=None,
+                 max_connections=None,
+                 timeout=None,
+                 verbosity=None,
+                 connection_acquire_timeout=None,
+                 idle_connection_ttl=None):
         self._logger = logger
         self._endpoint = self._get_endpoint(endpoint)
         self._timeout = timeout
+        self._connection_acquire_timeout = connection_acquire_timeout
+        self._idle_connection_ttl = idle_connection_ttl
         self.max_connections = max_connections or 8
 
         self._set_log_method(verbosity)
@@ -64,6 +73,10 @@ class Transport(object):
         # send the request
         inflight_request = self.send_request(request)
 
+        # the caller reads the response when it needs it, with wait_response()
+        if transport_actions == v3io.dataplane.transport.Actions.encode_and_send:
+            return inflight_request
+
         # wait for the response
         return self.wait_response(inflight_request)
 
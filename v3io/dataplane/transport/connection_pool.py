@@ -0,0 +1,188 @@
+# Copyright 2019 Iguazio
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import collections
+import threading
+import time
+import weakref
+
+
+class ConnectionPoolTimeoutError(Exception):
+    """Exception raised when a connection could not be acquired from the pool in time"""
+    pass
+
+
+class ConnectionPool(object):
+
+    def __init__(self, create_connection, max_connections, idle_connection_ttl=None):
+        """Creates a thread safe connection pool. The pool starts empty and creates connections on demand, up to
+        max_connections. Connections that were idle for longer than idle_connection_ttl seconds are closed
+
+        Parameters
+        ----------
+        create_connection (Required) : callable
+            Called (with no arguments) whenever the pool needs a new connection
+        max_connections (Required) : int
+            The max number of connections the pool holds (idle and in use)
+        idle_connection_ttl (Optional) : float
+            Number of seconds after which an idle connection is closed. If not passed, idle connections
+            are never closed
+        """
+        self.max_connections = max_connections
+        self._create_connection = create_connection
+        self._idle_connection_ttl = idle_connection_ttl
+
+        # idle connections, along with the time they were released. least recently used on the left
+        self._idle_connections = collections.deque()
+        self._num_connections = 0
+        self._num_waiters = 0
+        self._condition = threading.Condition()
+
+        # connections acquired before a reset() are no longer counted, and are closed once released
+        self._generation = 0
+        self._connection_generations = weakref.WeakKeyDictionary()
+
+    def acquire(self, timeout=None):
+        """Returns a connection, creating one if all connections are in use and the pool isn't full. If the
+        pool is full, waits for a connection to be released. If timeout (seconds) passes, raises
+        ConnectionPoolTimeoutError. If timeout is None, waits forever
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._condition:
+            while True:
+                self._close_expired_connections()
+
+                # reuse the most recently released connection - it's the least likely to have been closed by the peer
+                if self._idle_connections:
+                    connection, _ = self._idle_connections.pop()
+                    return connection
+
+                # reserve a slot for a new connection, create it outside the lock
+                if self._num_connections < self.max_connections:
+                    self._num_connections += 1
+                    generation = self._generation
+                    break
+
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+
+                    if remaining <= 0:
+                        raise ConnectionPoolTimeoutError('Timed out after {0}s waiting for a free connection '
+                                                         '(all {1} connections are in use)'.format(timeout,
+                                                                                                   self.max_connections))
+
+                self._num_waiters += 1
+
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._num_waiters -= 1
+
+        try:
+            connection = self._create_connection()
+        except BaseException as e:
+            self._remove_connection(generation)
+            raise e
+
+        with self._condition:
+            self._connection_generations[connection] = generation
+
+        return connection
+
+    def release(self, connection):
+        """Returns a connection to the pool, allowing others to use it"""
+        with self._condition:
+
+            # the pool was reset since the connection was acquired
+            if self._connection_generations.get(connection) != self._generation:
+                connection.close()
+                return
+
+            self._idle_connections.append((connection, time.monotonic()))
+            self._close_expired_connections()
+            self._condition.notify()
+
+    def discard(self, connection):
+        """Closes a connection that was acquired from the pool and frees its slot"""
+        connection.close()
+        self._remove_connection(self._connection_generations.get(connection))
+
+    def replace(self, connection):
+        """Closes a connection that was acquired from the pool (e.g. after it was disconnected) and returns a new
+        one in its slot. If a new one can't be created, the closed connection keeps the slot"""
+        connection.close()
+        new_connection = self._create_connection()
+
+        with self._condition:
+            self._connection_generations[new_connection] = self._connection_generations.get(connection)
+
+        return new_connection
+
+    def reset(self):
+        """Closes all idle connections and frees the slots of those in use, e.g. of requests whose responses were
+        never read. Connections in use are closed once released or discarded. Threads waiting for a connection are
+        woken up to create new ones"""
+        with self._condition:
+            self._generation += 1
+
+            while self._idle_connections:
+                connection, _ = self._idle_connections.popleft()
+                connection.close()
+
+            self._num_connections = 0
+            self._condition.notify_all()
+
+    def close(self):
+        """Closes all idle connections. Connections in use are closed when they are discarded"""
+        with self._condition:
+            while self._idle_connections:
+                connection, _ = self._idle_connections.popleft()
+                connection.close()
+                self._num_connections -= 1
+
+            self._condition.notify_all()
+
+    def stats(self):
+        """Returns a dict with the current pool size, number of idle connections, number of connections in use
+        and number of threads waiting for a connection"""
+        with self._condition:
+            return {
+                'size': self._num_connections,
+                'idle': len(self._idle_connections),
+                'in_use': self._num_connections - len(self._idle_connections),
+                'waiters': self._num_waiters,
+                'max_size': self.max_connections,
+            }
+
+    def _remove_connection(self, generation):
+        with self._condition:
+
+            # if the pool was reset since, the connection's slot was already freed
+            if generation == self._generation:
+                self._num_connections -= 1
+                self._condition.notify()
+
+    def _close_expired_connections(self):
+        if self._idle_connection_ttl is None:
+            return
+
+        expiration_time = time.monotonic() - self._idle_connection_ttl
+
+        # the least recently used connections are on the left
+        while self._idle_connections and self._idle_connections[0][1] < expiration_time:
+            connection, _ = self._idle_connections.popleft()
+            connection.close()
+            self._num_connections -= 1
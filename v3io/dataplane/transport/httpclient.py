@@ -20,23 +20,34 @@ import socket
 import v3io.dataplane.response
 import v3io.dataplane.request
 from . import abstract
-import queue
+from . import connection_pool
 
 
 class Transport(abstract.Transport):
 
-    def __init__(self, logger, endpoint=None, max_connections=None, timeout=None, verbosity=None):
-        super(Transport, self).__init__(logger, endpoint, max_connections, timeout, verbosity)
-
-        self._free_connections = queue.Queue()
+    def __init__(self,
+                 logger,
+                 endpoint=None,
+                 max_connections=None,
+                 timeout=None,
+                 verbosity=None,
+                 connection_acquire_timeout=None,
+                 idle_connection_ttl=None):
+        super(Transport, self).__init__(logger,
+                                        endpoint,
+                                        max_connections,
+                                        timeout,
+                                        verbosity,
+                                        connection_acquire_timeout,
+                                        idle_connection_ttl)
 
         # based on scheme, create a host and context for _create_connection
         self._host, self._ssl_context = self._parse_endpoint(self._endpoint)
 
-        # create the pool connection
-        self._create_connections(self.max_connections,
-                                 self._host,
-                                 self._ssl_context)
+        # create the connection pool. connections are only created when needed
+        self.connection_pool = connection_pool.ConnectionPool(self._create_pool_connection,
+                                                              self.max_connections,
+                                                              self._idle_connection_ttl)
 
         # python 2 and 3 have different exceptions
         if sys.version_info[0] >= 3:
@@ -50,79 +61,88 @@ class Transport(abstract.Transport):
             self._send_request_exceptions = (http.client.CannotSendRequest, http.client.BadStatusLine)
             self._get_status_and_headers = self._get_status_and_headers_py2
 
+    def close(self):
+        self.connection_pool.close()
+
+    def restart(self):
+        self.connection_pool.reset()
+
     def requires_access_key(self):
         return True
 
     def send_request(self, request):
-        # TODO: consider getting param of whether we should block or not (wait for connection to be free or raise exception)
-        connection = self._free_connections.get(block=True, timeout=None)
+        connection = self.connection_pool.acquire(self._connection_acquire_timeout)
 
         try:
             return self._send_request_on_connection(request, connection)
         except BaseException as e:
-            connection.close()
-            connection = self._create_connection(self._host, self._ssl_context)
-            self._free_connections.put(connection, block=True)
+
+            # the connection may have been replaced while sending
+            self.connection_pool.discard(getattr(request.transport, 'connection_used', connection))
             raise e
 
     def wait_response(self, request, raise_for_status=None, num_retries=1):
         connection = request.transport.connection_used
+        response_body = status_code = headers = None
 
-        while True:
-            try:
-
-                # read the response
-                response = connection.getresponse()
-                response_body = response.read()
-
-                status_code, headers = self._get_status_and_headers(response)
-
-                self.log('Rx',
-                         connection=connection,
-                         status_code=status_code,
-                         body=response_body)
-
-                response = v3io.dataplane.response.Response(request.output,
-                                                            status_code,
-                                                            headers,
-                                                            response_body)
-
-                # enforce raise for status
-                response.raise_for_status(request.raise_for_status or raise_for_status)
-
-                # return the response
-                return response
-
-            except v3io.dataplane.response.HttpResponseError as response_error:
-                self._logger.warn_with('Response error: {}'.format(str(response_error)))
-                raise response_error
-            except BaseException as e:
-                if num_retries == 0:
-                    self._logger.error_with('Error occurred while waiting for response and ran out of retries',
+        try:
+            while True:
+                try:
+
+                    # read the response
+                    response = connection.getresponse()
+                    response_body = response.read()
+
+                    status_code, headers = self._get_status_and_headers(response)
+
+                    self.log('Rx',
+                             connection=connection,
+                             status_code=status_code,
+                             body=response_body)
+
+                    response = v3io.dataplane.response.Response(request.output,
+                                                                status_code,
+                                                                headers,
+                                                                response_body)
+
+                    # enforce raise for status
+                    response.raise_for_status(request.raise_for_status or raise_for_status)
+
+                    # return the response
+                    return response
+
+                except v3io.dataplane.response.HttpResponseError as response_error:
+                    self._logger.warn_with('Response error: {}'.format(str(response_error)))
+                    raise response_error
+                except BaseException as e:
+                    if num_retries == 0:
+                        self._logger.error_with('Error occurred while waiting for response and ran out of retries',
+                                                e=type(e),
+                                                e_msg=e,
+                                                response_body=response_body,
+                                                status_code=status_code,
+                                                headers=headers,
+                                                connection=connection)
+
+                        # don't return a connection in an unknown state to the pool
+                        connection.close()
+                        raise e
+
+                    self._logger.debug_with('Error occurred while waiting for response – retrying',
+                                            retries_left=num_retries,
                                             e=type(e),
                                             e_msg=e,
-                                            response_body=response_body,
-                                            status_code=status_code,
-                                            headers=headers,
                                             connection=connection)
 
-                    raise e
-
-                self._logger.debug_with('Error occurred while waiting for response – retrying',
-                                        retries_left=num_retries,
-                                        e=type(e),
-                                        e_msg=e,
-                                        connection=connection)
-
-                num_retries -= 1
+                    num_retries -= 1
 
-                connection.close()
-                connection = self._create_connection(self._host, self._ssl_context)
+                    connection = self.connection_pool.replace(connection)
 
-                # re-send the request on the connection
-                request = self._send_request_on_connection(request, connection)
-            finally:
-                self._free_connections.put(connection, block=True)
+                    # re-send the request on the connection (which may replace the connection)
+                    request = self._send_request_on_connection(request, connection)
+                    connection = request.transport.connection_used
+        finally:
+            self.connection_pool.release(connection)
 
     def _send_request_on_connection(self, request, connection):
         setattr(request.transport, 'connection_used', connection)
@@ -142,8 +162,7 @@ class Transport(abstract.Transport):
             except self._send_request_exceptions as e:
                 self._logger.debug_with('Disconnected while attempting to send. Recreating connection and retrying',
                                         e=type(e), e_msg=e, connection=connection)
-                connection.close()
-                connection = self._create_connection(self._host, self._ssl_context)
+                connection = self.connection_pool.replace(connection)
                 request.transport.connection_used = connection
                 connection.request(request.method, path, request.body, request.headers)
         except BaseException as e:
@@ -152,10 +171,8 @@ class Transport(abstract.Transport):
 
         return request
 
-    def _create_connections(self, num_connections, host, ssl_context):
-        for _ in range(num_connections):
-            connection = self._create_connection(host, ssl_context)
-            self._free_connections.put(connection, block=True)
+    def _create_pool_connection(self):
+        return self._create_connection(self._host, self._ssl_context)
 
     def _create_connection(self, host, ssl_context):
         if ssl_context is None:
@@ -21,8 +21,21 @@ from . import abstract
 
 class Transport(abstract.Transport):
 
-    def __init__(self, logger, endpoint=None, max_connections=None, timeout=None, verbosity=None):
-        super(Transport, self).__init__(logger, endpoint, max_connections, timeout, verbosity)
+    def __init__(self,
+                 logger,
+                 endpoint=None,
+                 max_connections=None,
+                 timeout=None,
+                 verbosity=None,
+                 connection_acquire_timeout=None,
+                 idle_connection_ttl=None):
+        super(Transport, self).__init__(logger,
+                                        endpoint,
+                                        max_connections,
+                                        timeout,
+                                        verbosity,
+                                        connection_acquire_timeout,
+                                        idle_connection_ttl)
         self._next_connection_pool = 0
         self._session = requests.Session()
 
@@ -49,7 +62,7 @@ class Transport(abstract.Transport):
         # create a response
         response = v3io.dataplane.response.Response(request.output,
                                                     request.transport.http_response.status_code,
-                                                    request.headers,
+                                                    request.transport.http_response.headers,
                                                     request.transport.http_response.content)
 
         # enforce raise for status